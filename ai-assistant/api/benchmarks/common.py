@@ -0,0 +1,87 @@
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Dict, Sequence
+
+
+def rss_mb() -> float:
+    """
+    Returns the current resident set size of this process in MiB.
+
+    Reads ``/proc/self/status`` on Linux and falls back to the peak RSS elsewhere.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def peak_rss_mb(pid: int | None = None) -> float | None:
+    """
+    Returns the peak resident set size of a process (default: this one) in MiB.
+
+    Reads ``VmHWM`` from ``/proc/<pid>/status``; another process's peak is only
+    available on Linux and None is returned elsewhere.
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if pid is not None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_metadata() -> Dict:
+    """
+    Returns what identifies a benchmark run: time, git revision, Python version and machine.
+    """
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        revision = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def percentiles(samples: Sequence[float], points: Sequence[float] = (0.5, 0.95, 0.99)) -> Dict[str, float]:
+    """
+    Returns the given percentiles of a list of samples, keyed ``p50``, ``p95``, ...
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return {f"p{round(p * 100)}": 0.0 for p in points}
+    return {f"p{round(p * 100)}": ordered[min(len(ordered) - 1, int(p * len(ordered)))] for p in points}
+
+
+def report(results: Dict, output: str | None = None):
+    """
+    Prints benchmark results as JSON, and writes them to ``output`` if given.
+    """
+    text = json.dumps(results, indent=2)
+    print(text)
+    if output:
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, "w") as f:
+            f.write(text + "\n")
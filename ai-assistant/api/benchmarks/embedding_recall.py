@@ -0,0 +1,150 @@
+"""
+Measures what a quantized embedding backend or vector storage dtype costs in retrieval quality.
+
+The corpus is embedded with the full-precision baseline (``torch`` backend, float32
+vectors) and with the candidate configuration. For every query the top-k chunks of
+the candidate are compared with the baseline's top-k; recall@k is the average
+overlap. Embedding throughput and the memory taken by each model are reported too.
+
+Usage::
+
+    python -m ai_assistant.api.benchmarks.embedding_recall --backend int8 --storage-dtype int8 \\
+        --corpus docs/ --queries questions.txt --k 5
+
+Without ``--queries`` the first words of every tenth chunk are used as queries.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from .common import report, rss_mb
+from ..vector_data.embeddings import EMBEDDING_BACKENDS, load_embedding_function
+from ..vector_data.quantization import STORAGE_DTYPES, dot, quantize
+
+# Used when no corpus is given, so the benchmark runs out of the box.
+SAMPLE_CORPUS = [
+    "To reset your password, open Settings, choose Security and click 'Reset password'.",
+    "Error E401 means the API key is missing, expired or has been revoked.",
+    "GET /api/v1/users returns the users of the organization, 100 per page.",
+    "POST /api/v1/users creates a user; the email address must be unique.",
+    "Users need the can_edit_theme permission to change the colors of the widget.",
+    "Themes control the colors, fonts and logo shown in the assistant widget.",
+    "Escalations are created when the assistant cannot answer and forwards the question to support.",
+    "Uploaded PDF and Markdown files are split into chunks and indexed for retrieval.",
+    "Rate limits apply per tenant; a 429 response includes a Retry-After header.",
+    "The admin portal lists organizations and lets owners manage permissions.",
+    "Webhooks are retried with exponential backoff for up to 24 hours.",
+    "Invoices are generated on the first day of each month and sent by email.",
+    "Single sign-on supports SAML 2.0 and OpenID Connect identity providers.",
+    "Deleting an organization removes its users, documents and escalations after 30 days.",
+    "The guided task engine walks users through multi-step workflows such as onboarding.",
+    "Exports are available as CSV and JSON from the reports page.",
+]
+
+
+def load_corpus(path: str | None) -> list[str]:
+    """
+    Returns the chunks of every supported file under ``path``, or the sample corpus.
+    """
+    if not path:
+        return list(SAMPLE_CORPUS)
+    from ..vector_data.ingest_docs import iter_chunks
+    from ..vector_data.loaders import iter_documents
+
+    files = [path] if os.path.isfile(path) else [
+        os.path.join(root, name) for root, _, names in os.walk(path) for name in sorted(names)
+    ]
+    chunks = []
+    for file_path in files:
+        try:
+            documents = iter_documents(file_path, os.path.basename(file_path))
+            chunks.extend(chunk.page_content for chunk in iter_chunks(documents, lambda **_: None))
+        except Exception as e:
+            print(f"Skipping {file_path}: {e}")
+    return chunks
+
+
+def load_queries(path: str | None, corpus: list[str]) -> list[str]:
+    """
+    Returns the queries in ``path``, or the first words of every tenth chunk (every chunk of a small corpus).
+    """
+    if path:
+        with open(path) as f:
+            return [line.strip() for line in f if line.strip()]
+    step = 10 if len(corpus) >= 100 else 1
+    return [" ".join(chunk.split()[:8]) for chunk in corpus[::step]]
+
+
+def embed(model_name: str, backend: str, texts: list[str], onnx_file: str | None) -> tuple[np.ndarray, dict]:
+    """
+    Loads a model with a backend and embeds the texts, returning normalized vectors and timings.
+    """
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    embedding_function = load_embedding_function(model_name, backend, onnx_file=onnx_file)
+    load_seconds = time.perf_counter() - start
+    rss_model = rss_mb() - rss_before
+
+    start = time.perf_counter()
+    vectors = np.asarray(embedding_function(texts), dtype=np.float32)
+    embed_seconds = time.perf_counter() - start
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return vectors, {
+        "load_seconds": round(load_seconds, 2),
+        "model_rss_mb": round(rss_model, 1),
+        "texts_per_second": round(len(texts) / embed_seconds, 1),
+    }
+
+
+def top_k(corpus_codes: np.ndarray, scales: np.ndarray | None, queries: np.ndarray, k: int) -> list[set]:
+    return [set(np.argsort(-dot(corpus_codes, scales, query), kind="stable")[:k]) for query in queries]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--model", default="all-mpnet-base-v2")
+    parser.add_argument("--backend", choices=EMBEDDING_BACKENDS, default="int8")
+    parser.add_argument("--onnx-file", default=None, help="ONNX file of the model repository (onnx backend)")
+    parser.add_argument("--storage-dtype", choices=STORAGE_DTYPES, default="float32")
+    parser.add_argument("--corpus", default=None, help="File or directory of documents (default: built-in sample)")
+    parser.add_argument("--queries", default=None, help="Text file with one query per line")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--output", default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    queries = load_queries(args.queries, corpus)
+    k = min(args.k, len(corpus))
+
+    # The candidate is loaded first so its memory is measured before the baseline's.
+    candidate_corpus, candidate_stats = embed(args.model, args.backend, corpus + queries, args.onnx_file)
+    baseline_corpus, baseline_stats = embed(args.model, "torch", corpus + queries, None)
+    candidate_queries, candidate_corpus = candidate_corpus[len(corpus):], candidate_corpus[:len(corpus)]
+    baseline_queries, baseline_corpus = baseline_corpus[len(corpus):], baseline_corpus[:len(corpus)]
+
+    codes, scales = quantize(candidate_corpus, args.storage_dtype)
+    expected = top_k(baseline_corpus, None, baseline_queries, k)
+    found = top_k(codes, scales, candidate_queries, k)
+    recall = float(np.mean([len(e & f) / k for e, f in zip(expected, found)]))
+
+    report(
+        {
+            "model": args.model,
+            "backend": args.backend,
+            "storage_dtype": args.storage_dtype,
+            "corpus_chunks": len(corpus),
+            "queries": len(queries),
+            "k": k,
+            f"recall@{k}": round(recall, 4),
+            "vector_bytes": {"baseline": int(baseline_corpus.nbytes), "candidate": int(codes.nbytes)},
+            "baseline": baseline_stats,
+            "candidate": candidate_stats,
+        },
+        args.output,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import hashlib
+import time
+from typing import List, Sequence
+
+import numpy as np
+
+
+class FakeEmbeddingFunction:
+    """
+    A deterministic stand-in for an embedding model.
+
+    Each text is mapped to a unit vector drawn from a generator seeded with the
+    text's hash, so the same text always gets the same vector and different texts
+    get nearly orthogonal ones. ``seconds_per_text`` simulates the model's cost.
+
+    With ``weights_mb`` the function also holds a weight matrix of that size, and a
+    text's vector is the normalized sum of the rows its words hash to, so every call
+    reads the weights the way a model's inference does. This stands in for a model's
+    memory footprint, e.g. to measure how much of it forked workers share.
+    """
+
+    def __init__(self, dimensions: int = 768, seconds_per_text: float = 0.0, weights_mb: float = 0):
+        """
+        Args:
+            dimensions (int): Size of the vectors; 768 matches all-mpnet-base-v2.
+            seconds_per_text (float): Time spent per text, to simulate inference.
+            weights_mb (float): Size of the simulated weights in MiB (0: no weights).
+        """
+        self.dimensions = dimensions
+        self.seconds_per_text = seconds_per_text
+        self.model_name = "fake"
+        self.weights = None
+        if weights_mb:
+            rows = max(int(weights_mb * 1024 * 1024 / (4 * dimensions)), 1)
+            self.weights = np.random.default_rng(0).standard_normal((rows, dimensions), dtype=np.float32)
+
+    def _seed(self, text: str) -> int:
+        return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+
+    def __call__(self, input: Sequence[str]) -> List[List[float]]:
+        texts = list(input)
+        if self.seconds_per_text:
+            time.sleep(self.seconds_per_text * len(texts))
+        vectors = []
+        for text in texts:
+            if self.weights is not None:
+                rows = [self._seed(word) % len(self.weights) for word in text.split() or [text]]
+                vector = self.weights[rows].sum(axis=0)
+            else:
+                vector = np.random.default_rng(self._seed(text)).standard_normal(self.dimensions).astype(np.float32)
+            vectors.append((vector / np.linalg.norm(vector)).tolist())
+        return vectors
@@ -0,0 +1,366 @@
+"""
+Load test of the API's hot paths against a stub Ollama and a fake embedding model.
+
+By default the API runs in this process, served by uvicorn on a free port, with:
+
+- a local stub Ollama (``stub_ollama.py``) with configurable latency and token rate;
+- a deterministic fake embedding function (``fake_embeddings.py``) instead of the model;
+- background ingestion in a thread pool instead of spawned processes, so the fake
+  embedder is used there too;
+- all storage in a fresh working directory, and per-tenant rate limits lifted.
+  Settings can still be overridden with their environment variables.
+
+Each scenario (``ingest-docs``, ``chat``, ``get-theme``, ``get-escalations``) sends
+``--requests`` requests with ``--concurrency`` clients spread over ``--tenants``
+tenants and reports p50/p95/p99 latency, requests/s and status codes; the peak RSS
+of the process is reported at the end. With ``--baseline`` the results are compared
+with an earlier run and the exit status is 1 if p95 latency, throughput or peak RSS
+regressed by more than ``--max-regression``.
+
+Usage::
+
+    python -m ai_assistant.api.benchmarks.load_test --requests 500 --concurrency 32 \\
+        --output benchmarks/results/candidate.json --baseline benchmarks/results/main.json
+
+``--url`` runs the scenarios against an API that is already running instead; pass
+``--server-pid`` to report its peak RSS.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+from .common import peak_rss_mb, percentiles, report, run_metadata
+from .fake_embeddings import FakeEmbeddingFunction
+from .stub_ollama import StubOllama
+
+SCENARIOS = ("ingest-docs", "chat", "get-theme", "get-escalations")
+
+THEME = {"primaryColor": "#1f6feb", "fontFamily": "Inter", "logo": "https://example.com/logo.png"}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def configure_environment(ollama_url: str, concurrency: int):
+    """
+    Points the API settings at the stub and lifts the limits that would turn the load into 429s.
+
+    Must run before the API modules are imported, since settings are read at import time.
+    """
+    os.environ.setdefault("OLLAMA_BACKENDS", ollama_url)
+    os.environ.setdefault("RATE_LIMIT_REQUESTS_PER_MINUTE", str(10 ** 9))
+    os.environ.setdefault("RATE_LIMIT_BURST", str(10 ** 9))
+    os.environ.setdefault("MAX_CONCURRENT_GENERATIONS", str(concurrency))
+    # The stub is not bound by GPU memory like a real Ollama.
+    os.environ.setdefault("LLM_MAX_IN_FLIGHT", str(concurrency))
+    os.environ.setdefault("ALLOW_TENANT_ID_AS_API_KEY", "1")
+
+
+class InProcessServer:
+    """
+    Runs the API with a fake embedder and thread-pool ingestion under uvicorn, in a background thread.
+    """
+
+    def __init__(self, embed_seconds_per_text: float = 0.0):
+        import uvicorn
+
+        from ..config import settings
+        from ..services.ingest_jobs import IngestJobManager
+        from ..vector_data import registry
+
+        # Replaced before the API is imported, since the chat route loads its model at import.
+        fake = FakeEmbeddingFunction(seconds_per_text=embed_seconds_per_text)
+        registry.load_embedding_function = lambda model_name, backend="torch", onnx_file=None: fake
+
+        from .. import main
+
+        main.ingest_jobs = IngestJobManager(
+            max_workers=settings.ingest_workers,
+            per_tenant_limit=settings.ingest_max_per_tenant,
+            job_ttl=settings.ingest_job_ttl,
+            executor=ThreadPoolExecutor(settings.ingest_workers),
+        )
+        self.main = main
+        port = _free_port()
+        self.url = f"http://127.0.0.1:{port}"
+        self.server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("The API server failed to start")
+            time.sleep(0.01)
+
+    def seed_escalations(self, tenants: List[str], per_tenant: int):
+        from ..services.escalation_store import escalation_store
+
+        for tenant_id in tenants:
+            for number in range(per_tenant):
+                escalation_store.add(tenant_id, f"Question {number} needs a human", "This needs an escalation.")
+
+    def close(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def markdown_document(number: int, size_kb: int) -> bytes:
+    """
+    Returns a distinct Markdown document of about ``size_kb`` KiB.
+    """
+    sections, size, section = [], 0, 0
+    while size < size_kb * 1024:
+        text = (
+            f"## Topic {number}.{section}\n\n"
+            f"To configure feature {number}-{section}, open Settings and choose option {section}. "
+            f"Users need the can_edit_{section % 7} permission; errors E{400 + section % 30} mean the key is invalid.\n\n"
+        )
+        sections.append(text)
+        size += len(text)
+        section += 1
+    return f"# Manual {number}\n\n{''.join(sections)}".encode()
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, send: Callable[[int], Awaitable[tuple]], requests: int, concurrency: int
+) -> Dict:
+    """
+    Sends ``requests`` requests from ``concurrency`` concurrent clients and measures them.
+
+    Args:
+        client (httpx.AsyncClient): The client to send with.
+        send (Callable): Sends request number ``i``; returns its status code and, for
+            streams, the seconds until the first line arrived.
+        requests (int): Total number of requests.
+        concurrency (int): Number of requests in flight at a time.
+
+    Returns:
+        dict: Latency percentiles in milliseconds, requests/s and status codes.
+    """
+    latencies: List[float] = []
+    first_lines: List[float] = []
+    statuses: Counter = Counter()
+    indices = iter(range(requests))
+
+    async def worker():
+        for index in indices:
+            start = time.perf_counter()
+            try:
+                status, first_line = await send(index)
+            except httpx.HTTPError as e:
+                status, first_line = type(e).__name__, None
+            latencies.append(time.perf_counter() - start)
+            statuses[str(status)] += 1
+            if first_line is not None:
+                first_lines.append(first_line)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    def milliseconds(samples: List[float]) -> Dict:
+        values = {name: round(1000 * value, 2) for name, value in percentiles(samples).items()}
+        values["mean"] = round(1000 * sum(samples) / len(samples), 2) if samples else 0.0
+        return values
+
+    result = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(requests / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": milliseconds(latencies),
+        "status_codes": dict(sorted(statuses.items())),
+        "errors": sum(count for status, count in statuses.items() if not status.startswith(("2", "3"))),
+    }
+    if first_lines:
+        result["first_token_ms"] = milliseconds(first_lines)
+    return result
+
+
+async def run_load_test(url: str, args: argparse.Namespace) -> Dict:
+    """
+    Runs the selected scenarios against the API at ``url``.
+    """
+    tenants = [f"bench-tenant-{number}" for number in range(args.tenants)]
+
+    def headers(index: int) -> Dict:
+        return {"X-API-Key": tenants[index % len(tenants)]}
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+    results: Dict[str, Dict] = {}
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+        for tenant_id in tenants:
+            await client.post("/save-theme", json={"theme": THEME}, headers={"X-API-Key": tenant_id})
+
+        job_ids: List[tuple] = []
+
+        async def ingest(index: int):
+            files = {"file": (f"manual-{index}.md", markdown_document(index, args.doc_kb), "text/markdown")}
+            response = await client.post("/ingest-docs", files=files, headers=headers(index))
+            if response.status_code == 202:
+                job_ids.append((response.json()["job_id"], headers(index)))
+            return response.status_code, None
+
+        async def chat(index: int):
+            message = f"How do I configure feature {index % args.distinct_messages}-{index % 5}?"
+            body = {"message": message, "stream": args.stream}
+            if not args.stream:
+                response = await client.post("/chat", json=body, headers=headers(index))
+                return response.status_code, None
+            start, first_line = time.perf_counter(), None
+            async with client.stream("POST", "/chat", json=body, headers=headers(index)) as response:
+                async for line in response.aiter_lines():
+                    if line and first_line is None:
+                        first_line = time.perf_counter() - start
+            return response.status_code, first_line
+
+        async def get_theme(index: int):
+            response = await client.get("/get-theme", headers=headers(index))
+            return response.status_code, None
+
+        async def get_escalations(index: int):
+            response = await client.get("/get-escalations", params={"limit": 100}, headers=headers(index))
+            return response.status_code, None
+
+        senders = {"ingest-docs": ingest, "chat": chat, "get-theme": get_theme, "get-escalations": get_escalations}
+        for scenario in args.scenarios:
+            requests = args.ingest_requests if scenario == "ingest-docs" else args.requests
+            print(f"Running {scenario}: {requests} requests, concurrency {args.concurrency}", file=sys.stderr)
+            start = time.perf_counter()
+            results[scenario] = await run_scenario(client, senders[scenario], requests, args.concurrency)
+            if scenario == "ingest-docs":
+                # Chat is measured with the documents ingested, as in production.
+                results[scenario]["jobs"] = await wait_for_jobs(client, job_ids, args.timeout)
+                results[scenario]["jobs"]["seconds_to_complete"] = round(time.perf_counter() - start, 3)
+    return results
+
+
+async def wait_for_jobs(client: httpx.AsyncClient, job_ids: List[tuple], timeout: float) -> Dict:
+    """
+    Polls the ingestion jobs until they finish, and counts how they ended.
+    """
+    statuses: Counter = Counter()
+    deadline = time.monotonic() + timeout
+    for job_id, headers in job_ids:
+        while True:
+            job = (await client.get(f"/ingest-jobs/{job_id}", headers=headers)).json()
+            if job.get("status") in ("completed", "failed") or time.monotonic() > deadline:
+                statuses[job.get("status", "unknown")] += 1
+                break
+            await asyncio.sleep(0.05)
+    return dict(statuses)
+
+
+def compare(results: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """
+    Returns the regressions of a run compared with a baseline run.
+
+    A scenario regresses when its p95 latency grew, or its throughput dropped, by more
+    than ``max_regression`` (a fraction); the peak RSS is compared the same way.
+    """
+    regressions = []
+    for scenario, result in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(scenario)
+        if not base:
+            continue
+        p95, base_p95 = result["latency_ms"]["p95"], base["latency_ms"]["p95"]
+        if base_p95 and p95 > base_p95 * (1 + max_regression):
+            regressions.append(f"{scenario}: p95 latency {base_p95} ms -> {p95} ms")
+        rps, base_rps = result["requests_per_second"], base["requests_per_second"]
+        if base_rps and rps < base_rps * (1 - max_regression):
+            regressions.append(f"{scenario}: throughput {base_rps} -> {rps} requests/s")
+    rss, base_rss = results.get("peak_rss_mb"), baseline.get("peak_rss_mb")
+    if rss and base_rss and rss > base_rss * (1 + max_regression):
+        regressions.append(f"peak RSS {base_rss} MiB -> {rss} MiB")
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    import json
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--ingest-requests", type=int, default=20, help="Uploads in the ingest-docs scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--tenants", type=int, default=4)
+    parser.add_argument("--stream", action="store_true", help="Stream chat answers and measure the first token")
+    parser.add_argument("--distinct-messages", type=int, default=1000, help="Distinct chat messages (fewer means more cache hits)")
+    parser.add_argument("--doc-kb", type=int, default=32, help="Size of each uploaded document")
+    parser.add_argument("--escalations", type=int, default=200, help="Escalations seeded per tenant")
+    parser.add_argument("--ollama-latency", type=float, default=0.05, help="Stub seconds before the first token")
+    parser.add_argument("--ollama-token-rate", type=float, default=200, help="Stub tokens per second")
+    parser.add_argument("--ollama-tokens", type=int, default=20, help="Stub tokens per answer")
+    parser.add_argument("--embed-ms-per-text", type=float, default=0.0, help="Simulated embedding cost")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--url", default=None, help="Test a running API instead of starting one")
+    parser.add_argument("--server-pid", type=int, default=None, help="PID of the API at --url, for its peak RSS")
+    parser.add_argument("--workdir", default=None, help="Working directory of the in-process API (default: a temporary one)")
+    parser.add_argument("--output", default=None, help="Also write the results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="Results of an earlier run to compare with")
+    parser.add_argument("--max-regression", type=float, default=0.1, help="Tolerated regression, as a fraction")
+    args = parser.parse_args(argv)
+
+    # Paths are resolved before the in-process API changes the working directory.
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    metadata = run_metadata()
+
+    stub = server = None
+    try:
+        if args.url:
+            url = args.url
+        else:
+            stub = StubOllama(latency=args.ollama_latency, token_rate=args.ollama_token_rate, tokens=args.ollama_tokens)
+            configure_environment(stub.url, args.concurrency)
+            os.chdir(args.workdir or tempfile.mkdtemp(prefix="ai-assistant-load-test-"))
+            server = InProcessServer(embed_seconds_per_text=args.embed_ms_per_text / 1000)
+            if "get-escalations" in args.scenarios:
+                server.seed_escalations([f"bench-tenant-{n}" for n in range(args.tenants)], args.escalations)
+            url = server.url
+        scenarios = asyncio.run(run_load_test(url, args))
+    finally:
+        if server is not None:
+            server.close()
+        if stub is not None:
+            stub.close()
+
+    # In-process, the peak covers the API, the stub and the load generator.
+    peak_rss = peak_rss_mb(args.server_pid) if args.url else peak_rss_mb()
+    if args.url and args.server_pid is None:
+        peak_rss = None
+    options = {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "workdir")}
+    results = {
+        "benchmark": "load_test",
+        "metadata": metadata,
+        "options": options,
+        "scenarios": scenarios,
+        "peak_rss_mb": round(peak_rss, 1) if peak_rss is not None else None,
+    }
+    report(results, output)
+    if baseline is not None:
+        regressions = compare(results, baseline, args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,161 @@
+"""
+Measures the memory of forked API workers with and without embedding models shared by the master.
+
+Each mode forks ``--workers`` processes from this one, and every worker embeds
+``--texts`` questions the way a worker serving chats does:
+
+- ``per-worker``: every worker loads its own copy of the model after the fork, as with
+  ``uvicorn --workers`` or gunicorn without preloading;
+- ``prefork``: the model is loaded once before the fork and the heap is frozen, as in
+  the pre-fork serving mode (``gunicorn.conf.py``), so the workers share it copy-on-write.
+
+The RSS, PSS (shared pages divided among the processes sharing them) and private
+memory of every worker are read from ``/proc/<pid>/smaps_rollup``. RSS counts the
+shared pages in full in every worker; PSS and private memory show what a worker
+really costs, and the total PSS of the master and its workers what the node pays.
+
+The model is ``--model`` (default: the configured embedding model). ``--synthetic-mb``
+uses a fake model holding weights of that size instead, so the benchmark runs without
+sentence-transformers.
+
+Usage::
+
+    python -m ai_assistant.api.benchmarks.prefork_memory --workers 8 --output benchmarks/results/prefork.json
+
+Linux only.
+"""
+import argparse
+import gc
+import os
+from typing import Dict, List
+
+from .common import report, run_metadata
+from .fake_embeddings import FakeEmbeddingFunction
+from ..config import settings
+from ..services.prefork import freeze_shared_heap, preload_embedding_models
+from ..vector_data import registry
+
+MODES = ("per-worker", "prefork")
+
+SMAPS_FIELDS = ("Rss", "Pss", "Private_Clean", "Private_Dirty", "Shared_Clean", "Shared_Dirty")
+
+
+def memory_mb(pid: int) -> Dict[str, float]:
+    """
+    Returns the RSS, PSS, private and shared memory of a process in MiB.
+    """
+    values = dict.fromkeys(SMAPS_FIELDS, 0)
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            field, _, rest = line.partition(":")
+            if field in values:
+                values[field] = int(rest.split()[0])
+    return {
+        "rss_mb": round(values["Rss"] / 1024, 1),
+        "pss_mb": round(values["Pss"] / 1024, 1),
+        "private_mb": round((values["Private_Clean"] + values["Private_Dirty"]) / 1024, 1),
+        "shared_mb": round((values["Shared_Clean"] + values["Shared_Dirty"]) / 1024, 1),
+    }
+
+
+def _worker(model_name: str, texts: List[str], ready_fd: int, release_fd: int):
+    """
+    Body of a forked worker: embeds the texts, reports ready, and waits to be released.
+    """
+    status = b"1"
+    try:
+        registry.get_embedding_function(model_name)(texts)
+    except Exception:
+        status = b"!"
+    os.write(ready_fd, status)
+    # Returns once the parent closes its end of the pipe.
+    os.read(release_fd, 1)
+    os._exit(0 if status == b"1" else 1)
+
+
+def run_mode(mode: str, workers: int, model_name: str, texts: List[str]) -> Dict:
+    """
+    Forks the workers of one mode and measures their memory once they all embedded the texts.
+
+    Returns:
+        Dict: The memory of every worker and of the master, the per-worker averages and the total PSS.
+    """
+    registry.clear()
+    if mode == "prefork":
+        preload_embedding_models([model_name])
+        freeze_shared_heap()
+
+    ready_read, ready_write = os.pipe()
+    release_read, release_write = os.pipe()
+    pids = []
+    try:
+        for _ in range(workers):
+            pid = os.fork()
+            if pid == 0:
+                os.close(ready_read)
+                os.close(release_write)
+                _worker(model_name, texts, ready_write, release_read)
+            pids.append(pid)
+        statuses = b""
+        while len(statuses) < workers:
+            statuses += os.read(ready_read, workers - len(statuses))
+        if b"!" in statuses:
+            raise RuntimeError(f"A worker failed to embed with {model_name}")
+        worker_memory = [memory_mb(pid) for pid in pids]
+        master_memory = memory_mb(os.getpid())
+    finally:
+        os.close(release_write)
+        for pid in pids:
+            os.waitpid(pid, 0)
+        for fd in (ready_read, ready_write, release_read):
+            os.close(fd)
+        if mode == "prefork":
+            gc.unfreeze()
+        registry.clear()
+
+    averages = {
+        key: round(sum(memory[key] for memory in worker_memory) / workers, 1) for key in worker_memory[0]
+    }
+    return {
+        "workers": worker_memory,
+        "master": master_memory,
+        "per_worker_mb": averages,
+        "total_pss_mb": round(master_memory["pss_mb"] + sum(memory["pss_mb"] for memory in worker_memory), 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=4, help="Workers forked per mode")
+    parser.add_argument("--model", default=settings.embedding_model, help="Embedding model the workers load")
+    parser.add_argument("--synthetic-mb", type=float, default=0, help="Use a fake model with weights of this size")
+    parser.add_argument("--texts", type=int, default=32, help="Questions embedded by every worker")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--output", default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    if args.synthetic_mb:
+        registry.load_embedding_function = lambda model_name, backend="torch", onnx_file=None: (
+            FakeEmbeddingFunction(weights_mb=args.synthetic_mb)
+        )
+    texts = [f"How do I configure feature {n} of the API?" for n in range(args.texts)]
+    modes = {mode: run_mode(mode, args.workers, args.model, texts) for mode in args.modes}
+
+    results = {
+        "benchmark": "prefork_memory",
+        "metadata": run_metadata(),
+        "options": {k: v for k, v in vars(args).items() if k != "output"},
+        "modes": modes,
+    }
+    if set(MODES) <= set(modes):
+        before, after = modes["per-worker"], modes["prefork"]
+        results["savings_mb"] = {
+            "private_per_worker": round(before["per_worker_mb"]["private_mb"] - after["per_worker_mb"]["private_mb"], 1),
+            "total_pss": round(before["total_pss_mb"] - after["total_pss_mb"], 1),
+        }
+    report(results, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
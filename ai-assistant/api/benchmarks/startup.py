@@ -0,0 +1,129 @@
+"""
+Measures how long a worker takes to start: importing the API, then warming it up.
+
+The import of ``ai_assistant.api.main`` runs in a fresh interpreter with
+``python -X importtime``; the report lists the total import time, the slowest
+modules by cumulative time, and the self time per top-level package (fastapi,
+numpy, chromadb, ...) so a heavy dependency sneaking onto the import path shows up.
+With ``--warm-up`` another fresh interpreter imports the API and runs its warm-up,
+reporting each step's duration (the embedding model load is usually most of it).
+
+Usage::
+
+    python -m ai_assistant.api.benchmarks.startup --top 25 --max-import-seconds 2 \\
+        --output benchmarks/results/startup.json
+
+The exit status is 1 if the import takes longer than ``--max-import-seconds``.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from .common import report, run_metadata
+
+API_MODULE = "ai_assistant.api.main"
+
+WARM_UP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from ai_assistant.api import main
+imported = time.perf_counter()
+main.warmup.run()
+print(json.dumps({"import_seconds": imported - start, "warm_up_seconds": time.perf_counter() - imported,
+                  **main.warmup.status()}))
+"""
+
+
+def parse_importtime(output: str) -> List[Dict]:
+    """
+    Parses the ``-X importtime`` report of an interpreter.
+
+    Returns:
+        List[Dict]: One entry per imported module with its ``self_ms`` and ``cumulative_ms``,
+        in import order.
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return modules
+
+
+def measure_import(module: str = API_MODULE) -> Dict:
+    """
+    Imports a module in a fresh interpreter and reports the time spent per module.
+    """
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=os.environ.copy(),
+    )
+    wall_seconds = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+    modules = parse_importtime(completed.stderr)
+    packages = defaultdict(float)
+    for entry in modules:
+        packages[entry["module"].split(".")[0]] += entry["self_ms"]
+    target = next((entry for entry in modules if entry["module"] == module), None)
+    return {
+        "module": module,
+        "import_ms": target["cumulative_ms"] if target else None,
+        "interpreter_wall_seconds": round(wall_seconds, 3),
+        "modules_imported": len(modules),
+        "modules": modules,
+        "packages_ms": dict(sorted(((k, round(v, 1)) for k, v in packages.items()), key=lambda item: -item[1])),
+    }
+
+
+def measure_warm_up() -> Dict:
+    """
+    Imports the API and runs its warm-up in a fresh interpreter.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-c", WARM_UP_SCRIPT], capture_output=True, text=True, env=os.environ.copy()
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Warm-up failed:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--module", default=API_MODULE, help="The module whose import is measured")
+    parser.add_argument("--top", type=int, default=20, help="Slowest modules reported")
+    parser.add_argument("--warm-up", action="store_true", help="Also measure the warm-up steps")
+    parser.add_argument("--max-import-seconds", type=float, default=None, help="Fail if the import takes longer")
+    parser.add_argument("--output", default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    imports = measure_import(args.module)
+    slowest = sorted(imports.pop("modules"), key=lambda entry: -entry["cumulative_ms"])[: args.top]
+    results = {
+        "benchmark": "startup",
+        "metadata": run_metadata(),
+        "import": {**imports, "slowest_modules": slowest},
+    }
+    if args.warm_up:
+        results["warm_up"] = measure_warm_up()
+    report(results, args.output)
+
+    if args.max_import_seconds is not None and (imports["import_ms"] or 0) / 1000 > args.max_import_seconds:
+        print(f"REGRESSION importing {args.module} took {imports['import_ms']:.0f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,132 @@
+"""
+A local stand-in for Ollama's generate API with configurable latency and token rate.
+
+It answers ``POST /api/generate`` like Ollama, streamed or not, after waiting
+``latency`` seconds (prompt evaluation) and then producing ``tokens`` tokens at
+``token_rate`` tokens per second. No model is loaded, so the API's own overhead can
+be measured on any machine.
+
+Usage::
+
+    python -m ai_assistant.api.benchmarks.stub_ollama --port 11434 --latency 0.2 --token-rate 40
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubOllama:
+    """
+    Serves Ollama's generate API from a background thread.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.05,
+        token_rate: float = 200,
+        tokens: int = 20,
+        response_text: str = "ok",
+    ):
+        """
+        Starts the server.
+
+        Args:
+            host (str): Interface to listen on.
+            port (int): Port to listen on; 0 picks a free one.
+            latency (float): Seconds before the first token.
+            token_rate (float): Tokens produced per second; 0 produces them all at once.
+            tokens (int): Number of tokens of every answer.
+            response_text (str): The text of each token.
+        """
+        self.latency = latency
+        self.token_rate = token_rate
+        self.tokens = tokens
+        self.response_text = response_text
+        self.requests = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with stub._lock:
+                    stub.requests += 1
+                if self.path != "/api/generate":
+                    self.send_error(404)
+                    return
+                time.sleep(stub.latency)
+                delay = 1 / stub.token_rate if stub.token_rate else 0
+                counts = {
+                    "prompt_eval_count": len(payload.get("prompt", "").split()),
+                    "eval_count": stub.tokens,
+                    "prompt_eval_duration": int(stub.latency * 1e9),
+                    "eval_duration": int(delay * stub.tokens * 1e9),
+                    "total_duration": int((stub.latency + delay * stub.tokens) * 1e9),
+                }
+                if not payload.get("stream", True):
+                    time.sleep(delay * stub.tokens)
+                    body = json.dumps({
+                        "model": payload.get("model"), "response": " ".join([stub.response_text] * stub.tokens),
+                        "done": True, **counts,
+                    }).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for number in range(stub.tokens):
+                    time.sleep(delay)
+                    token = stub.response_text if number == 0 else " " + stub.response_text
+                    self._chunk(json.dumps({"model": payload.get("model"), "response": token, "done": False}))
+                self._chunk(json.dumps({"model": payload.get("model"), "response": "", "done": True, **counts}))
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _chunk(self, line: str):
+                data = (line + "\n").encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=200, help="Tokens per second (0: no delay)")
+    parser.add_argument("--tokens", type=int, default=20, help="Tokens per answer")
+    args = parser.parse_args()
+    stub = StubOllama(args.host, args.port, args.latency, args.token_rate, args.tokens)
+    print(f"Stub Ollama listening on {stub.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.close()
+
+
+if __name__ == "__main__":
+    main()
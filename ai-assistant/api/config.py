@@ -0,0 +1,187 @@
+import os
+
+
+class Settings:
+    """
+    Runtime configuration for the API.
+
+    Every value can be overridden with an environment variable so deployments
+    can be tuned without code changes.
+    """
+
+    def __init__(self):
+        """
+        Reads the settings from the environment, falling back to development defaults.
+        """
+        # Directory that relative data paths (uploads, escalations, ...) are resolved against.
+        self.root_path = os.environ.get("AI_ASSISTANT_ROOT", os.getcwd())
+
+        # Ollama connection settings.
+        self.ollama_url = os.environ.get("OLLAMA_URL", "http://localhost:11434")
+        self.ollama_model = os.environ.get("OLLAMA_MODEL", "llama2")
+        self.ollama_timeout = float(os.environ.get("OLLAMA_TIMEOUT", "120"))
+        self.ollama_connect_timeout = float(os.environ.get("OLLAMA_CONNECT_TIMEOUT", "5"))
+        self.ollama_max_connections = int(os.environ.get("OLLAMA_MAX_CONNECTIONS", "32"))
+        self.ollama_max_keepalive = int(os.environ.get("OLLAMA_MAX_KEEPALIVE", "8"))
+
+        # Ollama backends generations are balanced over: comma-separated URLs, each
+        # optionally followed by "=" and the "|"-separated models it serves. A backend
+        # is skipped for OLLAMA_CIRCUIT_COOLDOWN seconds after OLLAMA_FAILURE_THRESHOLD
+        # consecutive failures.
+        self.ollama_backends = os.environ.get("OLLAMA_BACKENDS", self.ollama_url)
+        self.ollama_failure_threshold = int(os.environ.get("OLLAMA_FAILURE_THRESHOLD", "3"))
+        self.ollama_circuit_cooldown = float(os.environ.get("OLLAMA_CIRCUIT_COOLDOWN", "30"))
+
+        # LLM request scheduling: generations running at once per backend, and the seconds a
+        # request may spend queued and generating before it is rejected.
+        self.llm_max_in_flight = int(os.environ.get("LLM_MAX_IN_FLIGHT", "2"))
+        self.llm_request_deadline = float(os.environ.get("LLM_REQUEST_DEADLINE", "120"))
+
+        # Prompt assembly. The context window and response budget are in tokens.
+        self.ollama_keep_alive = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+        self.prompt_context_window = int(os.environ.get("PROMPT_CONTEXT_WINDOW", "4096"))
+        self.prompt_max_response_tokens = int(os.environ.get("PROMPT_MAX_RESPONSE_TOKENS", "512"))
+        self.prompt_chars_per_token = float(os.environ.get("PROMPT_CHARS_PER_TOKEN", "4"))
+        self.retrieval_candidates = int(os.environ.get("RETRIEVAL_CANDIDATES", "6"))
+
+        # Vector storage: one root directory split into VECTOR_STORE_SHARDS Chroma
+        # shards, and the embedding model of new collections (existing collections
+        # keep the model recorded in their metadata).
+        self.vector_store_dir = os.environ.get("VECTOR_STORE_DIR", os.path.join("ai-assistant", "vector-data", "chroma"))
+        self.vector_store_shards = int(os.environ.get("VECTOR_STORE_SHARDS", "8"))
+        self.embedding_model = os.environ.get("EMBEDDING_MODEL", "all-mpnet-base-v2")
+
+        # Embedding inference: "torch" (full precision), "int8" (dynamically quantized)
+        # or "onnx" (ONNX Runtime, EMBEDDING_ONNX_FILE picks e.g. a pre-quantized export).
+        # EMBEDDING_STORAGE_DTYPE (float32, float16 or int8) applies to the embeddings
+        # kept in memory by the semantic cache.
+        self.embedding_backend = os.environ.get("EMBEDDING_BACKEND", "torch")
+        self.embedding_onnx_file = os.environ.get("EMBEDDING_ONNX_FILE", "")
+        self.embedding_storage_dtype = os.environ.get("EMBEDDING_STORAGE_DTYPE", "float32")
+
+        # Embedding models loaded by the gunicorn master in the pre-fork serving mode
+        # (gunicorn.conf.py), comma-separated. The workers forked from it share their
+        # weights instead of each loading a copy; list every model the collections use.
+        self.preload_embedding_models = [
+            name.strip() for name in os.environ.get("PRELOAD_EMBEDDING_MODELS", self.embedding_model).split(",")
+            if name.strip()
+        ]
+
+        # Hybrid retrieval: dense results are fused with the tenant's BM25 index (reciprocal
+        # rank fusion with constant RRF_K). HYBRID_RETRIEVAL=0 disables it. The index has
+        # one SQLite database per storage shard in LEXICAL_INDEX_DIR.
+        self.hybrid_retrieval = os.environ.get("HYBRID_RETRIEVAL", "1") == "1"
+        self.rrf_k = int(os.environ.get("RRF_K", "60"))
+        self.lexical_index_dir = os.environ.get(
+            "LEXICAL_INDEX_DIR", os.path.join("ai-assistant", "vector-data", "lexical")
+        )
+
+        # Index of the tenants' vector collections, and the seconds between checks
+        # for entries written by the ingestion workers.
+        self.collection_index_path = os.environ.get(
+            "COLLECTION_INDEX_PATH", os.path.join("ai-assistant", "vector-data", "collections.db")
+        )
+        self.collection_index_refresh_interval = float(os.environ.get("COLLECTION_INDEX_REFRESH_INTERVAL", "1"))
+
+        # Manifests of the ingested documents: content hash and chunk IDs per document.
+        self.manifest_db_path = os.environ.get(
+            "MANIFEST_DB_PATH", os.path.join("ai-assistant", "vector-data", "manifests.db")
+        )
+
+        # Operations of the tenants' OpenAPI specs, indexed by method and path. Specs of
+        # at least OPENAPI_STREAMING_MIN_BYTES are streamed with ijson when it is installed.
+        self.endpoint_index_path = os.environ.get(
+            "ENDPOINT_INDEX_PATH", os.path.join("ai-assistant", "vector-data", "endpoints.db")
+        )
+        self.openapi_streaming_min_bytes = int(os.environ.get("OPENAPI_STREAMING_MIN_BYTES", str(2 * 1024 * 1024)))
+
+        # Semantic answer cache. Set SEMANTIC_CACHE_ENABLED=0 to always call the LLM.
+        self.semantic_cache_enabled = os.environ.get("SEMANTIC_CACHE_ENABLED", "1") == "1"
+        self.semantic_cache_threshold = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+        self.semantic_cache_ttl = float(os.environ.get("SEMANTIC_CACHE_TTL", "3600"))
+        self.semantic_cache_max_entries = int(os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES", "512"))
+
+        # API key authentication. ALLOW_TENANT_ID_AS_API_KEY=1 treats unknown keys as
+        # tenant IDs, as before keys were provisioned: only turn it on while migrating,
+        # since any caller can then pick its tenant and evade the per-tenant limits.
+        # To migrate, issue a key per tenant (python -m ai_assistant.api.services.api_keys
+        # create <tenant_id>), hand it to the tenant's clients, then turn it off; rejected
+        # tenant IDs are logged as warnings. See "API keys" in ai-assistant/README.md.
+        self.api_keys_file = os.environ.get("API_KEYS_FILE", os.path.join("ai-assistant", "api", "data", "api_keys.json"))
+        self.api_key_cache_ttl = float(os.environ.get("API_KEY_CACHE_TTL", "60"))
+        self.allow_tenant_id_as_api_key = os.environ.get("ALLOW_TENANT_ID_AS_API_KEY", "0") == "1"
+
+        # Default per-tenant limits, overridable per tenant in the API key file.
+        self.rate_limit_requests_per_minute = float(os.environ.get("RATE_LIMIT_REQUESTS_PER_MINUTE", "600"))
+        self.rate_limit_burst = int(os.environ.get("RATE_LIMIT_BURST", "60"))
+        self.max_concurrent_generations = int(os.environ.get("MAX_CONCURRENT_GENERATIONS", "4"))
+
+        # Seconds between checks that a cached theme/permissions/orgs file is unchanged on disk.
+        self.config_cache_revalidate_interval = float(os.environ.get("CONFIG_CACHE_REVALIDATE_INTERVAL", "1"))
+
+        # Worker warm-up. With WARMUP_ON_STARTUP=1 every worker loads the embedding model
+        # (and, with WARMUP_LLM=1, asks Ollama to load its model) in the background as it
+        # starts, and /ready reports ready once that is done. With 0 the models are
+        # loaded by the first requests that need them.
+        self.warmup_on_startup = os.environ.get("WARMUP_ON_STARTUP", "1") == "1"
+        self.warmup_llm = os.environ.get("WARMUP_LLM", "1") == "1"
+
+        # Request metrics, served on /metrics and summarized in each response's
+        # Server-Timing header. METRICS_PER_TENANT=0 drops the tenant label, which
+        # keeps the number of series bounded on deployments with many tenants.
+        self.metrics_enabled = os.environ.get("METRICS_ENABLED", "1") == "1"
+        self.metrics_per_tenant = os.environ.get("METRICS_PER_TENANT", "1") == "1"
+
+        # LLM token usage, aggregated per tenant, model and minute from Ollama's
+        # responses and kept for USAGE_RETENTION_DAYS. The default token quotas (0: no
+        # quota) can be overridden per tenant with tokens_per_hour / tokens_per_day in
+        # the API key file; usage is re-read from the database every
+        # USAGE_QUOTA_REFRESH_INTERVAL seconds to include the other workers' generations.
+        self.usage_db_path = os.environ.get("USAGE_DB_PATH", os.path.join("ai-assistant", "api", "data", "usage.db"))
+        self.usage_retention_days = int(os.environ.get("USAGE_RETENTION_DAYS", "30"))
+        self.usage_tokens_per_hour = int(os.environ.get("USAGE_TOKENS_PER_HOUR", "0"))
+        self.usage_tokens_per_day = int(os.environ.get("USAGE_TOKENS_PER_DAY", "0"))
+        self.usage_quota_refresh_interval = float(os.environ.get("USAGE_QUOTA_REFRESH_INTERVAL", "5"))
+
+        # SQLite database holding the escalation log.
+        self.escalation_db_path = os.environ.get(
+            "ESCALATION_DB_PATH", os.path.join("ai-assistant", "api", "data", "escalations.db")
+        )
+
+        # Uploads are streamed to disk and rejected above this size.
+        self.max_upload_bytes = int(os.environ.get("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+        self.upload_chunk_size = int(os.environ.get("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+        # Background document ingestion.
+        self.ingest_workers = int(os.environ.get("INGEST_WORKERS", "2"))
+        self.ingest_max_per_tenant = int(os.environ.get("INGEST_MAX_PER_TENANT", "1"))
+        self.ingest_job_ttl = float(os.environ.get("INGEST_JOB_TTL", "3600"))
+        # Jobs and their progress, shared by the API workers so any of them can report on a job.
+        self.ingest_jobs_db_path = os.environ.get(
+            "INGEST_JOBS_DB_PATH", os.path.join("ai-assistant", "api", "data", "ingest_jobs.db")
+        )
+        self.ingest_embed_batch_size = int(os.environ.get("INGEST_EMBED_BATCH_SIZE", "64"))
+        self.ingest_staging_dir = os.environ.get(
+            "INGEST_STAGING_DIR", os.path.join("ai-assistant", "api", "vector-data", "staging")
+        )
+
+        # PDFs are split into ranges of PDF_PAGES_PER_RANGE pages parsed in parallel, with
+        # PDF_PARSE_WORKERS processes in all, shared between the INGEST_WORKERS. Extracted
+        # text is cached by content hash, up to PDF_TEXT_CACHE_MAX_MB.
+        self.pdf_parse_workers = int(os.environ.get("PDF_PARSE_WORKERS", "4"))
+        self.pdf_pages_per_range = int(os.environ.get("PDF_PAGES_PER_RANGE", "16"))
+        self.pdf_text_cache_dir = os.environ.get(
+            "PDF_TEXT_CACHE_DIR", os.path.join("ai-assistant", "vector-data", "pdf-text")
+        )
+        self.pdf_text_cache_max_mb = int(os.environ.get("PDF_TEXT_CACHE_MAX_MB", "512"))
+
+        # Offline bulk ingestion (vector-data/run_ingest.sh). BULK_INGEST_WORKERS=0 uses one
+        # parsing process per CPU.
+        self.bulk_ingest_workers = int(os.environ.get("BULK_INGEST_WORKERS", "0"))
+        self.bulk_ingest_batch_size = int(os.environ.get("BULK_INGEST_BATCH_SIZE", "256"))
+        self.bulk_ingest_checkpoint_dir = os.environ.get(
+            "BULK_INGEST_CHECKPOINT_DIR", os.path.join("ai-assistant", "vector-data", "checkpoints")
+        )
+
+
+settings = Settings()
@@ -0,0 +1,33 @@
+"""
+Gunicorn configuration of the pre-fork serving mode.
+
+Usage::
+
+    WEB_CONCURRENCY=8 gunicorn -c ai-assistant/api/gunicorn.conf.py
+
+The API is imported and the embedding models (PRELOAD_EMBEDDING_MODELS) are loaded
+once in the master process, then the uvicorn workers are forked from it and share
+the model weights copy-on-write instead of each loading a copy. Each worker still
+runs its warm-up after the fork (Chroma clients, databases, the Ollama model) and
+reports ready on /ready once done.
+
+``benchmarks/prefork_memory.py`` measures the memory per worker with and without
+the shared models.
+"""
+import os
+
+from ai_assistant.api.services.prefork import freeze_shared_heap, preload_embedding_models
+
+wsgi_app = "ai_assistant.api.main:app"
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", "4"))
+# Import the app in the master, so the workers inherit it instead of importing it.
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master once the app is imported, before the first worker is forked.
+    models = preload_embedding_models()
+    freeze_shared_heap()
+    server.log.info("Embedding models shared with the workers: %s", ", ".join(models))
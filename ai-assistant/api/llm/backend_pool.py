@@ -0,0 +1,165 @@
+import time
+from typing import Dict, Iterable, List
+
+
+class NoBackendAvailable(Exception):
+    """
+    Raised when no healthy backend serves the requested model.
+    """
+
+
+class Backend:
+    """
+    An Ollama server and the passive health state the pool keeps for it.
+    """
+
+    def __init__(self, url: str, models: Iterable[str] | None = None):
+        """
+        Args:
+            url (str): The base URL of the Ollama server.
+            models (Iterable[str]): The models it serves; None if it serves every model.
+        """
+        self.url = url.rstrip("/")
+        self.models = frozenset(models) if models else None
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0  # circuit is open (backend skipped) until this monotonic time
+        self.last_acquired = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def generate_url(self) -> str:
+        return f"{self.url}/api/generate"
+
+    def serves(self, model: str) -> bool:
+        return self.models is None or model in self.models
+
+
+def parse_backends(spec: str) -> List[Backend]:
+    """
+    Parses the backend list from the ``OLLAMA_BACKENDS`` setting.
+
+    Entries are separated by commas; each is a URL, optionally followed by ``=`` and
+    the ``|``-separated models the backend serves, e.g.
+    ``http://gpu-1:11434,http://gpu-2:11434=llama2:70b|mixtral``.
+
+    Args:
+        spec (str): The setting's value.
+
+    Returns:
+        List[Backend]: The backends, in the order given.
+    """
+    backends = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        url, _, models = entry.partition("=")
+        backends.append(Backend(url.strip(), [m.strip() for m in models.split("|") if m.strip()] or None))
+    return backends
+
+
+class BackendPool:
+    """
+    Spreads LLM requests over several Ollama backends.
+
+    A request goes to the healthy backend serving its model with the fewest requests
+    outstanding, so slow or busy backends receive less traffic. Backends are checked
+    passively: after ``failure_threshold`` consecutive failures (connection errors or
+    5xx responses) a backend's circuit opens and it is skipped for ``cooldown`` seconds.
+    After that a single trial request is let through; a success closes the circuit,
+    a failure opens it again.
+
+    Must only be used from one event loop.
+    """
+
+    def __init__(self, backends: List[Backend], failure_threshold: int = 3, cooldown: float = 30):
+        """
+        Args:
+            backends (List[Backend]): The Ollama backends.
+            failure_threshold (int): Consecutive failures that open a backend's circuit.
+            cooldown (float): Seconds an open circuit stays open before a trial request.
+        """
+        if not backends:
+            raise ValueError("At least one LLM backend is required")
+        self.backends = backends
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+    def _available(self, backend: Backend, now: float) -> bool:
+        if backend.consecutive_failures < self.failure_threshold:
+            return True
+        # Half-open: one trial request once the cooldown is over.
+        return now >= backend.open_until and backend.outstanding == 0
+
+    def acquire(self, model: str, exclude: Iterable[Backend] = ()) -> Backend:
+        """
+        Picks the backend for a request and counts the request as outstanding on it.
+
+        Args:
+            model (str): The model the request is for.
+            exclude (Iterable[Backend]): Backends already tried for this request.
+
+        Returns:
+            Backend: The chosen backend; hand it back with ``release``.
+
+        Raises:
+            NoBackendAvailable: If no backend serving the model is available.
+        """
+        now = time.monotonic()
+        excluded = set(exclude)
+        candidates = [
+            b for b in self.backends if b not in excluded and b.serves(model) and self._available(b, now)
+        ]
+        if not candidates:
+            raise NoBackendAvailable(f"No LLM backend available for model '{model}'")
+        # Least outstanding requests first; ties go to the least recently used backend.
+        backend = min(candidates, key=lambda b: (b.outstanding, b.last_acquired))
+        backend.outstanding += 1
+        backend.requests += 1
+        backend.last_acquired = now
+        return backend
+
+    def release(self, backend: Backend, healthy: bool = True):
+        """
+        Ends a request on a backend and records whether the backend handled it.
+
+        Args:
+            backend (Backend): The backend returned by ``acquire``.
+            healthy (bool): False if the backend failed (connection error or 5xx).
+        """
+        backend.outstanding -= 1
+        if healthy:
+            backend.consecutive_failures = 0
+            return
+        backend.failures += 1
+        backend.consecutive_failures += 1
+        if backend.consecutive_failures >= self.failure_threshold:
+            backend.open_until = time.monotonic() + self.cooldown
+
+    def candidates(self, model: str) -> int:
+        """
+        Returns how many backends serve a model, i.e. how often a request may be retried.
+        """
+        return sum(1 for b in self.backends if b.serves(model))
+
+    def stats(self) -> List[Dict]:
+        """
+        Returns the load and health of every backend.
+        """
+        now = time.monotonic()
+        return [
+            {
+                "url": b.url,
+                "models": sorted(b.models) if b.models is not None else None,
+                "outstanding": b.outstanding,
+                "requests": b.requests,
+                "failures": b.failures,
+                "circuit": (
+                    "closed" if b.consecutive_failures < self.failure_threshold
+                    else "open" if now < b.open_until else "half-open"
+                ),
+            }
+            for b in self.backends
+        ]
@@ -1,76 +1,330 @@
+import hashlib
 import json
-from typing import Dict
-import requests
+from typing import AsyncIterator, Dict, List
+import httpx
+from starlette.concurrency import run_in_threadpool
 
+from ..config import settings
+from .backend_pool import Backend, BackendPool, NoBackendAvailable, parse_backends
+from .prompt_builder import PromptBuilder
+from .scheduler import LlmScheduler, SchedulerTimeout
 from ..vector_data.vector_store import VectorStore
+from ..services.metrics import llm_tokens, tenant_label
+from ..services.usage import GenerationUsage, UsageTracker, usage_tracker
+
+
+def _is_backend_failure(error: httpx.HTTPError) -> bool:
+    """
+    Tells whether an error is the backend's fault (and another backend may succeed).
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
 class LlmClient:
     """
     A client for interacting with a Large Language Model (LLM), specifically Ollama.
+
+    Requests go through a single pooled ``httpx.AsyncClient`` so generations never
+    block the event loop and connections to Ollama are reused between requests.
+    Generations are spread over a pool of Ollama backends; a request that fails on
+    one backend is retried on the next. The token counts Ollama reports for every
+    generation are added to the tenant's usage.
     """
 
-    def __init__(self, model_name: str = "llama2"):
+    def __init__(
+        self,
+        model_name: str | None = None,
+        ollama_url: str | None = None,
+        vector_store: VectorStore | None = None,
+        backends: List[Backend] | None = None,
+        usage: UsageTracker | None = None,
+    ):
         """
         Initializes the LlmClient with the specified model name.
 
         Args:
-            model_name (str): The name of the model to use with Ollama (default: "llama2").
+            model_name (str): The default model to use with Ollama (default: settings.ollama_model).
+            ollama_url (str): The base URL of a single Ollama server to use instead of the configured backends.
+            vector_store (VectorStore): The vector store used for context retrieval (created on first use if omitted).
+            backends (List[Backend]): The Ollama backends (default: parsed from settings.ollama_backends).
+            usage (UsageTracker): Where the token usage of the generations is recorded (default: the shared tracker).
+        """
+        self.model_name = model_name or settings.ollama_model
+        if backends is None:
+            backends = [Backend(ollama_url)] if ollama_url else parse_backends(settings.ollama_backends)
+        self.backends = BackendPool(
+            backends,
+            failure_threshold=settings.ollama_failure_threshold,
+            cooldown=settings.ollama_circuit_cooldown,
+        )
+        self._http_client: httpx.AsyncClient | None = None
+        self.usage = usage or usage_tracker
+        self._vector_store = vector_store
+        self.prompt_builder = PromptBuilder(
+            context_window=settings.prompt_context_window,
+            max_response_tokens=settings.prompt_max_response_tokens,
+            chars_per_token=settings.prompt_chars_per_token,
+        )
+        # Every generation goes through the scheduler, which bounds the load on Ollama.
+        self.scheduler = LlmScheduler(
+            max_in_flight=settings.llm_max_in_flight * len(backends),
+            default_deadline=settings.llm_request_deadline,
+        )
+
+    @property
+    def vector_store(self) -> VectorStore:
+        """
+        The vector store used for context retrieval, shared across requests.
+        """
+        if self._vector_store is None:
+            self._vector_store = VectorStore()
+        return self._vector_store
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """
+        The connection-pooled HTTP client, created on first use.
+        """
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.ollama_timeout, connect=settings.ollama_connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=settings.ollama_max_connections,
+                    max_keepalive_connections=settings.ollama_max_keepalive,
+                ),
+            )
+        return self._http_client
+
+    async def aclose(self):
         """
-        self.model_name = model_name
-        self.ollama_url = "http://localhost:11434/api/generate"
+        Closes the pooled HTTP client. Called on application shutdown.
+        """
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    def preload(self, model: str | None = None) -> Dict[str, str]:
+        """
+        Asks every backend serving a model to load it, so the first question does not wait for it.
+
+        Ollama loads a model without generating anything when it receives a request
+        without a prompt. This runs during the warm-up, outside the event loop, so it
+        uses a short-lived synchronous client instead of the pooled one.
+
+        Args:
+            model (str): The model to load (default: the client's default model).
+
+        Returns:
+            Dict[str, str]: The outcome per backend URL: "loaded" or the error.
+        """
+        model = model or self.model_name
+        results = {}
+        with httpx.Client(timeout=httpx.Timeout(settings.ollama_timeout, connect=settings.ollama_connect_timeout)) as client:
+            for backend in self.backends.backends:
+                if not backend.serves(model):
+                    continue
+                try:
+                    client.post(
+                        backend.generate_url, json={"model": model, "keep_alive": settings.ollama_keep_alive}
+                    ).raise_for_status()
+                    results[backend.url] = "loaded"
+                except httpx.HTTPError as e:
+                    results[backend.url] = f"error: {e}"
+        return results
+
+    def _build_payload(self, message: str, context: list[tuple[str, float]], stream: bool, model: str | None = None) -> Dict:
+        """
+        Builds the request payload for Ollama's generate API.
+
+        The system prompt goes in Ollama's ``system`` field and stays byte-identical
+        between requests, and ``keep_alive`` keeps the model loaded, so Ollama can
+        reuse the processed prefix instead of evaluating it on every call.
+        """
+        # Construct the prompt by packing the retrieved context under the token budget.
+        prompt = self.prompt_builder.build(message, context)
+
+        return {
+            "model": model or self.model_name,
+            "system": prompt.system,
+            "prompt": prompt.prompt,
+            "stream": stream,
+            "keep_alive": settings.ollama_keep_alive,
+            "options": {
+                "num_ctx": self.prompt_builder.context_window,
+                "num_predict": self.prompt_builder.max_response_tokens,
+            },
+        }
 
-    def query(self, message: str, context: list[str]) -> str:
+    async def _record_usage(self, tenant_id: str, model: str, response: Dict):
+        """
+        Adds the token counts of a finished generation to the tenant's usage.
+        """
+        usage = GenerationUsage.from_response(response)
+        if usage is None:
+            return
+        tenant = tenant_label(tenant_id)
+        llm_tokens.inc(tenant, model, "prompt", amount=usage.prompt_tokens)
+        llm_tokens.inc(tenant, model, "completion", amount=usage.completion_tokens)
+        await run_in_threadpool(self.usage.record, tenant_id, model, usage)
+
+    async def _generate(self, tenant_id: str, payload: Dict) -> str:
+        """
+        Sends a non-streaming generation to the least loaded backend, failing over on backend errors.
+        """
+        tried, last_error = [], None
+        while True:
+            try:
+                backend = self.backends.acquire(payload["model"], exclude=tried)
+            except NoBackendAvailable:
+                if last_error is None:
+                    raise
+                raise last_error
+            healthy = True
+            try:
+                # Send a POST request to the Ollama API.
+                response = await self.http_client.post(backend.generate_url, json=payload)
+                response.raise_for_status()  # Raise an exception for bad status codes.
+
+                # Parse the response to extract the model's reply.
+                response_json = response.json()
+                await self._record_usage(tenant_id, payload["model"], response_json)
+                return response_json["response"]
+            except httpx.HTTPError as e:
+                healthy = not _is_backend_failure(e)
+                if healthy:
+                    raise
+                tried.append(backend)
+                last_error = e
+            finally:
+                self.backends.release(backend, healthy)
+
+    async def query(self, tenant_id: str, message: str, context: list[tuple[str, float]], model: str | None = None) -> str:
         """
         Queries the Ollama LLM with a given message and returns the model's response.
 
+        The request waits for a free slot in the scheduler; an identical request of the
+        same tenant that is already running is joined instead of generating twice.
+
         Args:
+            tenant_id (str): The ID of the tenant.
             message (str): The message to send to the LLM.
+            context (list[tuple[str, float]]): Retrieved ``(chunk, distance)`` pairs for the tenant.
+            model (str): The tenant's model, if it does not use the default one.
 
         Returns:
             str: The LLM's response to the message.
 
         Raises:
-            requests.exceptions.RequestException: If there's an error during the HTTP request to Ollama.
+            SchedulerTimeout: If the request's deadline passes while queued or generating.
+            NoBackendAvailable: If no healthy backend serves the model.
+            httpx.HTTPError: If there's an error during the HTTP request to Ollama.
             Exception: If there's any other error during processing.
-        """        
-        # Construct the prompt by combining the context and the message.
-        prompt = f"{' '.join(context)}\n\nUser: {message}"
-
+        """
         try:
-            # Prepare the request payload for Ollama's API.
-            payload = {
-                "model": self.model_name,
-                "prompt": message,
-                "stream": False,
-            }
-            # Send a POST request to the Ollama API.
-            response = requests.post(self.ollama_url, json=payload)
-            response.raise_for_status()  # Raise an exception for bad status codes.
-
-            # Parse the response to extract the model's reply.
-            response_json = response.json()
-            return response_json["response"]
-
-        except requests.exceptions.RequestException as e:
-            raise requests.exceptions.RequestException(f"Error communicating with Ollama: {e}")
+            payload = self._build_payload(message, context, stream=False, model=model)
+            payload_key = hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+            return await self.scheduler.run(tenant_id, payload_key, lambda: self._generate(tenant_id, payload))
+
+        except (SchedulerTimeout, NoBackendAvailable):
+            raise
+
+        except httpx.HTTPError as e:
+            raise httpx.HTTPError(f"Error communicating with Ollama: {e}")
 
         except Exception as e:
             raise Exception(f"An unexpected error occurred: {e}")
-        
-    def get_context(self, tenant_id: str) -> list[str]:
+
+    async def stream(
+        self, tenant_id: str, message: str, context: list[tuple[str, float]], model: str | None = None
+    ) -> AsyncIterator[str]:
         """
-        Retrieves the context for a given tenant ID.
+        Queries the Ollama LLM and yields the response tokens as Ollama produces them.
+
+        The generation holds a scheduler slot until the stream ends. A backend failure
+        before the first token fails over to another backend; later failures end the stream.
 
         Args:
             tenant_id (str): The ID of the tenant.
+            message (str): The message to send to the LLM.
+            context (list[tuple[str, float]]): Retrieved ``(chunk, distance)`` pairs for the tenant.
+            model (str): The tenant's model, if it does not use the default one.
 
-        Returns:
-            str: The context for the given tenant ID (currently empty).
+        Yields:
+            str: The next piece of the model's response.
+
+        Raises:
+            SchedulerTimeout: If no slot frees up before the request's deadline.
+            NoBackendAvailable: If no healthy backend serves the model.
+            httpx.HTTPError: If there's an error during the HTTP request to Ollama.
+            Exception: If Ollama reports an error in the middle of the stream.
+        """
+        payload = self._build_payload(message, context, stream=True, model=model)
+        try:
+            async with self.scheduler.slot(tenant_id):
+                tried, last_error = [], None
+                while True:
+                    try:
+                        backend = self.backends.acquire(payload["model"], exclude=tried)
+                    except NoBackendAvailable:
+                        if last_error is None:
+                            raise
+                        raise last_error
+                    healthy, started = True, False
+                    try:
+                        async with self.http_client.stream("POST", backend.generate_url, json=payload) as response:
+                            response.raise_for_status()
+                            # Ollama streams one JSON object per line.
+                            async for line in response.aiter_lines():
+                                if not line:
+                                    continue
+                                chunk = json.loads(line)
+                                if "error" in chunk:
+                                    raise Exception(f"Ollama returned an error: {chunk['error']}")
+                                token = chunk.get("response", "")
+                                if token:
+                                    started = True
+                                    yield token
+                                if chunk.get("done"):
+                                    # The last line carries the token counts of the generation.
+                                    await self._record_usage(tenant_id, payload["model"], chunk)
+                                    break
+                        return
+                    except httpx.HTTPError as e:
+                        healthy = not _is_backend_failure(e)
+                        if healthy or started:
+                            raise
+                        tried.append(backend)
+                        last_error = e
+                    finally:
+                        self.backends.release(backend, healthy)
+        except httpx.HTTPError as e:
+            raise httpx.HTTPError(f"Error communicating with Ollama: {e}")
+
+    def get_context(self, tenant_id: str, query: str, query_embedding: list[float] | None = None) -> list[tuple[str, float]]:
         """
-        # Initialize the vector store
-        vector_store = VectorStore()
+        Retrieves the document chunks most relevant to the user's message.
+
+        More candidates than fit in the prompt are fetched; the prompt builder
+        ranks them and packs the best ones under the token budget.
 
-        # Retrieve the context for the given tenant ID from the vector store
-        context = vector_store.query(query="", tenant_id=tenant_id)
+        Args:
+            tenant_id (str): The ID of the tenant.
+            query (str): The user's message.
+            query_embedding (list[float]): The embedding of ``query``, if already computed.
+
+        Returns:
+            list[tuple[str, float]]: The matching ``(chunk, distance)`` pairs for the tenant.
+        """
+        # Retrieve the context for the given tenant ID from the shared vector store
+        context = self.vector_store.query(
+            query=query,
+            tenant_id=tenant_id,
+            n_results=settings.retrieval_candidates,
+            query_embedding=query_embedding,
+            include_distances=True,
+        )
 
         # Return the context as a string
-        return context
\ No newline at end of file
+        return context
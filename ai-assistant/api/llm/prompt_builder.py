@@ -0,0 +1,142 @@
+import math
+import re
+from typing import Iterable, NamedTuple, Tuple
+
+DEFAULT_SYSTEM_PROMPT = (
+    "You are a helpful support assistant embedded in a web application. "
+    "Answer using the documentation excerpts provided. If they do not contain the answer, "
+    "say so and suggest opening a support escalation."
+)
+
+_WORD = re.compile(r"\w+")
+
+
+class Prompt(NamedTuple):
+    """
+    The parts of a prompt sent to Ollama.
+    """
+    system: str
+    prompt: str
+    context_tokens: int
+
+
+class PromptBuilder:
+    """
+    Assembles the prompt from the user's message and the retrieved chunks under a token budget.
+
+    Chunks are ranked by retrieval distance, near-duplicates are dropped and the rest
+    is packed greedily until the budget of the model's context window is used up.
+    The result only depends on the inputs, so identical requests produce identical
+    prompts and benefit from Ollama's prompt cache.
+    """
+
+    def __init__(
+        self,
+        context_window: int = 4096,
+        max_response_tokens: int = 512,
+        chars_per_token: float = 4.0,
+        duplicate_threshold: float = 0.8,
+        min_chunk_tokens: int = 32,
+        system_prompt: str = DEFAULT_SYSTEM_PROMPT,
+    ):
+        """
+        Args:
+            context_window (int): The model's context window, in tokens.
+            max_response_tokens (int): Tokens reserved for the answer.
+            chars_per_token (float): Characters per token used to estimate prompt sizes.
+            duplicate_threshold (float): Word-trigram Jaccard similarity above which a chunk is a near-duplicate.
+            min_chunk_tokens (int): Smallest truncated chunk worth including.
+            system_prompt (str): The system prompt, sent as Ollama's ``system`` field.
+        """
+        self.context_window = context_window
+        self.max_response_tokens = max_response_tokens
+        self.chars_per_token = chars_per_token
+        self.duplicate_threshold = duplicate_threshold
+        self.min_chunk_tokens = min_chunk_tokens
+        self.system_prompt = system_prompt
+
+    def estimate_tokens(self, text: str) -> int:
+        """
+        Estimates the number of tokens in a text from its length.
+        """
+        return math.ceil(len(text) / self.chars_per_token)
+
+    @staticmethod
+    def _shingles(text: str) -> frozenset:
+        words = _WORD.findall(text.lower())
+        if len(words) < 3:
+            return frozenset(words)
+        return frozenset(zip(words, words[1:], words[2:]))
+
+    def _is_duplicate(self, shingles: frozenset, selected: list) -> bool:
+        for other in selected:
+            union = len(shingles | other)
+            if union and len(shingles & other) / union >= self.duplicate_threshold:
+                return True
+        return False
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Cuts a text to roughly ``max_tokens`` tokens, at a word boundary.
+        """
+        cut = text[: int(max_tokens * self.chars_per_token)]
+        space = cut.rfind(" ")
+        return cut[:space] if space > 0 else cut
+
+    def select_chunks(self, chunks: Iterable[Tuple[str, float]], budget: int) -> list[str]:
+        """
+        Picks the chunks to include in the prompt.
+
+        Args:
+            chunks (Iterable[Tuple[str, float]]): ``(text, distance)`` pairs; lower distances rank first.
+            budget (int): Tokens available for the chunks.
+
+        Returns:
+            list[str]: The selected chunks, most relevant first.
+        """
+        # Sorting on the text as well makes ties deterministic.
+        ranked = sorted(chunks, key=lambda chunk: (chunk[1], chunk[0]))
+        selected, selected_shingles = [], []
+        for text, _ in ranked:
+            text = text.strip()
+            if not text:
+                continue
+            shingles = self._shingles(text)
+            if self._is_duplicate(shingles, selected_shingles):
+                continue
+            tokens = self.estimate_tokens(text) + 1  # separator
+            if tokens > budget:
+                if budget >= self.min_chunk_tokens:
+                    selected.append(self._truncate(text, budget - 1))
+                break
+            selected.append(text)
+            selected_shingles.append(shingles)
+            budget -= tokens
+        return selected
+
+    def build(self, message: str, chunks: Iterable[Tuple[str, float]], system_prompt: str | None = None) -> Prompt:
+        """
+        Builds the prompt for a chat message.
+
+        Args:
+            message (str): The user's message.
+            chunks (Iterable[Tuple[str, float]]): Retrieved ``(text, distance)`` pairs.
+            system_prompt (str): Overrides the default system prompt.
+
+        Returns:
+            Prompt: The system prompt, the prompt, and the estimated tokens used by the context.
+        """
+        system = system_prompt or self.system_prompt
+        question = f"Question: {message}\nAnswer:"
+        budget = (
+            self.context_window
+            - self.max_response_tokens
+            - self.estimate_tokens(system)
+            - self.estimate_tokens(question)
+            - 16  # headers and separators
+        )
+        selected = self.select_chunks(chunks, max(budget, 0))
+        if not selected:
+            return Prompt(system, question, 0)
+        context = "\n\n".join(selected)
+        return Prompt(system, f"Documentation:\n{context}\n\n{question}", self.estimate_tokens(context))
@@ -0,0 +1,209 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Deque, Dict, Hashable, TypeVar
+
+from ..services.metrics import record_stage
+
+T = TypeVar("T")
+
+
+class SchedulerTimeout(Exception):
+    """
+    Raised when a request's deadline passes before it gets a generation slot or a result.
+    """
+
+
+class _Generation:
+    """
+    A generation run for one or more identical requests.
+    """
+
+    def __init__(self):
+        self.task: asyncio.Task | None = None
+        # Number of requests waiting for the result.
+        self.waiters = 0
+        # Whether the generation got a slot.
+        self.started = False
+
+
+class LlmScheduler:
+    """
+    Bounds the number of in-flight LLM generations and queues the rest fairly.
+
+    Waiting requests are kept in one FIFO queue per tenant, and free slots are handed
+    out round-robin across tenants, so a burst from one tenant does not delay every
+    other tenant's requests. Identical requests of the same tenant that are already
+    running are coalesced and share the result of a single generation.
+
+    Must only be used from one event loop.
+    """
+
+    def __init__(self, max_in_flight: int = 2, default_deadline: float = 120, wait_samples: int = 1000):
+        """
+        Args:
+            max_in_flight (int): Maximum number of generations running at once.
+            default_deadline (float): Seconds a request may take, queueing included.
+            wait_samples (int): Number of recent queue wait times kept for the stats.
+        """
+        self.max_in_flight = max_in_flight
+        self.default_deadline = default_deadline
+        self._in_flight = 0
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._coalesced: Dict[Hashable, _Generation] = {}
+        self._waits: Deque[float] = deque(maxlen=wait_samples)
+        self._counters = {"dispatched": 0, "coalesced": 0, "timed_out": 0}
+
+    def _grant_next(self):
+        """
+        Gives free slots to the queued requests, one tenant at a time.
+        """
+        while self._in_flight < self.max_in_flight and self._queues:
+            tenant_id, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            if queue:
+                self._queues.move_to_end(tenant_id)
+            else:
+                del self._queues[tenant_id]
+            if waiter.done():
+                continue  # Cancelled or timed out while queued.
+            self._in_flight += 1
+            waiter.set_result(None)
+
+    async def _acquire(self, tenant_id: str, deadline: float | None):
+        start = time.monotonic()
+        if self._in_flight < self.max_in_flight and not self._queues:
+            self._in_flight += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._queues.setdefault(tenant_id, deque()).append(waiter)
+            try:
+                timeout = None if deadline is None else max(deadline - start, 0)
+                await asyncio.wait_for(asyncio.shield(waiter), timeout=timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                if waiter.done() and not waiter.cancelled():
+                    # The slot was granted just as we gave up; hand it on.
+                    self._release()
+                else:
+                    waiter.cancel()
+                if isinstance(e, asyncio.TimeoutError):
+                    self._counters["timed_out"] += 1
+                    raise SchedulerTimeout("Timed out waiting for a free LLM slot") from None
+                raise
+        wait = time.monotonic() - start
+        self._waits.append(wait)
+        record_stage("llm_queue", wait)
+        self._counters["dispatched"] += 1
+
+    def _release(self):
+        self._in_flight -= 1
+        self._grant_next()
+
+    @asynccontextmanager
+    async def slot(self, tenant_id: str, deadline: float | None = None):
+        """
+        Holds a generation slot for the duration of the ``async with`` block.
+
+        Args:
+            tenant_id (str): The ID of the tenant.
+            deadline (float): Absolute ``time.monotonic()`` by which the slot must be granted.
+
+        Raises:
+            SchedulerTimeout: If no slot frees up before the deadline.
+        """
+        await self._acquire(tenant_id, deadline or time.monotonic() + self.default_deadline)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def run(self, tenant_id: str, key: Hashable, factory: Callable[[], Awaitable[T]], timeout: float | None = None) -> T:
+        """
+        Runs a generation in a slot, or joins an identical one that is already running.
+
+        The generation runs in its own task, apart from the requests waiting for it:
+        each request only gives up on its own deadline or cancellation, and the
+        generation is cancelled, giving back its slot, once no request waits for it.
+
+        Args:
+            tenant_id (str): The ID of the tenant.
+            key (Hashable): Identifies identical requests (e.g. a hash of the payload); scoped to the tenant.
+            factory (Callable): Starts the generation.
+            timeout (float): Seconds the request may take in total (default: ``default_deadline``).
+
+        Returns:
+            The result of the generation.
+
+        Raises:
+            SchedulerTimeout: If the deadline passes before the result is available.
+        """
+        deadline = time.monotonic() + (timeout or self.default_deadline)
+        coalesce_key = (tenant_id, key)
+        generation = self._coalesced.get(coalesce_key)
+        if generation is None:
+            generation = _Generation()
+            generation.task = asyncio.ensure_future(self._generate(tenant_id, factory, generation))
+            self._coalesced[coalesce_key] = generation
+            generation.task.add_done_callback(lambda task: self._generation_done(coalesce_key, generation))
+        else:
+            self._counters["coalesced"] += 1
+        generation.waiters += 1
+        try:
+            return await self._wait_result(generation.task, deadline)
+        except SchedulerTimeout:
+            if not generation.started:
+                self._counters["timed_out"] += 1
+                raise SchedulerTimeout("Timed out waiting for a free LLM slot") from None
+            raise
+        finally:
+            generation.waiters -= 1
+            if not generation.waiters:
+                # Do not keep generating, or queueing, for nobody; the slot is given back before returning.
+                if self._coalesced.get(coalesce_key) is generation:
+                    del self._coalesced[coalesce_key]
+                generation.task.cancel()
+                await asyncio.wait([generation.task])
+
+    async def _generate(self, tenant_id: str, factory: Callable[[], Awaitable[T]], generation: "_Generation") -> T:
+        # Queues without a deadline of its own: it is cancelled when its last request gives up.
+        await self._acquire(tenant_id, None)
+        generation.started = True
+        try:
+            return await factory()
+        finally:
+            self._release()
+
+    def _generation_done(self, coalesce_key: Hashable, generation: "_Generation"):
+        if self._coalesced.get(coalesce_key) is generation:
+            del self._coalesced[coalesce_key]
+        if not generation.task.cancelled():
+            # Mark the exception as retrieved when every request gave up before it.
+            generation.task.exception()
+
+    @staticmethod
+    async def _wait_result(future: Awaitable[T], deadline: float) -> T:
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            raise SchedulerTimeout("Timed out waiting for the LLM response") from None
+
+    def stats(self) -> Dict:
+        """
+        Returns the current queue depth and recent queue wait times, for capacity planning.
+        """
+        waits = sorted(self._waits)
+
+        def percentile(p: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 2)
+
+        return {
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": sum(len(queue) for queue in self._queues.values()),
+            "queue_depth_by_tenant": {tenant_id: len(queue) for tenant_id, queue in self._queues.items()},
+            "wait_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "p99": percentile(0.99), "max": percentile(1.0)},
+            **self._counters,
+        }
@@ -1,95 +1,218 @@
 import os
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.routing import APIRoute
-import json
-from starlette.status import HTTP_401_UNAUTHORIZED
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.status import HTTP_401_UNAUTHORIZED, HTTP_403_FORBIDDEN, HTTP_429_TOO_MANY_REQUESTS
 from typing import Annotated
 
+from .services.api_keys import api_key_store
+from .services.rate_limiter import request_limiter, retry_after_header
+from .services.metrics import MetricsMiddleware, metrics, span
+from .services.uploads import UploadSizeMiddleware
+from .services.warmup import warmup
+from .config import settings
+
 app = FastAPI()
 
+# Probes come from the orchestrator, which has no API key.
+UNAUTHENTICATED_PATHS = {"/health", "/ready"}
+
+def is_admin_path(path: str) -> bool:
+    # These report on every tenant, so they need an admin key.
+    return path.startswith("/admin/") or path == "/metrics"
+
 def get_tenant_id(request: Request):
     return request.state.tenant_id
 
 
 async def api_key_middleware(request: Request, call_next):
-    api_key = request.headers.get("X-API-Key")
-    if not api_key:
-        raise HTTPException(
-            status_code=HTTP_401_UNAUTHORIZED, detail="Missing API Key"
+    if request.url.path in UNAUTHENTICATED_PATHS:
+        return await call_next(request)
+
+    with span("auth"):
+        api_key = request.headers.get("X-API-Key")
+        if not api_key:
+            return JSONResponse(status_code=HTTP_401_UNAUTHORIZED, content={"detail": "Missing API Key"})
+
+        # Resolved keys are cached in memory, this does no disk I/O on the hot path
+        auth = api_key_store.resolve(api_key)
+        if auth is None:
+            return JSONResponse(status_code=HTTP_401_UNAUTHORIZED, content={"detail": "Invalid API Key"})
+        if is_admin_path(request.url.path) and not auth.admin:
+            return JSONResponse(status_code=HTTP_403_FORBIDDEN, content={"detail": "Admin API Key required"})
+        request.state.tenant_id = auth.tenant_id
+        request.state.tenant_limits = auth.limits
+
+        per_minute = auth.limits.get("requests_per_minute")
+        retry_after = request_limiter.try_acquire(
+            auth.tenant_id, rate=per_minute / 60 if per_minute else None, burst=auth.limits.get("burst")
         )
-    
-    if api_key == "test-key":
-        request.state.tenant_id = "test-tenant"
-    else:
-        request.state.tenant_id = api_key  # Assuming API key is the tenant ID for now
-    
+        if retry_after:
+            return JSONResponse(
+                status_code=HTTP_429_TOO_MANY_REQUESTS,
+                content={"detail": "Rate limit exceeded"},
+                headers=retry_after_header(retry_after),
+            )
+
     response = await call_next(request)
     return response
 
+# Innermost, so it counts the body bytes the routes actually read.
+app.add_middleware(UploadSizeMiddleware)
 app.middleware("http")(api_key_middleware)
+# Added last so it is the outermost middleware and times authentication too.
+app.add_middleware(MetricsMiddleware)
 
 from .routes import chat, ingest_docs  # Import after middleware setup
 
 app.include_router(chat.router)
 app.include_router(ingest_docs.router)
 
-from .services.api_parser import ApiParser
-from .vector_data.ingest_docs import process_file
+# Importing the routes loads no model; the warm-up does, ahead of the traffic.
+warmup.add_step("embedding_model", chat.vector_store.warm_up)
+if settings.warmup_llm:
+    # Ollama being unreachable is handled per request, it does not make the worker unready.
+    warmup.add_step("llm_model", chat.llm_client.preload, required=False)
+
+@app.on_event("startup")
+async def start_warm_up():
+    if settings.warmup_on_startup:
+        warmup.start()
+
+@app.get("/health")
+async def health():
+    """
+    Liveness probe: the worker is up, possibly still warming up.
+    """
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def readiness():
+    """
+    Readiness probe: 200 once the worker's warm-up succeeded, 503 while it is
+    running or if it failed, with the outcome and duration of each step.
+    """
+    status = warmup.status()
+    if warmup.state == "pending" and not settings.warmup_on_startup:
+        # Without warm-up the models are loaded by the first requests.
+        return status
+    return JSONResponse(status_code=200 if warmup.ready else 503, content=status)
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    # Release the pooled connections to Ollama.
+    await chat.llm_client.aclose()
+
+from .services.ingest_jobs import ingest_jobs
+from .vector_data.collection_index import collection_index
+from .vector_data.endpoint_index import endpoint_index
+from .vector_data.manifests import delete_document, document_manifests
+from .services.semantic_cache import semantic_cache
+from starlette.concurrency import run_in_threadpool
+from .services.uploads import save_upload
+from .services.config_cache import config_cache, conditional_json_response
+import uuid
+
+@app.on_event("shutdown")
+async def stop_ingest_workers():
+    ingest_jobs.shutdown()
 
 @app.get("/list-files")
 async def list_files(request: Request):
+    """
+    Lists the tenant's ingested documents from their manifests.
+    """
     tenant_id = get_tenant_id(request)
-    upload_dir = os.path.join(os.getcwd(), "ai-assistant", "api", "vector-data", "uploads", tenant_id)
-    if not os.path.exists(upload_dir):
-        return {"files": []}
-    try:
-        files = [{"name": f, "size": os.path.getsize(os.path.join(upload_dir, f))} for f in os.listdir(upload_dir) if os.path.isfile(os.path.join(upload_dir, f))]
-    except FileNotFoundError:
-        return {"files": []}
+    documents = await run_in_threadpool(document_manifests.list, tenant_id)
+    files = [
+        {"name": d.name, "size": d.size, "chunks": d.chunk_count, "ingested_at": d.ingested_at}
+        for d in documents
+    ]
     return {"files": files}
 
+@app.delete("/documents/{file_name}")
+async def delete_document_endpoint(request: Request, file_name: str):
+    """
+    Deletes an ingested document and the chunks no other document of the tenant shares.
+    """
+    tenant_id = get_tenant_id(request)
+    result = await run_in_threadpool(delete_document, tenant_id, file_name)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    # Cached answers may be based on the deleted document.
+    semantic_cache.invalidate(tenant_id)
+    return {"message": f"Document '{file_name}' deleted.", **result}
+
 @app.post("/ingest-docs")
 async def ingest_docs_endpoint(request: Request):
+    # Bodies over the upload limit are rejected by UploadSizeMiddleware as they arrive.
     form_data = await request.form()
     file = form_data["file"]
-    file_content = await file.read()
     file_name = file.filename
+    tenant_id = get_tenant_id(request)
+
+    # Stream the upload to the staging area instead of holding it in memory
+    staging_dir = os.path.join(settings.ingest_staging_dir, tenant_id)
+    staged_path = os.path.join(staging_dir, f"{uuid.uuid4().hex}_{os.path.basename(file_name)}")
+    await save_upload(file, staged_path)
+
+    # Queue the file for background ingestion; OpenAPI specs are embedded one operation per chunk
+    job_id = await ingest_jobs.submit(tenant_id, [(staged_path, file_name)])
+    return JSONResponse(
+        status_code=202,
+        content={"message": f"File '{file_name}' queued for ingestion.", "job_id": job_id, "status": "queued"},
+    )
+
+@app.get("/ingest-jobs/{job_id}")
+async def get_ingest_job(request: Request, job_id: str):
+    """
+    Reports the progress of a background ingestion job: pages parsed, chunks
+    embedded and failures for each file.
+    """
+    job = await run_in_threadpool(ingest_jobs.get_job, job_id, get_tenant_id(request))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job
+
+@app.get("/api-endpoints")
+async def lookup_api_endpoint(request: Request, method: str, path: str):
+    """
+    Looks up the operation of the tenant's API specs a call was made to, for
+    example when the SDK reports a failing call. ``path`` may be a full URL.
+    """
+    record = await run_in_threadpool(endpoint_index.lookup, get_tenant_id(request), method, path)
+    if record is None:
+        raise HTTPException(status_code=404, detail="No operation matches this call")
+    return record
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """
+    Exposes the request latencies, per-stage timings and chat counters in the
+    Prometheus text format.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
-    # Check if the uploaded file is a JSON file (likely an API spec)
-    if file_name.endswith(".json"):
-        api_parser = ApiParser()
-        try:
-            # Attempt to parse the file content as an OpenAPI specification
-            parsed_api = api_parser.parse_openapi(file_content.decode())
-            if "error" not in parsed_api:
-                # If parsing was successful, save the parsed API summary to a new JSON file
-                tenant_id = get_tenant_id(request)
-                parsed_file_name = f"parsed_api_{os.path.splitext(file_name)[0]}.json"  # Create a new file name
-                upload_dir = os.path.join(os.getcwd(), "ai-assistant", "api", "vector-data", "uploads", tenant_id)
-                os.makedirs(upload_dir, exist_ok=True) # Ensure the directory exists
-                file_path = os.path.join(upload_dir, parsed_file_name)
-                with open(file_path, "w") as f:
-                    json.dump(parsed_api, f, indent=4)  # Save the parsed API data as JSON
-                return {"message": f"Successfully parsed and saved API specification from {file_name}", "api_summary": parsed_api}
-            else:
-                return {"error": f"Failed to parse OpenAPI specification from {file_name}: {parsed_api.get('error')}"}
-        except Exception as e:
-            return {"error": f"An unexpected error occurred while parsing {file_name}: {str(e)}"}
-
-    return await process_file(file_content, file_name, get_tenant_id(request)) # If not a JSON or parsing fails, process normally
+@app.get("/admin/collections")
+async def collection_stats():
+    """
+    Lists the tenants' vector collections with their chunk counts, last ingestion
+    time and embedding model.
+    """
+    return await run_in_threadpool(collection_index.stats)
 
 from .routes import permissions
 app.include_router(permissions.router)
 
 @app.get("/list-orgs")
-async def list_orgs():
+async def list_orgs(request: Request):
     orgs_file = "ai-assistant/admin-portal/pages/api/orgs.json"
-    if os.path.exists(orgs_file):
-        with open(orgs_file, "r") as f:
-            orgs = json.load(f)
-        return orgs
-    return []
+    orgs, etag = config_cache.read(orgs_file)
+    if orgs is None:
+        return []
+    return conditional_json_response(request, orgs, etag)
 # Import the ThemeManager class
+from pydantic import BaseModel
 from .services.theme_manager import ThemeManager
 
 # Initialize the ThemeManager
@@ -123,28 +246,42 @@ async def save_theme(request: Request, theme_data: ThemeData):
 async def get_theme(request: Request):
     """
     Retrieves the theme data for a specific tenant.
+    Responds 304 without a body if the If-None-Match header matches the current ETag.
     """
     tenant_id = get_tenant_id(request)
-    return theme_manager.get_theme(tenant_id)
+    theme, etag = theme_manager.get_theme_with_etag(tenant_id)
+    return conditional_json_response(request, theme, etag)
 # Define an endpoint to retrieve escalations for a specific tenant.
+from datetime import date
+from fastapi import Query, Response
+from .services.escalation_store import escalation_store
+
 @app.get("/get-escalations")
-async def get_escalations(request: Request):
+async def get_escalations(
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    after_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+):
     """
-    Retrieves the list of escalations for a specific tenant.
+    Retrieves one page of escalations for a specific tenant, oldest first.
     The tenant ID is extracted from the request's state, which should be
     populated by the api_key_middleware.
+    Args:
+        limit (int): Maximum number of records to return.
+        after_id (int): Return records after this ID; use the ``X-Next-After-Id`` header of the previous page.
+        start_date (date): Only return escalations from this day on.
+        end_date (date): Only return escalations up to and including this day.
     Returns:
         A list of escalation records for the tenant, or an empty list if
-        no escalations are found or if the file does not exist.
+        no escalations are found.
     """
     tenant_id = get_tenant_id(request)
-    escalation_file = f"ai-assistant/api/escalations/esc_{tenant_id}.json"
-    if os.path.exists(escalation_file):
-        try:
-            with open(escalation_file, "r") as f:
-                escalations = json.load(f)
-            return escalations
-        except json.JSONDecodeError:
-            raise HTTPException(status_code=500, detail="Error reading escalations file.")
-    return []
-
+    escalations = await run_in_threadpool(
+        escalation_store.list, tenant_id, limit=limit, after_id=after_id, start_date=start_date, end_date=end_date
+    )
+    if len(escalations) == limit:
+        response.headers["X-Next-After-Id"] = str(escalations[-1]["id"])
+    return escalations
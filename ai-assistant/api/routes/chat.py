@@ -1,8 +1,12 @@
 # chat.py
 from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import json, os
-from typing import Annotated
+from starlette.concurrency import run_in_threadpool
+import httpx
+import json
+import time
+from typing import Annotated, Callable
 
 # Import necessary services
 from ..llm.llm_client import LlmClient
@@ -13,13 +17,23 @@ router = APIRouter()
 # Define a Pydantic model for the request body
 class ChatRequest(BaseModel):
     message: str
+    # When true the response is streamed as newline-delimited JSON, one token per line.
+    stream: bool = False
 
 from ..llm.llm_client import LlmClient
+from ..llm.backend_pool import NoBackendAvailable
+from ..llm.scheduler import SchedulerTimeout
 from ..vector_data.vector_store import VectorStore
+from ..services.semantic_cache import semantic_cache
+from ..services.escalation_store import escalation_store
+from ..services.rate_limiter import generation_limiter, retry_after_header
+from ..services.usage import usage_tracker
+from ..services.metrics import cache_lookups, escalations_total, llm_errors, record_stage, span, tenant_label
+from ..config import settings
 
-# Initialize the LLM client and vector store
-llm_client = LlmClient()
+# Initialize the vector store and the LLM client that retrieves context from it
 vector_store = VectorStore()
+llm_client = LlmClient(vector_store=vector_store)
 
 
 # Function to check if the LLM response is related to escalation
@@ -38,6 +52,99 @@ def is_escalation_related(response: str) -> bool:
     return "escalation" in response.lower()
 
 
+def log_escalation(tenant_id: str, message: str, response: str):
+    """
+    Appends an escalation record to the tenant's escalation log.
+
+    Args:
+        tenant_id (str): The ID of the tenant.
+        message (str): The user's message.
+        response (str): The LLM response that triggered the escalation.
+    """
+    escalation_store.add(tenant_id, message, response)
+    escalations_total.inc(tenant_label(tenant_id))
+
+
+def count_llm_error(tenant_id: str, error: Exception):
+    """
+    Counts a failed generation in the LLM error metric, by kind of error.
+    """
+    if isinstance(error, SchedulerTimeout):
+        kind = "timeout"
+    elif isinstance(error, NoBackendAvailable):
+        kind = "no_backend"
+    elif isinstance(error, httpx.HTTPError):
+        kind = "http"
+    else:
+        kind = "other"
+    llm_errors.inc(tenant_label(tenant_id), kind)
+
+
+async def stream_cached(response: str):
+    """
+    Sends a cached answer in the same newline-delimited JSON format as a live stream.
+    """
+    yield json.dumps({"token": response}) + "\n"
+    yield json.dumps({"done": True, "cached": True}) + "\n"
+
+
+async def stream_chat(
+    tenant_id: str,
+    message: str,
+    context: list[tuple[str, float]],
+    query_embedding: list[float] | None,
+    model: str | None = None,
+):
+    """
+    Relays the LLM tokens to the client as newline-delimited JSON.
+
+    Each token is sent as ``{"token": ...}``; the last line is ``{"done": true}``,
+    or ``{"error": ...}`` if the generation failed part way through.
+    """
+    tokens = []
+    start = time.perf_counter()
+    try:
+        async for token in llm_client.stream(tenant_id=tenant_id, message=message, context=context, model=model):
+            if not tokens:
+                record_stage("llm_first_token", time.perf_counter() - start)
+            tokens.append(token)
+            yield json.dumps({"token": token}) + "\n"
+    except Exception as e:
+        count_llm_error(tenant_id, e)
+        # Headers are already sent, so the error has to be reported in-band.
+        yield json.dumps({"error": str(e)}) + "\n"
+        return
+    finally:
+        record_stage("llm", time.perf_counter() - start)
+
+    response = "".join(tokens)
+    if is_escalation_related(response):
+        with span("escalation"):
+            await run_in_threadpool(log_escalation, tenant_id, message, response)
+    elif query_embedding is not None:
+        await run_in_threadpool(semantic_cache.store, tenant_id, query_embedding, response)
+    yield json.dumps({"done": True}) + "\n"
+
+
+class ReleasingStreamingResponse(StreamingResponse):
+    """
+    A streaming response that calls ``release`` once it was sent or abandoned.
+
+    The generator's ``finally`` cannot do it: if the client disconnects before the
+    body is iterated, the generator never starts and its ``finally`` never runs.
+    """
+
+    def __init__(self, content, release: Callable[[], None], **kwargs):
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release()
+
+
 # Define the chat endpoint
 @router.post("/chat")
 async def chat_endpoint(
@@ -47,42 +154,114 @@ async def chat_endpoint(
     """
     Chat endpoint that receives a message and returns a response from the LLM,
     incorporating context from the vector store.
+    Set ``stream`` in the request body to receive the tokens as they are generated.
+    Answers to questions similar to a recently answered one are served from the
+    tenant's semantic cache without calling the LLM. Other questions are refused
+    with 429 once the tenant has used up its token quota.
     """
     try:
         # Get the tenant ID from the request context
         tenant_id = request.state.tenant_id
+        message = chat_request.message
+
+        # Embed the question once; the embedding is used for the cache and for retrieval.
+        # Embedding, vector search and the cache (which checks the collection index in
+        # SQLite) are blocking, so keep them off the event loop.
+        query_embedding = None
+        if settings.semantic_cache_enabled:
+            with span("embed"):
+                query_embedding = await run_in_threadpool(vector_store.embed, message)
+            with span("cache"):
+                cached = await run_in_threadpool(semantic_cache.lookup, tenant_id, query_embedding)
+            cache_lookups.inc(tenant_label(tenant_id), "miss" if cached is None else "hit")
+            if cached is not None:
+                if chat_request.stream:
+                    return StreamingResponse(stream_cached(cached), media_type="application/x-ndjson")
+                return {"response": cached, "cached": True}
+
+        # Refuse the generation early if the tenant has used up its token quota
+        tenant_config = getattr(request.state, "tenant_limits", {})
+        retry_after = await run_in_threadpool(usage_tracker.quota_retry_after, tenant_id, tenant_config)
+        if retry_after:
+            raise HTTPException(
+                status_code=429, detail="Token quota exceeded", headers=retry_after_header(retry_after)
+            )
+
         # Get the context using the LLMClient
-        context = llm_client.get_context(tenant_id=tenant_id)
+        with span("retrieval"):
+            context = await run_in_threadpool(
+                llm_client.get_context, tenant_id=tenant_id, query=message, query_embedding=query_embedding
+            )
+
+        # Cap the number of generations a tenant can have in flight
+        max_generations = tenant_config.get("max_concurrent_generations")
+        if not generation_limiter.try_acquire(tenant_id, limit=max_generations):
+            raise HTTPException(
+                status_code=429,
+                detail="Too many concurrent generations for this tenant",
+                headers=retry_after_header(1),
+            )
+
+        if chat_request.stream:
+            # The response releases the generation slot once the stream is sent or abandoned
+            return ReleasingStreamingResponse(
+                stream_chat(tenant_id, message, context, query_embedding, model=tenant_config.get("model")),
+                release=lambda: generation_limiter.release(tenant_id),
+                media_type="application/x-ndjson",
+            )
+
         # Query the LLM and get the response
-        response = llm_client.query(message=chat_request.message, context=context)
+        try:
+            with span("llm"):
+                response = await llm_client.query(
+                    tenant_id=tenant_id, message=message, context=context, model=tenant_config.get("model")
+                )
+        except Exception as e:
+            count_llm_error(tenant_id, e)
+            raise
+        finally:
+            generation_limiter.release(tenant_id)
 
         # Check if the response is related to escalation
         if is_escalation_related(response):
-            # Define the path for the escalation log file
-            escalation_file = f"ai-assistant/api/escalations/esc_{tenant_id}.json"
-            # Create the directory if it doesn't exist
-            os.makedirs(os.path.dirname(escalation_file), exist_ok=True)
-
-            # Prepare the escalation data
-            escalation_data = {
-                "message": chat_request.message,
-                "response": response,
-                "date": str(datetime.now())  # Using string for simplicity, consider a standard format
-            }
-
-            # Load existing escalations, or create a new list if the file doesn't exist
-            try:
-                with open(escalation_file, "r") as f:
-                    escalations = json.load(f)
-            except FileNotFoundError:
-                escalations = []
-            escalations.append(escalation_data)  # Add the new escalation
-
-            # Save the updated escalations back to the file
-            with open(escalation_file, "w") as f:
-                json.dump(escalations, f, indent=4)  # Use indent for pretty formatting
+            with span("escalation"):
+                await run_in_threadpool(log_escalation, tenant_id, message, response)
+        elif query_embedding is not None:
+            # Escalations are not cached so that every occurrence is logged.
+            await run_in_threadpool(semantic_cache.store, tenant_id, query_embedding, response)
         # Return the response to the user
         return {"response": response}
+    except HTTPException:
+        raise
+    except (SchedulerTimeout, NoBackendAvailable) as e:
+        # The LLM backend is saturated; tell the client to come back later
+        raise HTTPException(status_code=503, detail=str(e), headers=retry_after_header(5))
     except Exception as e:
         # Handle any exceptions and return an HTTP error
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/admin/llm-scheduler")
+async def llm_scheduler_stats():
+    """
+    Reports the LLM scheduler's in-flight generations, queue depth and recent queue wait times.
+    """
+    return llm_client.scheduler.stats()
+
+
+@router.get("/admin/llm-backends")
+async def llm_backend_stats():
+    """
+    Reports the outstanding requests, failures and circuit state of every LLM backend.
+    """
+    return llm_client.backends.stats()
+
+
+@router.get("/admin/llm-usage")
+async def llm_usage_stats(window: int = 3600, tenant_id: str | None = None):
+    """
+    Reports the prompt and completion tokens and the evaluation throughput of the
+    last ``window`` seconds per tenant and model, largest prompts first.
+    """
+    stats = await run_in_threadpool(usage_tracker.stats, window, tenant_id)
+    return {"window": window, "usage": stats}
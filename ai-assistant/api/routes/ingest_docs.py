@@ -1,7 +1,12 @@
+import logging
 import os
 from fastapi import APIRouter, File, UploadFile, HTTPException
 from fastapi.responses import JSONResponse
 
+from ..services.uploads import save_upload
+
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 @router.post("/")
@@ -14,12 +19,11 @@ async def ingest_docs_route(file: UploadFile = File(...)):
     if not os.path.exists(upload_dir):
         os.makedirs(upload_dir)
 
-    # Save the uploaded file
-    file_path = os.path.join(upload_dir, file.filename)
-    with open(file_path, "wb") as f:
-        f.write(file.file.read())
+    # Stream the uploaded file to disk, rejecting files over the upload limit
+    file_path = os.path.join(upload_dir, os.path.basename(file.filename))
+    await save_upload(file, file_path)
 
-    print(f"Saved file: {file.filename}")
+    logger.info("Saved file: %s", file.filename)
 
     return JSONResponse(
         status_code=200, content={"message": "File uploaded successfully", "filename": file.filename}
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException, Request
 from ai_assistant.api.services.permission_manager import PermissionManager
+from ai_assistant.api.services.config_cache import conditional_json_response
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -17,9 +18,10 @@ async def save_permissions(org_id: str, permissions: Permissions):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/get-permissions/{org_id}")
-async def get_permissions(org_id: str):
+async def get_permissions(request: Request, org_id: str):
     try:
-        permissions = permission_manager.get_permissions(org_id)
-        return permissions
+        permissions, etag = permission_manager.get_permissions_with_etag(org_id)
+        # Answer 304 without a body when the widget already has this version
+        return conditional_json_response(request, permissions, etag)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
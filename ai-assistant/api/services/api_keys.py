@@ -0,0 +1,221 @@
+import hashlib
+import logging
+import re
+import secrets
+import threading
+import time
+from typing import Dict, List, NamedTuple
+
+from ..config import settings
+from .config_cache import ConfigCache, config_cache
+
+logger = logging.getLogger(__name__)
+
+# Tenant IDs name files and directories (themes, staged uploads, checkpoints), so
+# only IDs that cannot escape a directory are accepted.
+TENANT_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]+")
+
+
+class TenantAuth(NamedTuple):
+    """
+    The tenant an API key belongs to, the limits that apply to it, and whether it may use the admin endpoints.
+    """
+    tenant_id: str
+    limits: Dict
+    admin: bool = False
+
+
+def is_valid_tenant_id(tenant_id: str | None) -> bool:
+    """
+    Returns whether a tenant ID is made only of letters, digits, "_" and "-".
+    """
+    return bool(tenant_id) and TENANT_ID_PATTERN.fullmatch(tenant_id) is not None
+
+
+def hash_api_key(api_key: str) -> str:
+    """
+    Returns the SHA-256 of an API key; only hashes are stored on disk.
+    """
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+class ApiKeyStore:
+    """
+    Resolves API keys to tenants.
+
+    Keys are kept in a JSON file of the form::
+
+        {
+            "keys": {"<sha256 of key>": {"tenant_id": "acme"},
+                     "<sha256 of another key>": {"tenant_id": "ops", "admin": true}},
+            "tenants": {"acme": {"requests_per_minute": 120, "burst": 20, "max_concurrent_generations": 4,
+                                 "model": "llama2:13b", "tokens_per_hour": 200000, "tokens_per_day": 2000000}}
+        }
+
+    ``model`` routes the tenant's chats to another Ollama model than the default;
+    ``tokens_per_hour`` and ``tokens_per_day`` are its LLM token quotas.
+    Only keys marked ``admin`` may read the endpoints that report on every tenant
+    (``/admin/*``, ``/metrics``); tenant IDs accepted as keys never are.
+    Resolved keys are kept in an in-process TTL cache so authenticating a request
+    does no disk I/O on the hot path. Unknown keys are cached too, for a shorter time,
+    and expired entries are swept at most once per ``cache_ttl``.
+
+    With ``allow_tenant_id_as_key`` off, rejected keys that could be tenant IDs are
+    logged, at most once per ``cache_ttl``, so clients still sending their tenant ID
+    show up while keys are being rolled out.
+    """
+
+    def __init__(
+        self,
+        keys_file: str | None = None,
+        cache_ttl: float | None = None,
+        allow_tenant_id_as_key: bool | None = None,
+        cache: ConfigCache = config_cache,
+    ):
+        """
+        Args:
+            keys_file (str): Path of the API key file (default: settings.api_keys_file).
+            cache_ttl (float): Seconds a resolved key is cached (default: settings.api_key_cache_ttl).
+            allow_tenant_id_as_key (bool): Accept unknown keys as tenant IDs, the behaviour before
+                API keys were introduced, while keys are being provisioned
+                (default: settings.allow_tenant_id_as_api_key).
+            cache (ConfigCache): The cache the key file is read through.
+        """
+        self.keys_file = keys_file or settings.api_keys_file
+        self.cache_ttl = settings.api_key_cache_ttl if cache_ttl is None else cache_ttl
+        self.allow_tenant_id_as_key = (
+            settings.allow_tenant_id_as_api_key if allow_tenant_id_as_key is None else allow_tenant_id_as_key
+        )
+        self.cache = cache
+        # api key hash -> (TenantAuth or None, expiry)
+        self._resolved: Dict[str, tuple] = {}
+        self._swept_at = time.monotonic()
+        self._lock = threading.Lock()
+        # Rejected keys that could be tenant IDs since the last warning.
+        self._rejected_tenant_ids = 0
+        self._warned_at: float | None = None
+
+    def _load(self) -> Dict:
+        data = self.cache.read(self.keys_file).data
+        return data or {"keys": {}, "tenants": {}}
+
+    def resolve(self, api_key: str) -> TenantAuth | None:
+        """
+        Returns the tenant an API key belongs to.
+
+        Args:
+            api_key (str): The raw value of the X-API-Key header.
+
+        Returns:
+            TenantAuth | None: The tenant and its limits, or None if the key is not valid.
+        """
+        key_hash = hash_api_key(api_key)
+        now = time.monotonic()
+        cached = self._resolved.get(key_hash)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+
+        data = self._load()
+        record = data.get("keys", {}).get(key_hash)
+        if record is not None:
+            tenant_id = record["tenant_id"]
+        elif self.allow_tenant_id_as_key:
+            # Before keys were provisioned the key was the tenant ID ("test-key" for the tests).
+            tenant_id = "test-tenant" if api_key == "test-key" else api_key
+        else:
+            tenant_id = None
+            if is_valid_tenant_id(api_key):
+                self._warn_rejected_tenant_id(now)
+
+        valid = is_valid_tenant_id(tenant_id)
+        auth = (
+            TenantAuth(tenant_id, data.get("tenants", {}).get(tenant_id, {}), bool(record and record.get("admin")))
+            if valid else None
+        )
+        # Unknown keys are cached briefly so bad clients cannot force a lookup per request.
+        ttl = self.cache_ttl if auth is not None else min(self.cache_ttl, 5)
+        with self._lock:
+            if now - self._swept_at >= self.cache_ttl:
+                # Every key ever presented would stay in memory otherwise.
+                self._resolved = {k: v for k, v in self._resolved.items() if v[1] > now}
+                self._swept_at = now
+            self._resolved[key_hash] = (auth, now + ttl)
+        return auth
+
+    def _warn_rejected_tenant_id(self, now: float):
+        with self._lock:
+            self._rejected_tenant_ids += 1
+            if self._warned_at is not None and now - self._warned_at < self.cache_ttl:
+                return
+            count, self._rejected_tenant_ids, self._warned_at = self._rejected_tenant_ids, 0, now
+        logger.warning(
+            "Rejected %d unprovisioned API key(s) that could be tenant IDs. Clients still sending their "
+            "tenant ID need a key (python -m ai_assistant.api.services.api_keys create <tenant_id>); "
+            "set ALLOW_TENANT_ID_AS_API_KEY=1 to accept tenant IDs while they migrate.",
+            count,
+        )
+
+    def create_key(self, tenant_id: str, admin: bool = False) -> str:
+        """
+        Generates a new API key for a tenant and stores its hash.
+
+        Args:
+            tenant_id (str): The ID of the tenant.
+            admin (bool): Allow the key to use the admin endpoints.
+
+        Returns:
+            str: The raw API key. It is not stored and cannot be recovered.
+
+        Raises:
+            ValueError: If the tenant ID has characters other than letters, digits, "_" and "-".
+        """
+        if not is_valid_tenant_id(tenant_id):
+            raise ValueError(f"Invalid tenant ID: {tenant_id!r}")
+        api_key = secrets.token_urlsafe(32)
+        with self._lock:
+            data = self._load()
+            record = {"tenant_id": tenant_id, "admin": True} if admin else {"tenant_id": tenant_id}
+            updated = {**data, "keys": {**data.get("keys", {}), hash_api_key(api_key): record}}
+            self.cache.write(self.keys_file, updated)
+        return api_key
+
+    def revoke_key(self, api_key: str):
+        """
+        Removes an API key. Other workers stop accepting it once their cache entry expires.
+        """
+        key_hash = hash_api_key(api_key)
+        with self._lock:
+            data = self._load()
+            keys = {k: v for k, v in data.get("keys", {}).items() if k != key_hash}
+            self.cache.write(self.keys_file, {**data, "keys": keys})
+            self._resolved.pop(key_hash, None)
+
+
+# Shared key store used by the API key middleware.
+api_key_store = ApiKeyStore()
+
+
+def main(argv: List[str] | None = None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Provision or revoke the API keys of the tenants.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("create", help="Generate a key for a tenant and print it")
+    create.add_argument("tenant_id", help="The ID of the tenant, e.g. the key its clients sent so far")
+    create.add_argument("--admin", action="store_true", help="Allow the key to use /admin/* and /metrics")
+    revoke = commands.add_parser("revoke", help="Remove a key")
+    revoke.add_argument("api_key", help="The raw key to revoke")
+    args = parser.parse_args(argv)
+
+    if args.command == "create":
+        try:
+            print(api_key_store.create_key(args.tenant_id, admin=args.admin))
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        api_key_store.revoke_key(args.api_key)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
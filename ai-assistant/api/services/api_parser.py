@@ -1,5 +1,110 @@
 import json
-from typing import Dict
+import os
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Tuple
+
+from ..config import settings
+
+try:
+    import ijson
+except ImportError:  # Specs are then read whole with the json module.
+    ijson = None
+
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+# ijson events that complete a JSON value.
+SCALAR_OR_END_EVENTS = ("string", "number", "boolean", "null", "end_map", "end_array")
+
+
+class RefResolver:
+    """
+    Resolves the local references (``{"$ref": "#/components/..."}``) of an OpenAPI spec.
+
+    Each reference is resolved once and memoized, so a schema or parameter shared by
+    hundreds of operations is looked up a single time. Cyclic references resolve to
+    an empty object instead of recursing forever; external references are not followed.
+    """
+
+    def __init__(self, document: Dict):
+        """
+        Args:
+            document (Dict): The spec, or at least its ``components``/``definitions`` sections.
+        """
+        self.document = document
+        self._resolved: Dict[str, Any] = {}
+
+    def _lookup(self, ref: str) -> Any:
+        if not ref.startswith("#/"):
+            return {}
+        value: Any = self.document
+        for part in ref[2:].split("/"):
+            part = part.replace("~1", "/").replace("~0", "~")
+            if not isinstance(value, dict) or part not in value:
+                return {}
+            value = value[part]
+        return value
+
+    def resolve(self, value: Any) -> Any:
+        """
+        Returns ``value``, or what it references if it is a ``$ref`` object.
+        """
+        if not (isinstance(value, dict) and isinstance(value.get("$ref"), str)):
+            return value
+        ref = value["$ref"]
+        if ref not in self._resolved:
+            # Marks the reference as being resolved, so a cycle ends here.
+            self._resolved[ref] = None
+            self._resolved[ref] = self.resolve(self._lookup(ref))
+        resolved = self._resolved[ref]
+        return {} if resolved is None else resolved
+
+
+class OpenApiSpec(NamedTuple):
+    """
+    A parsed OpenAPI spec: its top-level sections and its operations, produced lazily.
+    """
+    title: str
+    version: str
+    servers: List[str]
+    operations: Iterator[Dict]
+
+
+def _schema_name(schema: Dict) -> str:
+    """
+    Returns a short description of a schema: the name of the component it references, or its type.
+    """
+    if not isinstance(schema, dict):
+        return "object"
+    if isinstance(schema.get("$ref"), str):
+        return schema["$ref"].rsplit("/", 1)[-1]
+    if schema.get("type") == "array":
+        return f"array of {_schema_name(schema.get('items', {}))}"
+    return schema.get("type", "object")
+
+
+def operation_text(record: Dict) -> str:
+    """
+    Returns the text of an operation record that is embedded and given to the LLM as context.
+    """
+    lines = [f"{record['method']} {record['path']}"]
+    if record.get("summary"):
+        lines.append(f"Summary: {record['summary']}")
+    if record.get("description") and record.get("description") != record.get("summary"):
+        lines.append(f"Description: {record['description']}")
+    if record.get("operation_id"):
+        lines.append(f"Operation ID: {record['operation_id']}")
+    for parameter in record.get("parameters", []):
+        required = ", required" if parameter.get("required") else ""
+        description = f": {parameter['description']}" if parameter.get("description") else ""
+        lines.append(f"Parameter {parameter['name']} ({parameter['in']}, {parameter['type']}{required}){description}")
+    if record.get("request_body"):
+        body = record["request_body"]
+        lines.append(f"Request body: {body['schema']} ({', '.join(body['content_types'])})")
+    if record.get("permissions"):
+        lines.append(f"Permissions: {', '.join(record['permissions'])}")
+    for status, description in record.get("responses", {}).items():
+        lines.append(f"Response {status}: {description}")
+    if record.get("deprecated"):
+        lines.append("Deprecated.")
+    return "\n".join(lines)
 
 
 class ApiParser:
@@ -29,38 +134,191 @@ class ApiParser:
         Returns:
             Dict: A dictionary containing a summary of the API, including title, version,
                   and a list of endpoints with their methods, URLs, and descriptions.
-                  Returns None if the input is not a valid OpenAPI specification or if
-                  an error occurs during parsing.
+                  Returns a dictionary with an ``error`` if the input is not a valid
+                  OpenAPI specification or if an error occurs during parsing.
         """
-        if not self.is_valid_json(json_string):
+        try:
+            spec = self._spec(json.loads(json_string))
+        except json.JSONDecodeError:
             return {"error": "Invalid JSON string provided."}
+        if spec is None:
+            return {"error": "Invalid OpenAPI specification format."}
+        return {
+            "title": spec.title,
+            "version": spec.version,
+            "endpoints": [
+                {"method": record["method"], "url": record["path"],
+                 "description": record.get("summary") or record.get("description") or "No description"}
+                for record in spec.operations
+            ],
+        }
 
-        try:
-            openapi_spec = json.loads(json_string)
+    def read_openapi(self, file_path: str) -> OpenApiSpec | None:
+        """
+        Reads an OpenAPI specification from a JSON file, parsing it once.
 
-            # Check for required OpenAPI keys
-            if "openapi" not in openapi_spec or "info" not in openapi_spec or "paths" not in openapi_spec:
-                return {"error": "Invalid OpenAPI specification format."}
+        Specs larger than ``settings.openapi_streaming_min_bytes`` are streamed with
+        ijson when it is installed: the top-level sections are read first, skipping
+        ``paths``, then the operations are produced one path item at a time, so the
+        whole ``paths`` tree is never held in memory.
 
-            info = openapi_spec["info"]
-            paths = openapi_spec["paths"]
+        Args:
+            file_path (str): The JSON file.
+
+        Returns:
+            OpenApiSpec | None: The spec, or None if the file is JSON but not an OpenAPI spec.
+
+        Raises:
+            ValueError: If the file is not valid JSON.
+        """
+        if ijson is None or os.path.getsize(file_path) < settings.openapi_streaming_min_bytes:
+            with open(file_path, "r", encoding="utf-8") as f:
+                return self._spec(json.load(f))
+
+        with open(file_path, "rb") as f:
+            try:
+                header = self._read_top_level(f, skip=("paths",))
+            except ijson.JSONError as e:
+                raise ValueError(f"Invalid JSON: {e}") from e
+
+        def iter_paths() -> Iterator[Tuple[str, Dict]]:
+            with open(file_path, "rb") as f:
+                yield from ijson.kvitems(f, "paths", use_float=True)
+
+        return self._spec(header, iter_paths())
+
+    @staticmethod
+    def _read_top_level(f, skip: Iterable[str]) -> Dict:
+        """
+        Returns the top-level members of a JSON object read with ijson. Members in
+        ``skip`` are scanned over without being built, and only recorded as present (None).
+        """
+        values: Dict[str, Any] = {}
+        key = builder = None
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if prefix == "":
+                if event in ("start_array", "string", "number", "boolean", "null"):
+                    # Not an object.
+                    return {}
+                if event == "map_key":
+                    key = value
+                    values[key] = None
+                    builder = None if key in skip else ijson.ObjectBuilder()
+                continue
+            if builder is None:
+                continue
+            builder.event(event, value)
+            # The keys of an object member share its prefix; only its end or a scalar completes it.
+            if prefix == key and event in SCALAR_OR_END_EVENTS:
+                values[key] = builder.value
+                builder = None
+        return values
+
+    def _spec(self, document: Any, paths: Iterable[Tuple[str, Dict]] | None = None) -> OpenApiSpec | None:
+        """
+        Returns the spec of a parsed JSON document, or None if it is not an OpenAPI spec.
+
+        ``paths`` are the path items when they are streamed rather than part of ``document``.
+        """
+        if not isinstance(document, dict) or not ("openapi" in document or "swagger" in document):
+            return None
+        if "info" not in document or "paths" not in document:
+            return None
+        info = document.get("info") or {}
+        servers = [
+            server["url"] for server in document.get("servers") or [] if isinstance(server, dict) and server.get("url")
+        ]
+        if paths is None:
+            paths = (document.get("paths") or {}).items()
+        return OpenApiSpec(
+            title=info.get("title", "No title"),
+            version=info.get("version", "No version"),
+            servers=servers,
+            operations=self._iter_operations(paths, document, servers),
+        )
+
+    def _iter_operations(self, paths: Iterable[Tuple[str, Dict]], document: Dict, servers: List[str]) -> Iterator[Dict]:
+        """
+        Yields one record per operation: method, path, parameters, request body,
+        responses and the permissions required to call it.
+        """
+        resolver = RefResolver(document)
+        default_security = document.get("security") or []
+        for path, path_item in paths:
+            path_item = resolver.resolve(path_item)
+            if not isinstance(path_item, dict):
+                continue
+            shared_parameters = path_item.get("parameters") or []
+            for method, operation in path_item.items():
+                if method.lower() not in HTTP_METHODS or not isinstance(operation, dict):
+                    continue
+                yield {
+                    "method": method.upper(),
+                    "path": path,
+                    "operation_id": operation.get("operationId"),
+                    "summary": operation.get("summary", ""),
+                    "description": operation.get("description", ""),
+                    "tags": operation.get("tags", []),
+                    "parameters": self._parameters(shared_parameters, operation.get("parameters") or [], resolver),
+                    "request_body": self._request_body(operation.get("requestBody"), resolver),
+                    "responses": self._responses(operation.get("responses") or {}, resolver),
+                    "permissions": self._permissions(operation, default_security),
+                    "deprecated": bool(operation.get("deprecated")),
+                    "servers": servers,
+                }
 
-            # Extract API summary information
-            api_summary = {
-                "title": info.get("title", "No title"),
-                "version": info.get("version", "No version"),
-                "endpoints": [],
+    @staticmethod
+    def _parameters(shared: List, own: List, resolver: RefResolver) -> List[Dict]:
+        """
+        Returns the parameters of an operation; its own override the path item's with the same name and location.
+        """
+        parameters: Dict[Tuple[str, str], Dict] = {}
+        for parameter in list(shared) + list(own):
+            parameter = resolver.resolve(parameter)
+            if not isinstance(parameter, dict) or "name" not in parameter:
+                continue
+            location = parameter.get("in", "query")
+            parameters[(parameter["name"], location)] = {
+                "name": parameter["name"],
+                "in": location,
+                "required": bool(parameter.get("required")),
+                # Swagger 2 puts the type on the parameter itself.
+                "type": _schema_name(parameter.get("schema", parameter)),
+                "description": parameter.get("description", ""),
             }
+        return list(parameters.values())
+
+    @staticmethod
+    def _responses(responses: Dict, resolver: RefResolver) -> Dict[str, str]:
+        descriptions = {}
+        for status, response in responses.items():
+            response = resolver.resolve(response)
+            if isinstance(response, dict):
+                descriptions[str(status)] = response.get("description", "")
+        return descriptions
 
-            # Extract endpoint information
-            for path, methods in paths.items():
-                for method, details in methods.items():
-                    api_summary["endpoints"].append({
-                        "method": method.upper(),
-                        "url": path,
-                        "description": details.get("summary", details.get("description", "No description")),
-                    })
-
-            return api_summary
-        except (json.JSONDecodeError, KeyError) as e:
-            return {"error": f"An error occurred during parsing: {str(e)}"}
\ No newline at end of file
+    @staticmethod
+    def _request_body(request_body: Any, resolver: RefResolver) -> Dict | None:
+        request_body = resolver.resolve(request_body)
+        if not isinstance(request_body, dict) or not request_body.get("content"):
+            return None
+        content = request_body["content"]
+        first = next(iter(content.values()), None) or {}
+        return {
+            "required": bool(request_body.get("required")),
+            "content_types": list(content),
+            "schema": _schema_name(first.get("schema", {})),
+        }
+
+    @staticmethod
+    def _permissions(operation: Dict, default_security: List) -> List[str]:
+        """
+        Returns the permissions of an operation: its ``x-permissions``, or the scopes of its security requirements.
+        """
+        if operation.get("x-permissions"):
+            return [str(permission) for permission in operation["x-permissions"]]
+        permissions = []
+        for requirement in operation.get("security", default_security) or []:
+            for scheme, scopes in (requirement or {}).items():
+                permissions.extend(scopes or [scheme])
+        return list(dict.fromkeys(permissions))
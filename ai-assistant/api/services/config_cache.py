@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, NamedTuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+from ..config import settings
+
+
+class CachedConfig(NamedTuple):
+    """
+    A parsed config file and the ETag of its content. ``data`` is None if the file does not exist.
+    """
+    data: Any
+    etag: str | None
+
+
+class _Entry:
+    __slots__ = ("config", "signature", "checked_at")
+
+    def __init__(self, config: CachedConfig, signature, checked_at: float):
+        self.config = config
+        self.signature = signature
+        self.checked_at = checked_at
+
+
+def _etag(data: Any) -> str:
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return '"' + hashlib.sha1(canonical.encode("utf-8")).hexdigest() + '"'
+
+
+class ConfigCache:
+    """
+    In-memory cache of small JSON config files (themes, permissions, orgs).
+
+    A cached file is revalidated with a ``stat`` (mtime and size) at most every
+    ``revalidate_interval`` seconds, so writes made by other workers are picked up
+    without re-reading and re-parsing the file on every request. Writes through
+    this cache update it immediately.
+
+    The returned data is shared between requests and must not be mutated.
+    """
+
+    def __init__(self, revalidate_interval: float = 1.0):
+        """
+        Args:
+            revalidate_interval (float): Seconds between ``stat`` checks of a cached file (0 checks on every read).
+        """
+        self.revalidate_interval = revalidate_interval
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _signature(path: str):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def read(self, path: str) -> CachedConfig:
+        """
+        Returns the parsed content of a JSON file, from the cache when it is still current.
+
+        Args:
+            path (str): The path of the JSON file.
+
+        Returns:
+            CachedConfig: The data (None if the file does not exist) and its ETag.
+        """
+        now = time.monotonic()
+        entry = self._entries.get(path)
+        if entry is not None and now - entry.checked_at < self.revalidate_interval:
+            return entry.config
+
+        signature = self._signature(path)
+        if entry is not None and entry.signature == signature:
+            entry.checked_at = now
+            return entry.config
+
+        if signature is None:
+            config = CachedConfig(None, None)
+        else:
+            with open(path, "r") as f:
+                data = json.load(f)
+            config = CachedConfig(data, _etag(data))
+        with self._lock:
+            self._entries[path] = _Entry(config, signature, now)
+        return config
+
+    def write(self, path: str, data: Any) -> CachedConfig:
+        """
+        Writes a JSON file atomically and updates the cache.
+
+        Args:
+            path (str): The path of the JSON file.
+            data (Any): The JSON-serializable content.
+
+        Returns:
+            CachedConfig: The written data and its ETag.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=4)
+        # Readers in other workers see either the old or the new file, never a partial one.
+        os.replace(tmp_path, path)
+        config = CachedConfig(data, _etag(data))
+        with self._lock:
+            self._entries[path] = _Entry(config, self._signature(path), time.monotonic())
+        return config
+
+
+def conditional_json_response(request: Request, data: Any, etag: str | None) -> Response:
+    """
+    Returns ``data`` as JSON with an ETag, or an empty 304 if the client already has this version.
+
+    Args:
+        request (Request): The incoming request, checked for ``If-None-Match``.
+        data (Any): The response body.
+        etag (str): The ETag of ``data``; computed from it if None.
+
+    Returns:
+        Response: A 304 response or a JSON response.
+    """
+    etag = etag or _etag(data)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(content=data, headers={"ETag": etag})
+
+
+# Shared cache for the tenant config files.
+config_cache = ConfigCache(revalidate_interval=settings.config_cache_revalidate_interval)
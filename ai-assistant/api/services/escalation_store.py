@@ -0,0 +1,185 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+
+from ..config import settings
+
+
+class EscalationStore:
+    """
+    Stores escalation records in SQLite.
+
+    The database runs in WAL mode so appends are O(1) and several API workers can
+    write concurrently without losing records. Reads go through an index on
+    ``(tenant_id, date)`` so listing one page of a busy tenant stays cheap.
+    """
+
+    def __init__(self, db_path: str | None = None, legacy_dir: str = "ai-assistant/api/escalations"):
+        """
+        Initializes the store. The database is created on first use.
+
+        Args:
+            db_path (str): Path of the SQLite database (default: settings.escalation_db_path).
+            legacy_dir (str): Directory of the old ``esc_<tenant>.json`` files, imported on first access.
+        """
+        self.db_path = db_path or settings.escalation_db_path
+        self.legacy_dir = legacy_dir
+        self._local = threading.local()
+        # Tenants known to have nothing left to import, so their file is not checked again.
+        self._migrated: set = set()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Returns this thread's connection, opening it on first use.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._ensure_schema(connection)
+        return connection
+
+    def _ensure_schema(self, connection: sqlite3.Connection):
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS escalations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tenant_id TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    date TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_escalations_tenant_id ON escalations (tenant_id, id);
+                CREATE INDEX IF NOT EXISTS idx_escalations_tenant_date ON escalations (tenant_id, date);
+                CREATE TABLE IF NOT EXISTS legacy_migrations (
+                    tenant_id TEXT PRIMARY KEY,
+                    migrated_at TEXT NOT NULL
+                );
+                """
+            )
+            self._recover_claimed_files()
+            self._schema_ready = True
+
+    def _recover_claimed_files(self):
+        """
+        Puts back the legacy files that earlier versions renamed to ``*.migrating.<pid>`` and
+        failed to import, so they are imported on the tenant's next access.
+        """
+        if not os.path.isdir(self.legacy_dir):
+            return
+        for name in os.listdir(self.legacy_dir):
+            legacy_name, separator, _ = name.partition(".migrating.")
+            if not separator or os.path.exists(os.path.join(self.legacy_dir, legacy_name)):
+                continue
+            try:
+                os.rename(os.path.join(self.legacy_dir, name), os.path.join(self.legacy_dir, legacy_name))
+            except FileNotFoundError:
+                pass  # Recovered by another worker.
+
+    def _migrate_legacy_file(self, tenant_id: str):
+        """
+        Imports a tenant's old JSON escalation file once, then renames it out of the way.
+
+        The import and its record in ``legacy_migrations`` are committed together in a
+        transaction taking the database's write lock: a worker arriving during another
+        one's import waits for it and then finds it done, and a failed import leaves
+        the file in place to be imported on the next access.
+        """
+        if tenant_id in self._migrated:
+            return
+        # Opening the database first recovers the files claimed by earlier versions.
+        connection = self._connection()
+        legacy_file = os.path.join(self.legacy_dir, f"esc_{tenant_id}.json")
+        if os.path.exists(legacy_file):
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                done = connection.execute(
+                    "SELECT 1 FROM legacy_migrations WHERE tenant_id = ?", (tenant_id,)
+                ).fetchone()
+                if not done:
+                    with open(legacy_file, "r") as f:
+                        records = json.load(f)
+                    connection.executemany(
+                        "INSERT INTO escalations (tenant_id, message, response, date) VALUES (?, ?, ?, ?)",
+                        [(tenant_id, r.get("message", ""), r.get("response", ""), r.get("date", "")) for r in records],
+                    )
+                    connection.execute(
+                        "INSERT INTO legacy_migrations VALUES (?, ?)", (tenant_id, str(datetime.now()))
+                    )
+            try:
+                os.rename(legacy_file, f"{legacy_file}.migrated")
+            except FileNotFoundError:
+                pass  # Renamed by another worker.
+        self._migrated.add(tenant_id)
+
+    def add(self, tenant_id: str, message: str, response: str) -> int:
+        """
+        Appends an escalation record.
+
+        Args:
+            tenant_id (str): The ID of the tenant.
+            message (str): The user's message.
+            response (str): The LLM response that triggered the escalation.
+
+        Returns:
+            int: The ID of the new record.
+        """
+        self._migrate_legacy_file(tenant_id)
+        cursor = self._connection().execute(
+            "INSERT INTO escalations (tenant_id, message, response, date) VALUES (?, ?, ?, ?)",
+            (tenant_id, message, response, str(datetime.now())),
+        )
+        return cursor.lastrowid
+
+    def list(
+        self,
+        tenant_id: str,
+        limit: int = 100,
+        after_id: int | None = None,
+        start_date: date | None = None,
+        end_date: date | None = None,
+    ) -> List[Dict]:
+        """
+        Returns one page of a tenant's escalations, oldest first.
+
+        Args:
+            tenant_id (str): The ID of the tenant.
+            limit (int): Maximum number of records to return.
+            after_id (int): Only return records after this ID (the ``id`` of the last record of the previous page).
+            start_date (date): Only return records from this day on.
+            end_date (date): Only return records up to and including this day.
+
+        Returns:
+            List[Dict]: The escalation records.
+        """
+        self._migrate_legacy_file(tenant_id)
+        query = "SELECT id, message, response, date FROM escalations WHERE tenant_id = ?"
+        params: list = [tenant_id]
+        if after_id is not None:
+            query += " AND id > ?"
+            params.append(after_id)
+        if start_date is not None:
+            query += " AND date >= ?"
+            params.append(start_date.isoformat())
+        if end_date is not None:
+            query += " AND date < ?"
+            params.append((end_date + timedelta(days=1)).isoformat())
+        query += " ORDER BY id LIMIT ?"
+        params.append(limit)
+        return [dict(row) for row in self._connection().execute(query, params)]
+
+
+# Shared store used by the chat endpoint and /get-escalations.
+escalation_store = EscalationStore()
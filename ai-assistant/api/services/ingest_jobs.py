@@ -0,0 +1,431 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Dict, List
+
+from starlette.concurrency import run_in_threadpool
+
+from ..config import settings
+from .semantic_cache import semantic_cache
+
+logger = logging.getLogger(__name__)
+
+
+def _run_ingest(progress_queue, job_id: str, file_path: str, file_name: str, tenant_id: str):
+    """
+    Entry point of an ingestion worker process.
+
+    Progress updates are sent back to the API process through ``progress_queue``.
+    """
+    def report(**update):
+        progress_queue.put((job_id, file_name, update))
+
+    try:
+        # Imported here so the API process never loads langchain or the embedding models.
+        from ..vector_data.ingest_docs import process_file
+
+        return process_file(file_path, file_name, tenant_id, progress=report)
+    finally:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+# Progress fields a worker reports for a file, as columns of ``ingest_files``.
+FILE_PROGRESS_FIELDS = ("pages_parsed", "chunks_total", "chunks_embedded", "chunks_skipped")
+
+# Statuses of files that are not done yet.
+UNFINISHED = ("queued", "running")
+
+
+class IngestJobStore:
+    """
+    Ingestion jobs and the progress of their files, in SQLite.
+
+    The database runs in WAL mode and is shared by the API workers: whichever worker
+    accepted an upload, any of them can report on the job, and the per-tenant limit
+    on running files is enforced across all of them. The worker that accepted a job
+    runs its files and refreshes their heartbeat; the files of a worker that stopped
+    are reported as failed once their heartbeat is older than ``stale_after`` seconds,
+    and stop counting against the tenant's limit.
+    """
+
+    def __init__(self, db_path: str | None = None, stale_after: float = 30):
+        """
+        Initializes the store. The database is created on first use.
+
+        Args:
+            db_path (str): Path of the SQLite database (default: settings.ingest_jobs_db_path).
+            stale_after (float): Seconds without heartbeat after which a file's worker is considered gone.
+        """
+        self.db_path = db_path or settings.ingest_jobs_db_path
+        self.stale_after = stale_after
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Returns this thread's connection, opening it on first use.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS ingest_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    tenant_id TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    finished_at REAL
+                );
+                CREATE TABLE IF NOT EXISTS ingest_files (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT NOT NULL,
+                    tenant_id TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    owner TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    pages_parsed INTEGER NOT NULL DEFAULT 0,
+                    chunks_total INTEGER NOT NULL DEFAULT 0,
+                    chunks_embedded INTEGER NOT NULL DEFAULT 0,
+                    chunks_skipped INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    heartbeat_at REAL NOT NULL,
+                    UNIQUE (job_id, name)
+                );
+                CREATE INDEX IF NOT EXISTS idx_ingest_files_tenant ON ingest_files (tenant_id, status);
+                CREATE INDEX IF NOT EXISTS idx_ingest_files_owner ON ingest_files (owner, status);
+                """
+            )
+            self._local.connection = connection
+        return connection
+
+    def create_job(self, job_id: str, tenant_id: str, owner: str, file_names: List[str], now: float | None = None):
+        """
+        Records a new job and its queued files.
+
+        Args:
+            job_id (str): The ID of the job.
+            tenant_id (str): The ID of the tenant.
+            owner (str): The ID of the worker that runs the files.
+            file_names (List[str]): The names of the uploaded files.
+            now (float): The current time (default: time.time()).
+        """
+        now = time.time() if now is None else now
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN")
+            connection.execute("INSERT INTO ingest_jobs VALUES (?, ?, 'queued', ?, NULL)", (job_id, tenant_id, now))
+            connection.executemany(
+                "INSERT INTO ingest_files (job_id, tenant_id, name, owner, status, heartbeat_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?)",
+                [(job_id, tenant_id, name, owner, now) for name in file_names],
+            )
+
+    def claim_file(self, job_id: str, file_name: str, limit: int, now: float | None = None) -> bool:
+        """
+        Marks a queued file as running if its tenant has a free slot.
+
+        The tenant's files start in upload order, over all the workers: a file waits
+        while ``limit`` files of the tenant are running, or older queued ones take the
+        free slots.
+
+        Returns:
+            bool: True if the file was claimed and may run.
+        """
+        now = time.time() if now is None else now
+        live = now - self.stale_after
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                "SELECT seq, tenant_id FROM ingest_files WHERE job_id = ? AND name = ?", (job_id, file_name)
+            ).fetchone()
+            if row is None:
+                return False
+            seq, tenant_id = row
+            running, queued_before = connection.execute(
+                "SELECT COALESCE(SUM(status = 'running'), 0), COALESCE(SUM(status = 'queued' AND seq < ?), 0) "
+                "FROM ingest_files WHERE tenant_id = ? AND status IN ('queued', 'running') AND heartbeat_at >= ?",
+                (seq, tenant_id, live),
+            ).fetchone()
+            if running + queued_before >= limit:
+                return False
+            connection.execute(
+                "UPDATE ingest_files SET status = 'running', heartbeat_at = ? WHERE seq = ?", (now, seq)
+            )
+            connection.execute("UPDATE ingest_jobs SET status = 'running' WHERE job_id = ?", (job_id,))
+            return True
+
+    def update_file(self, job_id: str, file_name: str, **update):
+        """
+        Updates a file's status, error or progress fields, and refreshes its heartbeat.
+        """
+        fields = {key: value for key, value in update.items() if key in FILE_PROGRESS_FIELDS + ("status", "error")}
+        assignments = "".join(f"{key} = ?, " for key in fields)
+        self._connection().execute(
+            f"UPDATE ingest_files SET {assignments}heartbeat_at = ? WHERE job_id = ? AND name = ?",
+            (*fields.values(), time.time(), job_id, file_name),
+        )
+
+    def finish_job(self, job_id: str, now: float | None = None) -> str:
+        """
+        Marks a job whose files are all done as completed, or failed if every file failed.
+
+        Returns:
+            str: The job's final status.
+        """
+        now = time.time() if now is None else now
+        connection = self._connection()
+        total, failed = connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(status = 'failed'), 0) FROM ingest_files WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        status = "failed" if failed == total else "completed"
+        connection.execute(
+            "UPDATE ingest_jobs SET status = ?, finished_at = ? WHERE job_id = ?", (status, now, job_id)
+        )
+        return status
+
+    def heartbeat(self, owner: str, now: float | None = None):
+        """
+        Refreshes the heartbeat of the unfinished files of a worker.
+        """
+        self._connection().execute(
+            "UPDATE ingest_files SET heartbeat_at = ? WHERE owner = ? AND status IN ('queued', 'running')",
+            (time.time() if now is None else now, owner),
+        )
+
+    def get_job(self, job_id: str, tenant_id: str, now: float | None = None) -> Dict | None:
+        """
+        Returns a snapshot of a job's status.
+
+        Args:
+            job_id (str): The ID of the job.
+            tenant_id (str): The ID of the tenant asking; other tenants' jobs are not visible.
+            now (float): The current time (default: time.time()).
+
+        Returns:
+            Dict | None: The job status, or None if there is no such job for the tenant.
+        """
+        now = time.time() if now is None else now
+        connection = self._connection()
+        job = connection.execute(
+            "SELECT job_id, tenant_id, status, created_at, finished_at FROM ingest_jobs WHERE job_id = ? AND tenant_id = ?",
+            (job_id, tenant_id),
+        ).fetchone()
+        if job is None:
+            return None
+        rows = connection.execute(
+            f"SELECT name, status, {', '.join(FILE_PROGRESS_FIELDS)}, error, heartbeat_at FROM ingest_files "
+            "WHERE job_id = ? ORDER BY seq",
+            (job_id,),
+        ).fetchall()
+        files = []
+        for name, status, *progress, error, heartbeat_at in rows:
+            if status in UNFINISHED and heartbeat_at < now - self.stale_after:
+                status, error = "failed", "The ingestion worker stopped"
+            files.append({"name": name, "status": status, **dict(zip(FILE_PROGRESS_FIELDS, progress)), "error": error})
+        result = dict(zip(("job_id", "tenant_id", "status", "created_at", "finished_at"), job))
+        if result["finished_at"] is None and files and all(f["status"] not in UNFINISHED for f in files):
+            # The worker running the job stopped before finishing it.
+            result["status"] = "failed" if all(f["status"] == "failed" for f in files) else "completed"
+        return {**result, "files": files}
+
+    def prune(self, ttl: float, now: float | None = None):
+        """
+        Deletes the jobs finished more than ``ttl`` seconds ago, and those whose worker stopped as long ago.
+        """
+        now = time.time() if now is None else now
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "DELETE FROM ingest_jobs WHERE finished_at < ? OR (finished_at IS NULL AND created_at < ? AND NOT EXISTS ("
+                "SELECT 1 FROM ingest_files WHERE ingest_files.job_id = ingest_jobs.job_id AND heartbeat_at >= ?))",
+                (now - ttl, now - ttl, now - self.stale_after),
+            )
+            connection.execute(
+                "DELETE FROM ingest_files WHERE job_id NOT IN (SELECT job_id FROM ingest_jobs)"
+            )
+
+
+class IngestJobManager:
+    """
+    Runs document ingestion in a bounded worker pool and tracks the progress of each job.
+
+    A job covers the files of one upload. Files are processed in a process pool so the
+    CPU-heavy parsing and embedding never blocks the event loop, and each tenant can
+    only have ``per_tenant_limit`` files running at a time, over all the API workers,
+    so a bulk upload cannot starve the other tenants. Jobs are kept in an
+    ``IngestJobStore`` so every worker can report on them.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        per_tenant_limit: int = 1,
+        job_ttl: float = 3600,
+        executor: Executor | None = None,
+        ingest_function: Callable = _run_ingest,
+        store: IngestJobStore | None = None,
+        poll_interval: float = 0.5,
+        heartbeat_interval: float = 5,
+    ):
+        """
+        Initializes the job manager. The worker pool is started on the first job.
+
+        Args:
+            max_workers (int): Size of the ingestion process pool.
+            per_tenant_limit (int): Maximum number of files of one tenant processed concurrently.
+            job_ttl (float): Seconds a finished job stays available for polling.
+            executor (Executor): Executor to run ingestion in (default: a process pool).
+            ingest_function (Callable): The function run for each file.
+            store (IngestJobStore): Where jobs are kept (default: a store at settings.ingest_jobs_db_path).
+            poll_interval (float): Seconds between attempts to start a file waiting for its tenant's slot.
+            heartbeat_interval (float): Seconds between heartbeats of this worker's files.
+        """
+        self.max_workers = max_workers
+        self.per_tenant_limit = per_tenant_limit
+        self.job_ttl = job_ttl
+        self.ingest_function = ingest_function
+        self.store = store or IngestJobStore()
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        # Identifies the files this worker runs, for their heartbeat.
+        self.owner = uuid.uuid4().hex
+        self._executor = executor
+        self._tasks: set = set()
+        self._mp_manager = None
+        self._progress_queue = None
+        self._progress_thread: threading.Thread | None = None
+        self._heartbeat_thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def _ensure_started(self):
+        """
+        Starts the worker pool and the threads collecting progress updates and sending heartbeats.
+        """
+        if self._progress_queue is not None:
+            return
+        if self._executor is None:
+            # Spawned workers do not inherit the API's event loop, threads or sockets.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        if isinstance(self._executor, ProcessPoolExecutor):
+            self._mp_manager = multiprocessing.get_context("spawn").Manager()
+            self._progress_queue = self._mp_manager.Queue()
+        else:
+            self._progress_queue = queue.Queue()
+        self._progress_thread = threading.Thread(target=self._collect_progress, daemon=True)
+        self._progress_thread.start()
+        self._heartbeat_thread = threading.Thread(target=self._send_heartbeats, daemon=True)
+        self._heartbeat_thread.start()
+
+    def _collect_progress(self):
+        """
+        Writes the progress updates sent by the workers to the job store.
+        """
+        while True:
+            try:
+                item = self._progress_queue.get()
+            except (EOFError, OSError):
+                return  # The manager was shut down.
+            if item is None:
+                return
+            job_id, file_name, update = item
+            try:
+                self.store.update_file(job_id, file_name, **update)
+            except sqlite3.Error as e:
+                logger.warning("Could not record the progress of '%s' in job %s: %s", file_name, job_id, e)
+
+    def _send_heartbeats(self):
+        """
+        Keeps this worker's queued and running files alive in the job store.
+        """
+        while not self._stopped.wait(self.heartbeat_interval):
+            try:
+                self.store.heartbeat(self.owner)
+            except sqlite3.Error as e:
+                logger.warning("Could not refresh the ingestion heartbeat: %s", e)
+
+    async def submit(self, tenant_id: str, files: List[tuple[str, str]]) -> str:
+        """
+        Queues the ingestion of uploaded files.
+
+        Args:
+            tenant_id (str): The ID of the tenant.
+            files (List[tuple[str, str]]): ``(file_path, file_name)`` of each saved upload.
+                The workers delete the files once processed.
+
+        Returns:
+            str: The ID of the new job.
+        """
+        self._ensure_started()
+        job_id = uuid.uuid4().hex
+        await run_in_threadpool(self.store.prune, self.job_ttl)
+        await run_in_threadpool(self.store.create_job, job_id, tenant_id, self.owner, [name for _, name in files])
+        task = asyncio.get_running_loop().create_task(self._run_job(job_id, tenant_id, files))
+        # Keep a reference so the task is not garbage collected while running.
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job_id
+
+    async def _run_job(self, job_id: str, tenant_id: str, files: List[tuple[str, str]]):
+        await asyncio.gather(*(self._run_file(job_id, tenant_id, path, name) for path, name in files))
+        await run_in_threadpool(self.store.finish_job, job_id)
+        # Cached answers may be outdated now that the tenant has new documents.
+        semantic_cache.invalidate(tenant_id)
+
+    async def _run_file(self, job_id: str, tenant_id: str, file_path: str, file_name: str):
+        loop = asyncio.get_running_loop()
+        # Wait for a free slot of the tenant, which its files on other workers may hold.
+        while not await run_in_threadpool(self.store.claim_file, job_id, file_name, self.per_tenant_limit):
+            await asyncio.sleep(self.poll_interval)
+        try:
+            await loop.run_in_executor(
+                self._executor, self.ingest_function,
+                self._progress_queue, job_id, file_path, file_name, tenant_id,
+            )
+            await run_in_threadpool(self.store.update_file, job_id, file_name, status="completed")
+        except Exception as e:
+            logger.warning("Error processing file '%s' for tenant %s: %s", file_name, tenant_id, e)
+            await run_in_threadpool(self.store.update_file, job_id, file_name, status="failed", error=str(e))
+
+    def get_job(self, job_id: str, tenant_id: str) -> Dict | None:
+        """
+        Returns a snapshot of a job's status, see ``IngestJobStore.get_job``.
+        """
+        return self.store.get_job(job_id, tenant_id)
+
+    def shutdown(self):
+        """
+        Stops the worker pool and the progress and heartbeat threads.
+        """
+        self._stopped.set()
+        if self._progress_queue is not None:
+            try:
+                self._progress_queue.put(None)
+            except (EOFError, OSError):
+                pass
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._mp_manager is not None:
+            self._mp_manager.shutdown()
+
+
+# Shared job manager used by the /ingest-docs endpoints.
+ingest_jobs = IngestJobManager(
+    max_workers=settings.ingest_workers,
+    per_tenant_limit=settings.ingest_max_per_tenant,
+    job_ttl=settings.ingest_job_ttl,
+)
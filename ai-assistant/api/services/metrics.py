@@ -0,0 +1,284 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from starlette.datastructures import MutableHeaders
+
+from ..config import settings
+
+# Upper bounds, in seconds, of the latency histogram buckets: from an in-memory
+# cache hit to a long generation.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class Counter:
+    """
+    A monotonically increasing count, one series per combination of label values.
+    """
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        """
+        Args:
+            name (str): The metric name.
+            description (str): The help text shown on /metrics.
+            labels (Sequence[str]): The label names; values are passed positionally to ``inc``.
+        """
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1):
+        """
+        Adds ``amount`` to the series of the given label values.
+        """
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values: str) -> float:
+        """
+        Returns the current value of a series (0 if it was never incremented).
+        """
+        return self._values.get(label_values, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for label_values, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """
+    A distribution of observed values over fixed buckets, one series per combination of label values.
+
+    Observing a value is a binary search and three additions under a lock, cheap
+    enough for every request.
+    """
+
+    def __init__(
+        self, name: str, description: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        """
+        Args:
+            name (str): The metric name.
+            description (str): The help text shown on /metrics.
+            labels (Sequence[str]): The label names; values are passed positionally to ``observe``.
+            buckets (Sequence[float]): The ascending upper bounds of the buckets; +Inf is implied.
+        """
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (the last one is +Inf), sum, count]
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        """
+        Records one observation in the series of the given label values.
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values: str) -> int:
+        """
+        Returns the number of observations of a series.
+        """
+        series = self._series.get(label_values)
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = sorted((labels, (list(counts), total, count)) for labels, (counts, total, count) in self._series.items())
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total, count) in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                bucket_labels = _format_labels(self.labels, label_values, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    The process's metrics, rendered together in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._metrics: List[Counter | Histogram] = []
+
+    def counter(self, name: str, description: str, labels: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, description, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self, name: str, description: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        metric = Histogram(name, description, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+request_duration = metrics.histogram(
+    "http_request_duration_seconds", "Time to handle a request, until the response is sent.", ("route", "tenant")
+)
+requests_total = metrics.counter("http_requests_total", "Requests handled, by status code.", ("route", "status"))
+stage_duration = metrics.histogram(
+    "request_stage_duration_seconds",
+    "Time spent in each stage of a request (auth, embed, retrieval, llm, escalation, ...).",
+    ("stage", "route", "tenant"),
+)
+cache_lookups = metrics.counter(
+    "semantic_cache_lookups_total", "Semantic cache lookups of the chat endpoint, by result.", ("tenant", "result")
+)
+escalations_total = metrics.counter("escalations_total", "Chat answers logged as escalations.", ("tenant",))
+llm_tokens = metrics.counter(
+    "llm_tokens_total", "Tokens evaluated (prompt) and generated (completion) by the LLM.", ("tenant", "model", "kind")
+)
+llm_errors = metrics.counter("llm_errors_total", "Failed LLM generations, by kind of error.", ("tenant", "error"))
+
+
+def tenant_label(tenant_id: str | None) -> str:
+    """
+    Returns the value of the tenant label: the tenant ID, or "" when the tenant is
+    unknown or per-tenant series are disabled.
+    """
+    return (tenant_id or "") if settings.metrics_per_tenant else ""
+
+
+class RequestTimings:
+    """
+    The stages timed during one request, in the order they finished.
+    """
+    __slots__ = ("start", "stages")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+
+    def server_timing(self) -> str:
+        """
+        Returns the value of the ``Server-Timing`` header: the stages finished so far and the total, in milliseconds.
+        """
+        entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages]
+        entries.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+# The timings of the request being handled. Tasks and threadpool calls started by
+# the request inherit it, so stages timed anywhere in its handling are recorded.
+_current_timings: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+
+def record_stage(stage: str, seconds: float):
+    """
+    Records the duration of a stage of the current request. Does nothing outside a request.
+    """
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.stages.append((stage, seconds))
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """
+    Times the ``with`` block as a stage of the current request, also when it raises.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def _route_label(scope: Dict) -> str:
+    # The route template keeps the label bounded: /ingest-jobs/{job_id}, not every job ID.
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request.
+
+    It adds a ``Server-Timing`` header listing the stages timed before the response
+    started, and records the request and its stages in the histograms once the
+    response is sent, so the stages of a streamed answer are included there.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.metrics_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message.setdefault("headers", [])
+                MutableHeaders(scope=message).append("Server-Timing", timings.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_timings.reset(token)
+            elapsed = time.perf_counter() - timings.start
+            route = _route_label(scope)
+            tenant = tenant_label(scope.get("state", {}).get("tenant_id"))
+            request_duration.observe(elapsed, route, tenant)
+            requests_total.inc(route, str(status))
+            for stage, seconds in timings.stages:
+                stage_duration.observe(seconds, stage, route, tenant)
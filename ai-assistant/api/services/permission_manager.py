@@ -1,20 +1,23 @@
-import json
 import os
 
+from .config_cache import ConfigCache, config_cache
+
 class PermissionManager:
-    def __init__(self):
+    def __init__(self, cache: ConfigCache = config_cache):
         self.base_dir = "ai-assistant/api/data/permissions"
+        self.cache = cache
         os.makedirs(self.base_dir, exist_ok=True)
 
     def save_permissions(self, org_id, permissions):
         file_path = os.path.join(self.base_dir, f"{org_id}.json")
-        with open(file_path, "w") as f:
-            json.dump(permissions, f, indent=4)
+        self.cache.write(file_path, permissions)
 
     def get_permissions(self, org_id):
+        return self.get_permissions_with_etag(org_id)[0]
+
+    def get_permissions_with_etag(self, org_id):
         file_path = os.path.join(self.base_dir, f"{org_id}.json")
-        try:
-            with open(file_path, "r") as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
\ No newline at end of file
+        permissions, etag = self.cache.read(file_path)
+        if permissions is None:
+            return {}, None
+        return permissions, etag
@@ -0,0 +1,38 @@
+import gc
+from typing import List
+
+from ..config import settings
+from ..vector_data import registry
+
+
+def preload_embedding_models(model_names: List[str] | None = None) -> List[str]:
+    """
+    Loads embedding models into the process-wide registry before the workers are forked.
+
+    Only the weights are loaded: no inference runs and no Chroma client or database
+    connection is opened, because thread pools and connections do not survive a fork.
+    The workers find the models in the registry they inherit and never load their own.
+
+    Args:
+        model_names (List[str]): The models to load (default: settings.preload_embedding_models).
+
+    Returns:
+        List[str]: The models loaded.
+    """
+    model_names = model_names or settings.preload_embedding_models
+    for model_name in model_names:
+        registry.get_embedding_function(model_name)
+    return model_names
+
+
+def freeze_shared_heap():
+    """
+    Moves every object allocated so far out of reach of the garbage collector.
+
+    A collection in a worker writes to the header of every object it visits, which
+    would give each worker a private copy of the pages holding the models' Python
+    objects. Frozen objects are never visited, so those pages stay shared; the weight
+    buffers themselves are only read by inference.
+    """
+    gc.collect()
+    gc.freeze()
@@ -0,0 +1,117 @@
+import math
+import threading
+import time
+from typing import Dict
+
+from ..config import settings
+
+
+class TokenBucketLimiter:
+    """
+    Per-tenant token bucket rate limiter.
+
+    Each tenant's bucket holds up to ``burst`` tokens and refills at ``rate`` tokens
+    per second; a request takes one token. A bucket that has refilled is the same as
+    a new one, so idle tenants' buckets are dropped, at most every ``sweep_interval``.
+    """
+
+    def __init__(self, rate: float, burst: int, sweep_interval: float = 60):
+        """
+        Args:
+            rate (float): Default refill rate in requests per second.
+            burst (int): Default bucket size.
+            sweep_interval (float): Seconds between sweeps of the full buckets.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.sweep_interval = sweep_interval
+        # tenant_id -> [tokens, last refill time, time the bucket is full again]
+        self._buckets: Dict[str, list] = {}
+        self._swept_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tenant_id: str, rate: float | None = None, burst: int | None = None) -> float:
+        """
+        Takes a token from the tenant's bucket.
+
+        Args:
+            tenant_id (str): The ID of the tenant.
+            rate (float): The tenant's refill rate, if it overrides the default.
+            burst (int): The tenant's bucket size, if it overrides the default.
+
+        Returns:
+            float: 0 if the request is allowed, otherwise the seconds until a token is available.
+        """
+        rate = rate or self.rate
+        burst = burst or self.burst
+        now = time.monotonic()
+        with self._lock:
+            if now - self._swept_at >= self.sweep_interval:
+                self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+                self._swept_at = now
+            bucket = self._buckets.get(tenant_id)
+            if bucket is None:
+                bucket = self._buckets[tenant_id] = [float(burst), now, now]
+            tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0.0
+            else:
+                retry_after = (1 - tokens) / rate
+            bucket[0] = tokens
+            bucket[2] = now + (burst - tokens) / rate
+            return retry_after
+
+
+class ConcurrencyLimiter:
+    """
+    Caps the number of concurrent operations (LLM generations) per tenant.
+    """
+
+    def __init__(self, limit: int):
+        """
+        Args:
+            limit (int): Default maximum number of concurrent operations per tenant.
+        """
+        self.limit = limit
+        self._in_flight: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tenant_id: str, limit: int | None = None) -> bool:
+        """
+        Reserves a slot for the tenant if it is under its limit.
+
+        Returns:
+            bool: True if a slot was reserved; it must be released with ``release``.
+        """
+        limit = limit or self.limit
+        with self._lock:
+            in_flight = self._in_flight.get(tenant_id, 0)
+            if in_flight >= limit:
+                return False
+            self._in_flight[tenant_id] = in_flight + 1
+            return True
+
+    def release(self, tenant_id: str):
+        """
+        Frees a slot reserved with ``try_acquire``.
+        """
+        with self._lock:
+            in_flight = self._in_flight.get(tenant_id, 0) - 1
+            if in_flight > 0:
+                self._in_flight[tenant_id] = in_flight
+            else:
+                self._in_flight.pop(tenant_id, None)
+
+
+def retry_after_header(seconds: float) -> Dict[str, str]:
+    """
+    Returns the Retry-After header for a 429 response, in whole seconds.
+    """
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+# Shared limiters: requests per tenant, and LLM generations in flight per tenant.
+request_limiter = TokenBucketLimiter(rate=settings.rate_limit_requests_per_minute / 60, burst=settings.rate_limit_burst)
+generation_limiter = ConcurrencyLimiter(limit=settings.max_concurrent_generations)
@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Sequence
+
+import numpy as np
+
+from ..config import settings
+from ..vector_data.collection_index import collection_index
+from ..vector_data.quantization import dot, quantize
+
+
+class _TenantCache:
+    """
+    The cached answers of one tenant, in least-recently-used order.
+    """
+
+    def __init__(self, generation: int = 0):
+        # The generation of the tenant's collection the answers were built from.
+        self.generation = generation
+        # entry id -> (embedding codes, scale, answer, created)
+        self.entries: "OrderedDict[int, tuple[np.ndarray, float | None, str, float]]" = OrderedDict()
+        self.next_id = 0
+        # Stacked, normalized question embeddings; rebuilt lazily after the entries change.
+        self.matrix: np.ndarray | None = None
+        self.scales: np.ndarray | None = None
+        self.matrix_ids: list[int] = []
+
+
+class SemanticCache:
+    """
+    Per-tenant cache of LLM answers keyed on the embedding of the question.
+
+    A question is a hit when its cosine similarity to a recently answered question
+    of the same tenant is at least ``similarity_threshold``. Entries expire after
+    ``ttl_seconds`` and each tenant keeps at most ``max_entries`` answers.
+    Embeddings can be stored as float16 or int8 to shrink the cache's memory.
+
+    Each process has its own cache, but documents are ingested and deleted by other
+    workers and by the bulk CLI. ``generation`` returns the current generation of a
+    tenant's collection, shared by all processes through the collection index; a
+    tenant's answers are dropped as soon as it differs from the one they were built on.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.95,
+        ttl_seconds: float = 3600,
+        max_entries: int = 512,
+        storage_dtype: str = "float32",
+        generation: Callable[[str], int] | None = None,
+    ):
+        """
+        Initializes an empty cache.
+
+        Args:
+            similarity_threshold (float): Minimum cosine similarity for a cache hit.
+            ttl_seconds (float): How long an answer stays valid.
+            max_entries (int): Maximum number of answers kept per tenant.
+            storage_dtype (str): How question embeddings are stored: float32, float16 or int8.
+            generation (Callable[[str], int]): Returns the generation of a tenant's collection
+                (default: the answers are only dropped by ``invalidate``).
+        """
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.storage_dtype = storage_dtype
+        self.generation = generation or (lambda tenant_id: 0)
+        self._tenants: Dict[str, _TenantCache] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self, tenant: _TenantCache, now: float):
+        # Entries are kept in insertion/use order, but a hit refreshes the position
+        # and not the timestamp, so every entry has to be checked.
+        expired = [entry_id for entry_id, entry in tenant.entries.items() if now - entry[3] > self.ttl_seconds]
+        for entry_id in expired:
+            del tenant.entries[entry_id]
+        if expired:
+            tenant.matrix = None
+
+    def lookup(self, tenant_id: str, embedding: Sequence[float]) -> str | None:
+        """
+        Returns the cached answer for a similar question, if there is one.
+
+        Args:
+            tenant_id (str): The ID of the tenant.
+            embedding (Sequence[float]): The embedding of the new question.
+
+        Returns:
+            str | None: The cached answer, or None on a miss.
+        """
+        query = self._normalize(embedding)
+        generation = self.generation(tenant_id)
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            if tenant is None:
+                return None
+            if tenant.generation != generation:
+                # The documents changed since the answers were cached, maybe in another process.
+                del self._tenants[tenant_id]
+                return None
+            self._expire(tenant, time.monotonic())
+            if not tenant.entries:
+                return None
+            if tenant.matrix is None:
+                tenant.matrix_ids = list(tenant.entries)
+                tenant.matrix = np.stack([tenant.entries[entry_id][0] for entry_id in tenant.matrix_ids])
+                if self.storage_dtype == "int8":
+                    tenant.scales = np.array([tenant.entries[entry_id][1] for entry_id in tenant.matrix_ids])
+                else:
+                    tenant.scales = None
+            similarities = dot(tenant.matrix, tenant.scales, query)
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.similarity_threshold:
+                return None
+            entry_id = tenant.matrix_ids[best]
+            tenant.entries.move_to_end(entry_id)
+            return tenant.entries[entry_id][2]
+
+    def store(self, tenant_id: str, embedding: Sequence[float], answer: str):
+        """
+        Caches the answer to a question.
+
+        Args:
+            tenant_id (str): The ID of the tenant.
+            embedding (Sequence[float]): The embedding of the question.
+            answer (str): The LLM's answer.
+        """
+        codes, scale = quantize(self._normalize(embedding), self.storage_dtype)
+        generation = self.generation(tenant_id)
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            if tenant is None or tenant.generation != generation:
+                tenant = self._tenants[tenant_id] = _TenantCache(generation)
+            tenant.entries[tenant.next_id] = (codes, None if scale is None else float(scale), answer, time.monotonic())
+            tenant.next_id += 1
+            while len(tenant.entries) > self.max_entries:
+                tenant.entries.popitem(last=False)
+            tenant.matrix = None
+
+    def invalidate(self, tenant_id: str):
+        """
+        Drops every cached answer of a tenant, e.g. after new documents were ingested.
+
+        Only this process's answers are dropped at once; other processes drop theirs
+        when they see the collection's new generation.
+
+        Args:
+            tenant_id (str): The ID of the tenant.
+        """
+        with self._lock:
+            self._tenants.pop(tenant_id, None)
+
+
+def collection_generation(tenant_id: str) -> int:
+    """
+    Returns the generation of a tenant's collection in the collection index (0 if it has none).
+    """
+    info = collection_index.get(tenant_id)
+    return info.generation if info is not None else 0
+
+
+# Shared cache used by the chat endpoint and invalidated by document ingestion.
+semantic_cache = SemanticCache(
+    similarity_threshold=settings.semantic_cache_threshold,
+    ttl_seconds=settings.semantic_cache_ttl,
+    max_entries=settings.semantic_cache_max_entries,
+    storage_dtype=settings.embedding_storage_dtype,
+    generation=collection_generation,
+)
@@ -1,20 +1,23 @@
-import json
 import os
-from typing import Dict
+from typing import Dict, Tuple
+
+from .config_cache import ConfigCache, config_cache
 
 class ThemeManager:
     """
     Manages the saving and retrieval of theme data for different tenants.
     """
 
-    def __init__(self, data_dir: str = "ai-assistant/api/theme_data"):
+    def __init__(self, data_dir: str = "ai-assistant/api/theme_data", cache: ConfigCache = config_cache):
         """
         Initializes the ThemeManager with a directory to store theme data.
 
         Args:
             data_dir (str): The directory where theme files will be stored.
+            cache (ConfigCache): The cache theme files are read and written through.
         """
         self.data_dir = data_dir
+        self.cache = cache
         os.makedirs(self.data_dir, exist_ok=True)  # Create directory if it doesn't exist
 
     def save_theme(self, tenant_id: str, theme_data: Dict):
@@ -27,8 +30,7 @@ class ThemeManager:
         """
         file_path = os.path.join(self.data_dir, f"theme_{tenant_id}.json")
         try:
-            with open(file_path, "w") as f:
-                json.dump(theme_data, f, indent=4)
+            self.cache.write(file_path, theme_data)
         except Exception as e:
             print(f"Error saving theme for tenant {tenant_id}: {e}")
 
@@ -42,6 +44,19 @@ class ThemeManager:
         Returns:
             Dict: The theme data, or a default theme if the file does not exist.
         """
+        return self.get_theme_with_etag(tenant_id)[0]
+
+    def get_theme_with_etag(self, tenant_id: str) -> Tuple[Dict, str | None]:
+        """
+        Retrieves the theme data for a given tenant together with its ETag.
+
+        Args:
+            tenant_id (str): The ID of the tenant.
+
+        Returns:
+            Tuple[Dict, str | None]: The theme data (or the default theme) and its ETag,
+            None for the default theme.
+        """
         file_path = os.path.join(self.data_dir, f"theme_{tenant_id}.json")
         default_theme = {
             "primaryColor": "#007bff",  # Example default color
@@ -49,10 +64,10 @@ class ThemeManager:
             "fontFamily": "Arial, sans-serif",
         }
         try:
-            with open(file_path, "r") as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return default_theme  # Return default theme if file not found
+            theme, etag = self.cache.read(file_path)
+            if theme is None:
+                return default_theme, None  # Return default theme if file not found
+            return theme, etag
         except Exception as e:
             print(f"Error getting theme for tenant {tenant_id}: {e}")
-            return default_theme
\ No newline at end of file
+            return default_theme, None
\ No newline at end of file
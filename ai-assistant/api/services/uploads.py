@@ -0,0 +1,144 @@
+import os
+from typing import BinaryIO
+
+from fastapi import HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.status import HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+from ..config import settings
+
+# Room for the multipart boundaries and part headers around the uploaded file.
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Upload exceeds the limit of {max_bytes} bytes",
+    )
+
+
+def check_content_length(request: Request, max_bytes: int | None = None):
+    """
+    Rejects a request whose declared body size is over the upload limit, before the body is read.
+
+    Args:
+        request (Request): The incoming request.
+        max_bytes (int): The upload limit (default: settings.max_upload_bytes).
+
+    Raises:
+        HTTPException: 413 if the Content-Length header is over the limit.
+    """
+    max_bytes = max_bytes or settings.max_upload_bytes
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD:
+        raise _too_large(max_bytes)
+
+
+class UploadSizeMiddleware:
+    """
+    ASGI middleware enforcing the upload limit on every request body.
+
+    A declared Content-Length over the limit is rejected before the body is read,
+    and the bytes are counted as they arrive, so a chunked request without
+    Content-Length is cut off as soon as it goes over the limit instead of being
+    spooled to disk in full.
+    """
+
+    def __init__(self, app, max_bytes: int | None = None):
+        self.app = app
+        self.max_bytes = max_bytes or settings.max_upload_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            check_content_length(Request(scope), self.max_bytes)
+        except HTTPException as e:
+            await JSONResponse(status_code=e.status_code, content={"detail": e.detail})(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def receive_with_limit():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes + MULTIPART_OVERHEAD:
+                    raise _too_large(self.max_bytes)
+            return message
+
+        async def send_tracking_start(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive_with_limit, send_tracking_start)
+        except HTTPException as e:
+            # Raised by the body read outside of a route's exception handling.
+            if response_started or e.status_code != HTTP_413_REQUEST_ENTITY_TOO_LARGE:
+                raise
+            await JSONResponse(status_code=e.status_code, content={"detail": e.detail})(scope, receive, send)
+
+
+def copy_upload(source: BinaryIO, dest_path: str, max_bytes: int, chunk_size: int) -> int:
+    """
+    Copies an upload to disk in fixed-size chunks, removing the partial file if it is over the limit.
+
+    Blocking; run it in the threadpool.
+
+    Returns:
+        int: The number of bytes written.
+
+    Raises:
+        HTTPException: 413 if the file is over the limit.
+    """
+    os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+    written = 0
+    try:
+        with open(dest_path, "wb") as f:
+            while True:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise _too_large(max_bytes)
+                f.write(chunk)
+    except BaseException:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+    return written
+
+
+async def save_upload(file: UploadFile, dest_path: str, max_bytes: int | None = None, chunk_size: int | None = None) -> int:
+    """
+    Streams an uploaded file to disk in fixed-size chunks, in the threadpool.
+
+    Only one chunk is held in memory at a time. If the file turns out to be larger
+    than ``max_bytes`` the partial file is removed.
+
+    Args:
+        file (UploadFile): The uploaded file.
+        dest_path (str): Where to write the file.
+        max_bytes (int): The upload limit (default: settings.max_upload_bytes).
+        chunk_size (int): Bytes read per chunk (default: settings.upload_chunk_size).
+
+    Returns:
+        int: The number of bytes written.
+
+    Raises:
+        HTTPException: 413 if the file is over the limit.
+    """
+    max_bytes = max_bytes or settings.max_upload_bytes
+    chunk_size = chunk_size or settings.upload_chunk_size
+    await file.seek(0)
+    return await run_in_threadpool(copy_upload, file.file, dest_path, max_bytes, chunk_size)
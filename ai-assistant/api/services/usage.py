@@ -0,0 +1,267 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, NamedTuple
+
+from ..config import settings
+
+# Quota keys of the tenant limits and the rolling windows, in seconds, they apply to.
+QUOTA_WINDOWS = {"tokens_per_hour": 3600, "tokens_per_day": 86400}
+
+
+class GenerationUsage(NamedTuple):
+    """
+    The token counts and timings Ollama reports for one generation.
+    """
+    prompt_tokens: int
+    completion_tokens: int
+    prompt_eval_seconds: float
+    eval_seconds: float
+    total_seconds: float
+
+    @classmethod
+    def from_response(cls, response: Dict) -> "GenerationUsage | None":
+        """
+        Reads the usage from a non-streamed response or the last line of a stream.
+
+        Returns:
+            GenerationUsage | None: The usage, or None if the response has no token counts.
+        """
+        if "prompt_eval_count" not in response and "eval_count" not in response:
+            return None
+        # Ollama leaves prompt_eval_count out when the whole prompt came from its cache.
+        return cls(
+            prompt_tokens=int(response.get("prompt_eval_count") or 0),
+            completion_tokens=int(response.get("eval_count") or 0),
+            prompt_eval_seconds=(response.get("prompt_eval_duration") or 0) / 1e9,
+            eval_seconds=(response.get("eval_duration") or 0) / 1e9,
+            total_seconds=(response.get("total_duration") or 0) / 1e9,
+        )
+
+
+class UsageTracker:
+    """
+    Aggregates the LLM token usage of the tenants, per model and minute, in SQLite.
+
+    Every API worker adds its generations to the same per-minute rows, so rolling
+    windows (the last hour, the last day, ...) are sums over a few indexed rows,
+    and the totals survive restarts. Rows older than the retention are pruned.
+
+    Token quotas are checked against the tenant's usage in the quota's window. The
+    totals are cached for ``quota_refresh_interval`` seconds and this worker's own
+    generations are added to them as they finish, so checking a quota does not hit
+    the database on every request.
+    """
+
+    def __init__(
+        self,
+        db_path: str | None = None,
+        retention_days: int | None = None,
+        quota_refresh_interval: float | None = None,
+    ):
+        """
+        Initializes the tracker. The database is created on first use.
+
+        Args:
+            db_path (str): Path of the SQLite database (default: settings.usage_db_path).
+            retention_days (int): Days of usage kept (default: settings.usage_retention_days).
+            quota_refresh_interval (float): Seconds the usage totals of the quota checks are
+                cached (default: settings.usage_quota_refresh_interval).
+        """
+        self.db_path = db_path or settings.usage_db_path
+        self.retention_days = retention_days or settings.usage_retention_days
+        self.quota_refresh_interval = (
+            settings.usage_quota_refresh_interval if quota_refresh_interval is None else quota_refresh_interval
+        )
+        self._local = threading.local()
+        # (tenant_id, window) -> [tokens used, expiry]
+        self._used: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Returns this thread's connection, opening it on first use.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS usage (
+                    tenant_id TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    minute INTEGER NOT NULL,
+                    requests INTEGER NOT NULL,
+                    prompt_tokens INTEGER NOT NULL,
+                    completion_tokens INTEGER NOT NULL,
+                    prompt_eval_seconds REAL NOT NULL,
+                    eval_seconds REAL NOT NULL,
+                    total_seconds REAL NOT NULL,
+                    PRIMARY KEY (tenant_id, model, minute)
+                );
+                CREATE INDEX IF NOT EXISTS idx_usage_tenant_minute ON usage (tenant_id, minute);
+                CREATE INDEX IF NOT EXISTS idx_usage_minute ON usage (minute);
+                """
+            )
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _first_minute(window: float, now: float) -> int:
+        # The window covers the current (partial) minute and the ones before it.
+        return int(now // 60) - max(int(window // 60), 1) + 1
+
+    def record(self, tenant_id: str, model: str, usage: GenerationUsage, now: float | None = None):
+        """
+        Adds a generation to the tenant's usage.
+
+        Args:
+            tenant_id (str): The ID of the tenant.
+            model (str): The model that generated the answer.
+            usage (GenerationUsage): The counts and timings reported by Ollama.
+            now (float): The current time (default: time.time()).
+        """
+        now = time.time() if now is None else now
+        minute = int(now // 60)
+        connection = self._connection()
+        connection.execute(
+            """
+            INSERT INTO usage VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?)
+            ON CONFLICT (tenant_id, model, minute) DO UPDATE SET
+                requests = requests + 1,
+                prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                completion_tokens = completion_tokens + excluded.completion_tokens,
+                prompt_eval_seconds = prompt_eval_seconds + excluded.prompt_eval_seconds,
+                eval_seconds = eval_seconds + excluded.eval_seconds,
+                total_seconds = total_seconds + excluded.total_seconds
+            """,
+            (tenant_id, model, minute, usage.prompt_tokens, usage.completion_tokens,
+             usage.prompt_eval_seconds, usage.eval_seconds, usage.total_seconds),
+        )
+        tokens = usage.prompt_tokens + usage.completion_tokens
+        with self._lock:
+            for window in QUOTA_WINDOWS.values():
+                cached = self._used.get((tenant_id, window))
+                if cached is not None:
+                    cached[0] += tokens
+            prune = now - self._last_prune > 3600
+            if prune:
+                self._last_prune = now
+        if prune:
+            connection.execute("DELETE FROM usage WHERE minute < ?", (minute - self.retention_days * 1440,))
+
+    def tokens_used(self, tenant_id: str, window: float, now: float | None = None) -> int:
+        """
+        Returns the prompt and completion tokens the tenant used in the last ``window`` seconds.
+        """
+        now = time.time() if now is None else now
+        row = self._connection().execute(
+            "SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0) FROM usage WHERE tenant_id = ? AND minute >= ?",
+            (tenant_id, self._first_minute(window, now)),
+        ).fetchone()
+        return row[0]
+
+    def quota_retry_after(self, tenant_id: str, limits: Dict, now: float | None = None) -> float:
+        """
+        Checks the tenant's token quotas before a generation is dispatched.
+
+        Args:
+            tenant_id (str): The ID of the tenant.
+            limits (Dict): The tenant's limits; ``tokens_per_hour`` and ``tokens_per_day``
+                override the default quotas.
+            now (float): The current time (default: time.time()).
+
+        Returns:
+            float: 0 if the tenant is within its quotas, otherwise the seconds until enough
+            usage leaves the windows of the exceeded quotas (usage is counted per minute).
+        """
+        defaults = {"tokens_per_hour": settings.usage_tokens_per_hour, "tokens_per_day": settings.usage_tokens_per_day}
+        now = time.time() if now is None else now
+        retry_after = 0.0
+        for key, window in QUOTA_WINDOWS.items():
+            quota = limits.get(key, defaults[key])
+            if not quota:
+                continue
+            with self._lock:
+                cached = self._used.get((tenant_id, window))
+            if cached is None or cached[1] <= now:
+                cached = [self.tokens_used(tenant_id, window, now), now + self.quota_refresh_interval]
+                with self._lock:
+                    self._used[(tenant_id, window)] = cached
+            if cached[0] >= quota:
+                retry_after = max(retry_after, self._seconds_until_below(tenant_id, window, cached[0] - quota, now))
+        return retry_after
+
+    def _seconds_until_below(self, tenant_id: str, window: float, excess: int, now: float) -> float:
+        """
+        Returns the seconds until more than ``excess`` tokens of the tenant's usage left the window.
+        """
+        first_minute = self._first_minute(window, now)
+        minutes = int(now // 60) - first_minute + 1
+        leaving = 0
+        for minute, tokens in self._connection().execute(
+            "SELECT minute, SUM(prompt_tokens + completion_tokens) FROM usage "
+            "WHERE tenant_id = ? AND minute >= ? GROUP BY minute ORDER BY minute",
+            (tenant_id, first_minute),
+        ):
+            leaving += tokens
+            if leaving > excess:
+                # The minute's usage leaves the window once the window no longer covers it.
+                return max(math.ceil((minute + minutes) * 60 - now), 1)
+        # Usage this worker counted but the database does not have yet.
+        return max(math.ceil(window), 1)
+
+    def stats(self, window: float = 3600, tenant_id: str | None = None, now: float | None = None) -> List[Dict]:
+        """
+        Summarizes the usage of the last ``window`` seconds per tenant and model.
+
+        Throughputs are tokens per second of Ollama's evaluation time, None when no
+        time was reported. Rows are sorted by prompt tokens, largest first, since
+        oversized contexts are what costs the most evaluation time.
+
+        Args:
+            window (float): The length of the window in seconds.
+            tenant_id (str): Only report this tenant.
+            now (float): The current time (default: time.time()).
+
+        Returns:
+            List[Dict]: One entry per tenant and model.
+        """
+        now = time.time() if now is None else now
+        query = """
+            SELECT tenant_id, model, SUM(requests), SUM(prompt_tokens), SUM(completion_tokens),
+                   SUM(prompt_eval_seconds), SUM(eval_seconds), SUM(total_seconds)
+            FROM usage WHERE minute >= ?
+        """
+        params: list = [self._first_minute(window, now)]
+        if tenant_id is not None:
+            query += " AND tenant_id = ?"
+            params.append(tenant_id)
+        query += " GROUP BY tenant_id, model ORDER BY SUM(prompt_tokens) DESC"
+
+        stats = []
+        for tenant, model, requests, prompt, completion, prompt_seconds, eval_seconds, total_seconds in (
+            self._connection().execute(query, params)
+        ):
+            stats.append({
+                "tenant_id": tenant,
+                "model": model,
+                "requests": requests,
+                "prompt_tokens": prompt,
+                "completion_tokens": completion,
+                "avg_prompt_tokens": round(prompt / requests, 1),
+                "prompt_tokens_per_second": round(prompt / prompt_seconds, 2) if prompt_seconds else None,
+                "completion_tokens_per_second": round(completion / eval_seconds, 2) if eval_seconds else None,
+                "generation_seconds": round(total_seconds, 3),
+            })
+        return stats
+
+
+# Shared usage tracker, fed by the LLM client and checked before generations.
+usage_tracker = UsageTracker()
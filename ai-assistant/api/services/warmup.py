@@ -0,0 +1,91 @@
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+
+class WarmUp:
+    """
+    Runs the steps that preload a worker's models and state, once, and reports readiness.
+
+    Importing the API loads nothing heavy, so workers start in a fraction of a second;
+    the embedding model and the LLM are loaded here instead, ahead of the traffic.
+    The readiness endpoint reports ready only once every required step succeeded,
+    so a load balancer does not route requests to a worker that is still loading.
+    Optional steps (e.g. asking Ollama to load its model) are reported but do not
+    hold readiness back.
+    """
+
+    def __init__(self):
+        # (name, function, required), in the order they run
+        self._steps: List[Tuple[str, Callable[[], object], bool]] = []
+        self._results: Dict[str, Dict] = {}
+        self.state = "pending"
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def add_step(self, name: str, function: Callable[[], object], required: bool = True):
+        """
+        Registers a warm-up step.
+
+        Args:
+            name (str): The name reported by the readiness endpoint.
+            function (Callable): Does the work; its return value, if any, is reported.
+            required (bool): Whether the worker is only ready once the step succeeded.
+        """
+        self._steps.append((name, function, required))
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def run(self) -> bool:
+        """
+        Runs the steps, or waits for the run already in progress.
+
+        Returns:
+            bool: True if every required step succeeded.
+        """
+        with self._lock:
+            started = self.state != "pending"
+            if not started:
+                self.state = "warming"
+        if started:
+            self._done.wait()
+            return self.ready
+
+        failed = False
+        for name, function, required in self._steps:
+            start = time.perf_counter()
+            try:
+                result = function()
+                self._results[name] = {"status": "ok", "seconds": round(time.perf_counter() - start, 3)}
+                if result is not None:
+                    self._results[name]["result"] = result
+            except Exception as e:
+                self._results[name] = {
+                    "status": "failed" if required else "skipped",
+                    "seconds": round(time.perf_counter() - start, 3),
+                    "error": str(e),
+                }
+                failed = failed or required
+        self.state = "failed" if failed else "ready"
+        self._done.set()
+        return self.ready
+
+    def start(self) -> threading.Thread:
+        """
+        Runs the steps in a background thread, so the server accepts connections (and readiness probes) meanwhile.
+        """
+        thread = threading.Thread(target=self.run, name="warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> Dict:
+        """
+        Returns the state ("pending", "warming", "ready" or "failed") and the outcome of each finished step.
+        """
+        return {"status": self.state, "steps": dict(self._results)}
+
+
+# The worker's warm-up; main.py registers the steps.
+warmup = WarmUp()
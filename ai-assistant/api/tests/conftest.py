@@ -0,0 +1,9 @@
+import pytest
+
+from ..services.api_keys import api_key_store
+
+
+@pytest.fixture(autouse=True)
+def tenant_ids_as_api_keys(monkeypatch):
+    # The endpoint tests authenticate with their tenant ID as the API key, the legacy behaviour.
+    monkeypatch.setattr(api_key_store, "allow_tenant_id_as_key", True)
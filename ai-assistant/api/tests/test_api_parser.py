@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+from ai_assistant.api.services import api_parser
+from ai_assistant.api.services.api_parser import ApiParser, RefResolver, operation_text
+
+SPEC = {
+    "openapi": "3.0.0",
+    "info": {"title": "Acme API", "version": "2.1"},
+    "servers": [{"url": "https://api.acme.com/v1"}],
+    "security": [{"oauth": ["users:read"]}],
+    "paths": {
+        "/users/{id}": {
+            "parameters": [{"$ref": "#/components/parameters/UserId"}],
+            "get": {
+                "summary": "Get a user",
+                "operationId": "getUser",
+                "parameters": [{"name": "fields", "in": "query", "schema": {"type": "array", "items": {"type": "string"}}}],
+                "responses": {"200": {"$ref": "#/components/responses/User"}, "404": {"description": "Not found"}},
+            },
+            "put": {
+                "summary": "Update a user",
+                "x-permissions": ["can_edit_users"],
+                "requestBody": {"content": {"application/json": {"schema": {"$ref": "#/components/schemas/User"}}}},
+                "responses": {"200": {"$ref": "#/components/responses/User"}},
+            },
+        },
+    },
+    "components": {
+        "parameters": {"UserId": {"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}}},
+        "responses": {"User": {"description": "The user"}},
+        "schemas": {"User": {"type": "object"}, "Loop": {"$ref": "#/components/schemas/Loop"}},
+    },
+}
+
+
+def test_parse_openapi_summary():
+    summary = ApiParser().parse_openapi(json.dumps(SPEC))
+    assert (summary["title"], summary["version"]) == ("Acme API", "2.1")
+    assert summary["endpoints"][0] == {"method": "GET", "url": "/users/{id}", "description": "Get a user"}
+    assert ApiParser().parse_openapi("{")["error"] == "Invalid JSON string provided."
+    assert "error" in ApiParser().parse_openapi(json.dumps({"info": {}}))
+
+
+def test_references_are_resolved_once_and_cycles_stop():
+    resolver = RefResolver(SPEC)
+    user = resolver.resolve({"$ref": "#/components/schemas/User"})
+    assert user == {"type": "object"}
+    assert resolver.resolve({"$ref": "#/components/schemas/User"}) is user
+    assert resolver.resolve({"$ref": "#/components/schemas/Loop"}) == {}
+    assert resolver.resolve({"$ref": "other.json#/User"}) == {}
+
+
+def read_records(tmp_path):
+    path = tmp_path / "acme.json"
+    path.write_text(json.dumps(SPEC))
+    spec = ApiParser().read_openapi(str(path))
+    return spec, list(spec.operations)
+
+
+def test_one_record_per_operation(tmp_path):
+    spec, (get_user, put_user) = read_records(tmp_path)
+    assert spec.servers == ["https://api.acme.com/v1"]
+    assert (get_user["method"], get_user["path"], get_user["operation_id"]) == ("GET", "/users/{id}", "getUser")
+    assert [(p["name"], p["in"], p["type"], p["required"]) for p in get_user["parameters"]] == [
+        ("id", "path", "integer", True), ("fields", "query", "array of string", False),
+    ]
+    assert get_user["responses"] == {"200": "The user", "404": "Not found"}
+    assert get_user["permissions"] == ["users:read"]
+    assert put_user["permissions"] == ["can_edit_users"]
+    assert put_user["request_body"] == {"required": False, "content_types": ["application/json"], "schema": "User"}
+
+    text = operation_text(put_user)
+    assert text.startswith("PUT /users/{id}\nSummary: Update a user")
+    assert "Request body: User (application/json)" in text and "Permissions: can_edit_users" in text
+
+    (tmp_path / "list.json").write_text("[1, 2]")
+    assert ApiParser().read_openapi(str(tmp_path / "list.json")) is None
+
+
+def test_large_specs_are_streamed(monkeypatch, tmp_path):
+    pytest.importorskip("ijson")
+    monkeypatch.setattr(api_parser.settings, "openapi_streaming_min_bytes", 0)
+    streamed, streamed_records = read_records(tmp_path)
+    monkeypatch.setattr(api_parser, "ijson", None)
+    loaded, loaded_records = read_records(tmp_path)
+    assert (streamed.title, streamed.servers) == (loaded.title, loaded.servers)
+    assert streamed_records == loaded_records
+
+
+def test_specs_are_ingested_one_chunk_per_operation(tmp_path):
+    from ai_assistant.api.vector_data.ingest_docs import iter_file_chunks
+
+    path = tmp_path / "acme.json"
+    path.write_text(json.dumps(SPEC))
+    operations = []
+    chunks = list(iter_file_chunks(str(path), "acme.json", lambda **update: None, operations))
+    assert [chunk.metadata for chunk in chunks] == [
+        {"source": "acme.json", "method": "GET", "path": "/users/{id}"},
+        {"source": "acme.json", "method": "PUT", "path": "/users/{id}"},
+    ]
+    assert chunks[0].page_content == operation_text(operations[0])
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ai_assistant.api.llm.backend_pool import Backend, BackendPool, NoBackendAvailable, parse_backends
+from ai_assistant.api.llm.llm_client import LlmClient
+
+
+class StubOllama:
+    """
+    A local HTTP server answering Ollama's generate API, optionally with a 500.
+    """
+
+    def __init__(self, name, status=200):
+        self.name = name
+        self.status = status
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests.append(payload)
+                if stub.status != 200:
+                    body = json.dumps({"error": "model crashed"}).encode()
+                elif payload["stream"]:
+                    body = (
+                        json.dumps({"response": stub.name, "done": False}) + "\n" + json.dumps({"done": True}) + "\n"
+                    ).encode()
+                else:
+                    body = json.dumps({"response": stub.name, "model": payload["model"]}).encode()
+                self.send_response(stub.status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stubs():
+    servers = {}
+
+    def start(name, status=200):
+        servers[name] = StubOllama(name, status)
+        return servers[name]
+
+    yield start
+    for server in servers.values():
+        server.close()
+
+
+def make_client(backends, **pool_options):
+    client = LlmClient(model_name="llama2", vector_store=object(), backends=backends)
+    for name, value in pool_options.items():
+        setattr(client.backends, name, value)
+    return client
+
+
+async def ask(client, tenant_id, message, model=None):
+    try:
+        return await client.query(tenant_id, message, [], model=model)
+    finally:
+        await client.aclose()
+
+
+def test_parse_backends():
+    backends = parse_backends("http://gpu-1:11434/, http://gpu-2:11434=llama2:70b|mixtral")
+    assert [b.url for b in backends] == ["http://gpu-1:11434", "http://gpu-2:11434"]
+    assert backends[0].models is None
+    assert backends[1].serves("mixtral") and not backends[1].serves("llama2")
+
+
+def test_least_outstanding_backend_is_chosen():
+    pool = BackendPool([Backend("http://a"), Backend("http://b")])
+    first = pool.acquire("llama2")
+    second = pool.acquire("llama2")
+    assert {first.url, second.url} == {"http://a", "http://b"}
+    pool.release(first)
+    assert pool.acquire("llama2") is first
+
+
+def test_circuit_opens_after_consecutive_failures_and_half_opens():
+    pool = BackendPool([Backend("http://a")], failure_threshold=2, cooldown=60)
+    for _ in range(2):
+        pool.release(pool.acquire("llama2"), healthy=False)
+    assert pool.stats()[0]["circuit"] == "open"
+    with pytest.raises(NoBackendAvailable):
+        pool.acquire("llama2")
+
+    # Once the cooldown is over a single trial request goes through.
+    pool.backends[0].open_until = 0
+    trial = pool.acquire("llama2")
+    with pytest.raises(NoBackendAvailable):
+        pool.acquire("llama2")
+    pool.release(trial)
+    assert pool.stats()[0]["circuit"] == "closed"
+
+
+def test_query_fails_over_to_a_healthy_backend(stubs):
+    broken, healthy = stubs("broken", status=500), stubs("healthy")
+    client = make_client([Backend(broken.url), Backend(healthy.url)], failure_threshold=1)
+
+    async def scenario():
+        answers = [await client.query("tenant", f"question {i}", []) for i in range(3)]
+        await client.aclose()
+        return answers
+
+    assert asyncio.run(scenario()) == ["healthy"] * 3
+    # The broken backend's circuit opened after its first failure.
+    assert len(broken.requests) == 1
+    assert len(healthy.requests) == 3
+    assert [b["circuit"] for b in client.backends.stats()] == ["open", "closed"]
+
+
+def test_stream_fails_over_before_the_first_token(stubs):
+    broken, healthy = stubs("broken", status=500), stubs("healthy")
+    client = make_client([Backend(broken.url), Backend(healthy.url)])
+
+    async def scenario():
+        tokens = [token async for token in client.stream("tenant", "question", [])]
+        await client.aclose()
+        return tokens
+
+    assert asyncio.run(scenario()) == ["healthy"]
+    assert len(broken.requests) == 1
+
+
+def test_tenant_model_is_routed_to_the_backends_serving_it(stubs):
+    small, large = stubs("small"), stubs("large")
+    client = make_client([Backend(small.url, ["llama2"]), Backend(large.url, ["llama2:70b"])])
+
+    assert asyncio.run(ask(client, "acme", "question", model="llama2:70b")) == "large"
+    assert large.requests[0]["model"] == "llama2:70b"
+    assert asyncio.run(ask(client, "other", "question")) == "small"
+    with pytest.raises(NoBackendAvailable):
+        asyncio.run(ask(client, "other", "question", model="mixtral"))
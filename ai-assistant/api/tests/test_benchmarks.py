@@ -0,0 +1,44 @@
+import json
+
+import httpx
+import numpy as np
+
+from ai_assistant.api.benchmarks.fake_embeddings import FakeEmbeddingFunction
+from ai_assistant.api.benchmarks.load_test import compare
+from ai_assistant.api.benchmarks.stub_ollama import StubOllama
+
+
+def test_fake_embeddings_are_deterministic_unit_vectors():
+    embed = FakeEmbeddingFunction(dimensions=64)
+    first, second = np.array(embed(["reset password", "billing"]))
+    assert np.allclose(embed(["reset password"])[0], first)
+    assert np.isclose(np.linalg.norm(first), 1.0)
+    assert abs(first @ second) < 0.5
+
+
+def test_stub_ollama_streams_the_configured_tokens():
+    stub = StubOllama(latency=0, token_rate=0, tokens=3)
+    try:
+        payload = {"model": "llama2", "prompt": "two words", "stream": True}
+        with httpx.stream("POST", f"{stub.url}/api/generate", json=payload) as response:
+            chunks = [json.loads(line) for line in response.iter_lines() if line]
+        assert "".join(chunk["response"] for chunk in chunks) == "ok ok ok"
+        assert chunks[-1]["done"] and chunks[-1]["eval_count"] == 3 and chunks[-1]["prompt_eval_count"] == 2
+
+        payload["stream"] = False
+        assert httpx.post(f"{stub.url}/api/generate", json=payload).json()["response"] == "ok ok ok"
+        assert stub.requests == 2
+    finally:
+        stub.close()
+
+
+def test_compare_reports_regressions_beyond_the_tolerance():
+    def run(p95, rps, rss):
+        return {"scenarios": {"chat": {"latency_ms": {"p95": p95}, "requests_per_second": rps}}, "peak_rss_mb": rss}
+
+    assert compare(run(105, 95, 210), run(100, 100, 200), max_regression=0.1) == []
+    assert compare(run(120, 80, 300), run(100, 100, 200), max_regression=0.1) == [
+        "chat: p95 latency 100 ms -> 120 ms",
+        "chat: throughput 100 -> 80 requests/s",
+        "peak RSS 200 MiB -> 300 MiB",
+    ]
@@ -0,0 +1,99 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain.docstore.document import Document
+
+from ai_assistant.api.vector_data import bulk_ingest as bulk, ingest_docs, manifests
+from ai_assistant.api.vector_data.bulk_ingest import bulk_ingest, discover_files
+from ai_assistant.api.vector_data.collection_index import CollectionIndex
+from ai_assistant.api.vector_data.endpoint_index import EndpointIndex
+from ai_assistant.api.vector_data.manifests import ManifestStore
+
+
+class FakeCollection:
+    name = "tenant_acme"
+    metadata = {"embedding_model": "all-mpnet-base-v2"}
+
+    def __init__(self):
+        self.records = {}
+
+    def get(self, ids, include):
+        return {"ids": [id_ for id_ in ids if id_ in self.records]}
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+        self.records.update(zip(ids, documents))
+
+    def delete(self, ids):
+        for id_ in ids:
+            self.records.pop(id_, None)
+
+    def count(self):
+        return len(self.records)
+
+
+class NoLexicalIndex:
+    def add(self, chunks):
+        list(chunks)
+
+    def remove(self, chunk_ids):
+        pass
+
+
+def test_bulk_ingest_batches_across_files_and_resumes(monkeypatch, tmp_path):
+    """
+    Chunks of several files share embedding batches, and a second run skips the finished files.
+    """
+    collection = FakeCollection()
+    store = ManifestStore(str(tmp_path / "manifests.db"))
+    batches = []
+
+    def embed(texts):
+        batches.append(list(texts))
+        return [[0.0] for _ in texts]
+
+    monkeypatch.setattr(bulk, "init_chroma_db", lambda tenant_id: collection)
+    monkeypatch.setattr(bulk.registry, "get_embedding_function", lambda model: embed)
+    monkeypatch.setattr(ingest_docs, "iter_chunks", lambda documents, report: (
+        Document(page_content=line, metadata=document.metadata)
+        for document in documents for line in document.page_content.splitlines() if line.strip()
+    ))
+    index = CollectionIndex(str(tmp_path / "collections.db"))
+    for module in (bulk, manifests):
+        monkeypatch.setattr(module, "document_manifests", store)
+        monkeypatch.setattr(module, "get_lexical_index", lambda tenant_id: NoLexicalIndex())
+        monkeypatch.setattr(module, "collection_index", index)
+        monkeypatch.setattr(module, "endpoint_index", EndpointIndex(str(tmp_path / "endpoints.db")))
+
+    docs = tmp_path / "docs"
+    (docs / "guides").mkdir(parents=True)
+    (docs / "guides" / "setup.md").write_text("install\nconfigure\nfaq\n")
+    (docs / "faq.md").write_text("faq\nbilling\n")
+    (docs / "notes.txt").write_text("not ingested\n")
+    (docs / "broken.json").write_text("{")
+    assert [name for _, name in discover_files(str(docs))] == ["broken.json", "faq.md", "guides/setup.md"]
+
+    checkpoint = str(tmp_path / "checkpoint.json")
+    # The collection index, and so the tenant's cache generation, is updated after every batch.
+    recorded = []
+
+    def report(progress):
+        info = index.get("acme")
+        recorded.append((info.chunk_count, info.generation))
+
+    with ThreadPoolExecutor(2) as executor:
+        result = bulk_ingest(
+            str(docs), "acme", batch_size=2, checkpoint_path=checkpoint, executor=executor, report=report
+        )
+    assert recorded == [(2, 1), (4, 2), (4, 3)]
+    assert (result["files_ingested"], result["files_failed"], result["chunks_embedded"]) == (2, 1, 4)
+    assert list(result["failures"]) == ["broken.json"]
+    assert [len(batch) for batch in batches] == [2, 2]
+    assert sorted(collection.records.values()) == ["billing", "configure", "faq", "install"]
+    assert store.get("acme", "guides/setup.md").chunk_count == 3
+
+    # Resuming: the finished files are skipped without being parsed; an edited file is diffed.
+    (docs / "faq.md").write_text("faq\nbilling and invoices\n")
+    with ThreadPoolExecutor(2) as executor:
+        result = bulk_ingest(str(docs), "acme", batch_size=2, checkpoint_path=checkpoint, executor=executor)
+    assert (result["files_ingested"], result["files_unchanged"], result["files_failed"]) == (1, 1, 1)
+    assert (result["chunks_embedded"], result["chunks_removed"]) == (1, 1)
+    assert sorted(collection.records.values()) == ["billing and invoices", "configure", "faq", "install"]
@@ -1,4 +1,5 @@
 import pytest
+import json
 from fastapi.testclient import TestClient
 from ai_assistant.api.main import app
 
@@ -52,4 +53,56 @@ def test_chat_endpoint_escalation_message():
 # - Messages with special characters
 # - Very long messages
 # - Unauthorized access (missing or invalid API key)
-# - etc.
\ No newline at end of file
+# - etc.
+
+def test_chat_endpoint_streaming(monkeypatch):
+    """
+    Test that the /chat endpoint relays tokens as newline-delimited JSON when streaming is requested.
+    """
+    from ai_assistant.api.routes import chat
+
+    async def fake_stream(tenant_id, message, context, model=None):
+        for token in ["Hel", "lo", "!"]:
+            yield token
+
+    monkeypatch.setattr(chat.settings, "semantic_cache_enabled", False)
+    monkeypatch.setattr(chat.llm_client, "get_context", lambda **kwargs: [])
+    monkeypatch.setattr(chat.llm_client, "stream", fake_stream)
+
+    response = client.post(
+        "/chat",
+        json={"message": "Hi", "stream": True},
+        headers={"X-API-Key": "test-key"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["token"] for line in lines if "token" in line] == ["Hel", "lo", "!"]
+    assert lines[-1] == {"done": True}
+    assert "test-tenant" not in chat.generation_limiter._in_flight
+
+
+def test_stream_releases_the_slot_when_the_client_is_gone_before_the_body():
+    """
+    The generation slot is released even if the stream's generator never started.
+    """
+    import asyncio
+    from starlette.requests import ClientDisconnect
+    from ai_assistant.api.routes.chat import ReleasingStreamingResponse
+
+    started, released = [], []
+
+    async def body():
+        started.append(True)
+        yield "never sent"
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        raise OSError("client disconnected")
+
+    response = ReleasingStreamingResponse(body(), release=lambda: released.append(True))
+    with pytest.raises(ClientDisconnect):
+        asyncio.run(response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send))
+    assert (started, released) == ([], [True])
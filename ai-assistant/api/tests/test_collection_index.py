@@ -0,0 +1,64 @@
+from ai_assistant.api.vector_data.collection_index import CollectionIndex
+
+
+def test_record_and_lookup(tmp_path):
+    index = CollectionIndex(str(tmp_path / "collections.db"), refresh_interval=0)
+    assert index.get("acme") is None
+
+    index.record("acme", "tenant_acme", 12, "hkunlp/instructor-xl")
+    info = index.get("acme")
+    assert (info.chunk_count, info.embedding_model) == (12, "hkunlp/instructor-xl")
+    assert info.last_ingested_at is not None
+
+
+def test_writes_from_other_processes_are_picked_up(tmp_path):
+    """
+    The ingestion workers write through their own connection; readers see the entry on their next refresh.
+    """
+    reader = CollectionIndex(str(tmp_path / "collections.db"), refresh_interval=0)
+    writer = CollectionIndex(str(tmp_path / "collections.db"), refresh_interval=0)
+    assert reader.get("acme") is None
+
+    writer.record("acme", "tenant_acme", 3)
+    assert reader.get("acme").chunk_count == 3
+    writer.record("acme", "tenant_acme", 5)
+    assert reader.get("acme").chunk_count == 5
+
+
+def test_backfill_from_chroma(tmp_path):
+    class FakeCollection:
+        metadata = {"embedding_model": "all-mpnet-base-v2"}
+
+        def __init__(self, count):
+            self._count = count
+
+        def count(self):
+            return self._count
+
+    class FakeClient:
+        collections = {"tenant_acme": FakeCollection(7), "tenant_beta": FakeCollection(0), "other": FakeCollection(1)}
+
+        def list_collections(self):
+            return list(self.collections)
+
+        def get_collection(self, name):
+            return self.collections[name]
+
+    index = CollectionIndex(str(tmp_path / "collections.db"))
+    assert index.is_empty()
+    assert index.backfill(FakeClient()) == 2
+    assert index.get("acme").chunk_count == 7
+    assert index.get("acme").last_ingested_at is None
+    assert index.get("acme").embedding_model == "all-mpnet-base-v2"
+
+    stats = index.stats()
+    assert (stats["tenants"], stats["chunks"]) == (2, 7)
+    assert [c["tenant_id"] for c in stats["collections"]] == ["acme", "beta"]
+
+
+def test_generation_increases_with_every_write(tmp_path):
+    first = CollectionIndex(str(tmp_path / "collections.db"), refresh_interval=0)
+    second = CollectionIndex(str(tmp_path / "collections.db"), refresh_interval=0)
+    assert first.record("acme", "tenant_acme", 3).generation == 1
+    assert second.record("acme", "tenant_acme", 2, ingested=False).generation == 2
+    assert first.get("acme").generation == 2
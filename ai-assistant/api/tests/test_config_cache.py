@@ -0,0 +1,35 @@
+import json
+import os
+
+from ai_assistant.api.services.config_cache import ConfigCache
+
+
+def test_reads_are_cached_and_writes_go_through(tmp_path):
+    """
+    A file is parsed once, writes update the cache, and a missing file reads as None.
+    """
+    cache = ConfigCache(revalidate_interval=60)
+    path = str(tmp_path / "theme_t1.json")
+    assert cache.read(path).data is None
+
+    written = cache.write(path, {"primaryColor": "#000000"})
+    read = cache.read(path)
+    assert read.data == {"primaryColor": "#000000"}
+    assert read.etag == written.etag
+
+
+def test_changes_from_other_workers_are_detected(tmp_path):
+    """
+    A file rewritten behind the cache's back is re-read on the next revalidation.
+    """
+    cache = ConfigCache(revalidate_interval=0)
+    path = str(tmp_path / "permissions.json")
+    first = cache.write(path, {"admin": ["read"]})
+
+    with open(path, "w") as f:
+        json.dump({"admin": ["read", "write"]}, f)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000))
+
+    second = cache.read(path)
+    assert second.data == {"admin": ["read", "write"]}
+    assert second.etag != first.etag
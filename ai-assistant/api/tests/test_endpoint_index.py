@@ -0,0 +1,25 @@
+from ai_assistant.api.vector_data.endpoint_index import EndpointIndex
+
+
+def record(method, path):
+    return {"method": method, "path": path, "summary": f"{method} {path}", "servers": ["https://api.acme.com/v1/"]}
+
+
+def test_lookup_by_method_and_path(tmp_path):
+    index = EndpointIndex(str(tmp_path / "endpoints.db"))
+    index.replace("acme", "acme.json", [
+        record("GET", "/users/{id}"), record("GET", "/users/me"), record("GET", "/files/{name}.{format}"),
+    ])
+
+    assert index.lookup("acme", "get", "/users/me")["summary"] == "GET /users/me"
+    assert index.lookup("acme", "GET", "/users/42/")["summary"] == "GET /users/{id}"
+    assert index.lookup("acme", "GET", "https://api.acme.com/v1/users/42?fields=name")["document"] == "acme.json"
+    assert index.lookup("acme", "GET", "/files/report.pdf")["path"] == "/files/{name}.{format}"
+    assert index.lookup("acme", "DELETE", "/users/42") is None
+    assert index.lookup("other", "GET", "/users/42") is None
+
+    # A new version of the spec replaces its operations.
+    index.replace("acme", "acme.json", [record("GET", "/accounts/{id}")])
+    assert index.lookup("acme", "GET", "/users/42") is None
+    index.remove("acme", "acme.json")
+    assert index.lookup("acme", "GET", "/accounts/1") is None
@@ -1,7 +1,11 @@
+import pytest
 import os
 import json
+import uuid
+from datetime import date
 from fastapi.testclient import TestClient
 from ai_assistant.api.main import app  # Import your FastAPI app
+from ai_assistant.api.services.escalation_store import EscalationStore, escalation_store
 
 client = TestClient(app)
 
@@ -9,31 +13,88 @@ def test_get_escalations():
     """
     Test the /get-escalations endpoint to ensure it returns the correct escalations data.
     """
-    # Create a test escalation file
-    tenant_id = "test-tenant"
-    test_escalations = [
-        {"message": "Test escalation 1", "response": "Response 1", "date": "2024-01-01"},
-        {"message": "Test escalation 2", "response": "Response 2", "date": "2024-01-02"},
-    ]
-    escalation_file = f"ai-assistant/api/escalations/esc_{tenant_id}.json"
-    os.makedirs(os.path.dirname(escalation_file), exist_ok=True)
-    with open(escalation_file, "w") as f:
-        json.dump(test_escalations, f)
+    # Use a fresh tenant, the escalation database outlives a single test
+    tenant_id = f"test-tenant-{uuid.uuid4().hex}"
+    escalation_store.add(tenant_id, "Test escalation 1", "Response 1")
+    escalation_store.add(tenant_id, "Test escalation 2", "Response 2")
 
     # Make a request to the /get-escalations endpoint
-    headers = {"X-API-Key": "test-key"}
+    headers = {"X-API-Key": tenant_id}
     response = client.get("/get-escalations", headers=headers)
 
     # Assert that the response is successful
     assert response.status_code == 200
 
     # Assert that the response data matches the test data
-    assert response.json() == test_escalations
+    escalations = response.json()
+    assert [(e["message"], e["response"]) for e in escalations] == [
+        ("Test escalation 1", "Response 1"),
+        ("Test escalation 2", "Response 2"),
+    ]
 
-    # Clean up the test escalation file
-    os.remove(escalation_file)
+    # Page through the records one at a time
+    response = client.get("/get-escalations", headers=headers, params={"limit": 1})
+    assert [e["message"] for e in response.json()] == ["Test escalation 1"]
+    next_after_id = response.headers["X-Next-After-Id"]
+    response = client.get("/get-escalations", headers=headers, params={"limit": 1, "after_id": next_after_id})
+    assert [e["message"] for e in response.json()] == ["Test escalation 2"]
 
-    # Test with no file
-    response = client.get("/get-escalations", headers=headers)
+    # Test with no escalations
+    response = client.get("/get-escalations", headers={"X-API-Key": f"test-tenant-{uuid.uuid4().hex}"})
     assert response.status_code == 200
-    assert response.json() == []
\ No newline at end of file
+    assert response.json() == []
+
+
+def test_date_range_and_legacy_import(tmp_path):
+    """
+    Records from an old esc_<tenant>.json file are imported once and can be filtered by date.
+    """
+    legacy_dir = tmp_path / "escalations"
+    legacy_dir.mkdir()
+    test_escalations = [
+        {"message": "Test escalation 1", "response": "Response 1", "date": "2024-01-01 09:00:00"},
+        {"message": "Test escalation 2", "response": "Response 2", "date": "2024-01-02 17:30:00"},
+    ]
+    with open(legacy_dir / "esc_test-tenant.json", "w") as f:
+        json.dump(test_escalations, f)
+
+    store = EscalationStore(db_path=str(tmp_path / "escalations.db"), legacy_dir=str(legacy_dir))
+    assert len(store.list("test-tenant")) == 2
+    assert os.path.exists(legacy_dir / "esc_test-tenant.json.migrated")
+
+    on_second_day = store.list("test-tenant", start_date=date(2024, 1, 2), end_date=date(2024, 1, 2))
+    assert [e["message"] for e in on_second_day] == ["Test escalation 2"]
+    assert store.list("test-tenant", end_date=date(2024, 1, 1))[0]["message"] == "Test escalation 1"
+
+
+def test_legacy_import_is_recorded_and_recovered(tmp_path):
+    """
+    A file claimed by a failed import is imported on the next start, and an imported file is never imported twice.
+    """
+    legacy_dir = tmp_path / "escalations"
+    legacy_dir.mkdir()
+    records = [{"message": "Lost escalation", "response": "Response", "date": "2024-01-01 09:00:00"}]
+    (legacy_dir / "esc_test-tenant.json.migrating.4242").write_text(json.dumps(records))
+
+    db_path = str(tmp_path / "escalations.db")
+    store = EscalationStore(db_path=db_path, legacy_dir=str(legacy_dir))
+    assert [e["message"] for e in store.list("test-tenant")] == ["Lost escalation"]
+
+    # The file is back, e.g. the rename failed: another worker does not import it again.
+    os.rename(legacy_dir / "esc_test-tenant.json.migrated", legacy_dir / "esc_test-tenant.json")
+    other_worker = EscalationStore(db_path=db_path, legacy_dir=str(legacy_dir))
+    assert len(other_worker.list("test-tenant")) == 1
+    assert not os.path.exists(legacy_dir / "esc_test-tenant.json")
+
+
+def test_failed_legacy_import_is_retried(tmp_path):
+    legacy_dir = tmp_path / "escalations"
+    legacy_dir.mkdir()
+    legacy_file = legacy_dir / "esc_test-tenant.json"
+    legacy_file.write_text("[{")
+    store = EscalationStore(db_path=str(tmp_path / "escalations.db"), legacy_dir=str(legacy_dir))
+    with pytest.raises(ValueError):
+        store.list("test-tenant")
+
+    legacy_file.write_text(json.dumps([{"message": "Fixed", "response": "Response", "date": "2024-01-01"}]))
+    assert [e["message"] for e in store.list("test-tenant")] == ["Fixed"]
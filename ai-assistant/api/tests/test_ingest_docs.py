@@ -8,11 +8,11 @@ client = TestClient(app)
 
 def test_ingest_docs_endpoint():
     """
-    Tests the /ingest-docs endpoint to ensure it handles file uploads correctly.
+    Tests the /ingest-docs endpoint to ensure an API spec upload is queued for ingestion.
     """
     # Create a dummy JSON file for testing
     test_file_path = "test_api_spec.json"
-    test_data = {"openapi": "3.0.0", "info": {"title": "Test API", "version": "1.0.0"}}
+    test_data = {"openapi": "3.0.0", "info": {"title": "Test API", "version": "1.0.0"}, "paths": {}}
     with open(test_file_path, "w") as f:
         json.dump(test_data, f)
 
@@ -23,21 +23,10 @@ def test_ingest_docs_endpoint():
         # Send a POST request to the /ingest-docs endpoint with the test file
         response = client.post("/ingest-docs", files=files, headers={"X-API-Key": "test-key"})
 
-    # Assert that the request was successful
-    assert response.status_code == 200
-
-    # Assert the response content
-    assert "message" in response.json()
-    assert "Successfully parsed and saved API specification" in response.json()["message"]
-    assert "api_summary" in response.json()
-    assert response.json()["api_summary"]["title"] == "Test API"
-
     # Clean up the test file
     os.remove(test_file_path)
-    
-    #check if the file was saved.
-    upload_dir = os.path.join(os.getcwd(), "ai-assistant", "api", "vector-data", "uploads", "test-tenant")
-    parsed_file_name = f"parsed_api_test_api_spec.json"
-    file_path = os.path.join(upload_dir, parsed_file_name)
-    assert os.path.exists(file_path)
-    os.remove(file_path)
\ No newline at end of file
+
+    # Assert that the spec was queued; its operations are embedded in the background
+    assert response.status_code == 202
+    assert response.json()["status"] == "queued"
+    assert "job_id" in response.json()
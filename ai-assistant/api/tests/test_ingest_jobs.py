@@ -0,0 +1,116 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ai_assistant.api.services.ingest_jobs import IngestJobManager, IngestJobStore
+
+
+def fake_ingest(progress_queue, job_id, file_path, file_name, tenant_id):
+    if file_name == "broken.pdf":
+        raise ValueError("Unsupported file")
+    progress_queue.put((job_id, file_name, {"pages_parsed": 3, "chunks_total": 7}))
+    progress_queue.put((job_id, file_name, {"chunks_embedded": 7}))
+    return {"chunks": 7}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return IngestJobStore(str(tmp_path / "ingest_jobs.db"))
+
+
+async def wait_for_job(manager, job_id, tenant_id):
+    for _ in range(500):
+        job = manager.get_job(job_id, tenant_id)
+        if job["status"] in ("completed", "failed"):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_job_progress_and_failures(store):
+    """
+    A job reports per-file progress and failures, and is only visible to its tenant.
+    """
+    async def scenario():
+        manager = IngestJobManager(
+            executor=ThreadPoolExecutor(max_workers=2), ingest_function=fake_ingest, store=store, poll_interval=0.01
+        )
+        tmp_dir = tempfile.mkdtemp()
+        files = [(os.path.join(tmp_dir, name), name) for name in ("guide.pdf", "broken.pdf")]
+        job_id = await manager.submit("tenant-a", files)
+
+        assert manager.get_job(job_id, "tenant-b") is None
+        job = await wait_for_job(manager, job_id, "tenant-a")
+        # Let the progress thread drain the last updates.
+        await asyncio.sleep(0.05)
+        job = manager.get_job(job_id, "tenant-a")
+        manager.shutdown()
+        return job
+
+    job = asyncio.run(scenario())
+    files = {f["name"]: f for f in job["files"]}
+    assert job["status"] == "completed"
+    assert files["guide.pdf"]["status"] == "completed"
+    assert files["guide.pdf"]["pages_parsed"] == 3
+    assert files["guide.pdf"]["chunks_embedded"] == 7
+    assert files["broken.pdf"]["status"] == "failed"
+    assert "Unsupported file" in files["broken.pdf"]["error"]
+
+
+def test_workers_share_jobs_and_the_tenant_limit(store):
+    """
+    A job is visible from every worker, and the per-tenant limit holds across workers.
+    """
+    lock = threading.Lock()
+    running = [0, 0]  # current, peak
+
+    def slow_ingest(progress_queue, job_id, file_path, file_name, tenant_id):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+
+    async def scenario():
+        workers = [
+            IngestJobManager(
+                executor=ThreadPoolExecutor(max_workers=4), ingest_function=slow_ingest,
+                per_tenant_limit=1, store=IngestJobStore(store.db_path), poll_interval=0.01,
+            )
+            for _ in range(2)
+        ]
+        job_ids = [
+            await worker.submit("tenant-a", [(f"/tmp/{n}.md", f"{n}.md") for n in range(2)]) for worker in workers
+        ]
+        # Each worker reports on the job the other one accepted.
+        jobs = [await wait_for_job(workers[1 - i], job_id, "tenant-a") for i, job_id in enumerate(job_ids)]
+        for worker in workers:
+            worker.shutdown()
+        return jobs
+
+    jobs = asyncio.run(scenario())
+    assert [job["status"] for job in jobs] == ["completed", "completed"]
+    assert running[1] == 1
+
+
+def test_files_of_a_stopped_worker_fail_and_free_the_slot(store):
+    """
+    A file whose worker stopped sending heartbeats is reported as failed and no longer holds the tenant's slot.
+    """
+    store.create_job("job-1", "tenant-a", "worker-1", ["a.md"], now=1000)
+    assert store.claim_file("job-1", "a.md", limit=1, now=1000)
+    store.create_job("job-2", "tenant-a", "worker-2", ["b.md"], now=1001)
+    assert not store.claim_file("job-2", "b.md", limit=1, now=1001)
+
+    now = 1000 + store.stale_after + 1
+    store.heartbeat("worker-2", now=now)
+    job = store.get_job("job-1", "tenant-a", now=now)
+    assert job["status"] == "failed"
+    assert job["files"][0]["error"] == "The ingestion worker stopped"
+    assert store.claim_file("job-2", "b.md", limit=1, now=now)
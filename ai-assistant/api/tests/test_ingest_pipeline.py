@@ -0,0 +1,45 @@
+from langchain.docstore.document import Document
+
+from ai_assistant.api.vector_data.ingest_docs import chunk_id, embed_and_upsert
+
+
+class FakeCollection:
+    def __init__(self):
+        self.records = {}
+
+    def get(self, ids, include):
+        return {"ids": [id_ for id_ in ids if id_ in self.records]}
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+        for id_, document in zip(ids, documents):
+            self.records[id_] = document
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+
+def test_reupload_only_embeds_changed_chunks():
+    """
+    Chunks already in the collection are skipped, and embedding happens in batches of the configured size.
+    """
+    collection = FakeCollection()
+    embedder = CountingEmbedder()
+    chunks = [Document(page_content=f"section {i}") for i in range(5)]
+
+    embedded, skipped = embed_and_upsert(collection, embedder, chunks, batch_size=2, progress=lambda **_: None)
+    assert (embedded, skipped) == (5, 0)
+    assert [len(batch) for batch in embedder.batches] == [2, 2, 1]
+    assert chunk_id("section 0") in collection.records
+
+    # Same manual with one edited section and one duplicated section.
+    embedder.batches.clear()
+    edited = chunks[:4] + [Document(page_content="section 4, revised"), Document(page_content="section 0")]
+    embedded, skipped = embed_and_upsert(collection, embedder, edited, batch_size=2, progress=lambda **_: None)
+    assert (embedded, skipped) == (1, 5)
+    assert embedder.batches == [["section 4, revised"]]
@@ -0,0 +1,102 @@
+import pytest
+from langchain.docstore.document import Document
+
+from ai_assistant.api.config import settings
+from ai_assistant.api.vector_data.ingest_docs import chunk_id, embed_and_upsert
+from ai_assistant.api.vector_data.lexical_index import (
+    LexicalIndex, close_connections, get_lexical_index, reciprocal_rank_fusion
+)
+
+CHUNKS = [
+    "Themes control the colors and fonts of the assistant widget.",
+    "GET /api/v1/users returns the users of the organization.",
+    "Error E401 means the API key is missing or has been revoked.",
+    "Users need the can_edit_theme permission to change the theme.",
+]
+
+
+@pytest.fixture(autouse=True)
+def connections():
+    yield
+    close_connections()
+
+
+def make_index(tmp_path):
+    index = LexicalIndex(str(tmp_path / "shard-00.db"), "tenant-a")
+    index.add((chunk_id(text), text) for text in CHUNKS)
+    return index
+
+
+def test_exact_identifiers_rank_first(tmp_path):
+    index = make_index(tmp_path)
+    assert index.search("what does E401 mean?", 1)[0][0] == CHUNKS[2]
+    assert index.search("how do I call /api/v1/users", 1)[0][0] == CHUNKS[1]
+    assert index.search("which permission is can_edit_theme", 1)[0][0] == CHUNKS[3]
+
+
+def test_reindexing_and_removal(tmp_path):
+    index = make_index(tmp_path)
+    index.add([(chunk_id(CHUNKS[2]), CHUNKS[2])])
+    assert len(index.search("E401", 5)) == 1
+
+    index.remove([chunk_id(CHUNKS[2])])
+    assert index.search("E401", 5) == []
+
+
+def test_missing_index_returns_nothing(tmp_path):
+    index = LexicalIndex(str(tmp_path / "missing.db"), "tenant-a")
+    assert index.search("E401") == []
+    assert not (tmp_path / "missing.db").exists()
+
+
+def test_tenants_of_a_shard_share_one_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "lexical_index_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "vector_store_shards", 1)
+    first, second = get_lexical_index("tenant-a"), get_lexical_index("tenant-b")
+    assert first.db_path == second.db_path == str(tmp_path / "shard-00.db")
+
+    first.add((chunk_id(text), text) for text in CHUNKS)
+    second.add([(chunk_id(CHUNKS[2]), CHUNKS[2])])
+    second.remove([chunk_id(CHUNKS[2])])
+    assert first.search("E401", 1)[0][0] == CHUNKS[2]
+    assert second.search("E401", 1) == []
+    assert second.search("themes", 1) == []
+
+
+def test_tenant_scores_ignore_the_other_tenants_of_the_shard(tmp_path):
+    """
+    BM25 statistics are per tenant: another tenant's corpus does not change a tenant's scores.
+    """
+    first = LexicalIndex(str(tmp_path / "shard-00.db"), "tenant-a")
+    second = LexicalIndex(str(tmp_path / "shard-00.db"), "tenant-b")
+    second.add((chunk_id(text), text) for text in CHUNKS)
+    before = second.search("E401 themes", 5)
+
+    # A corpus where "E401" is common and the documents are much longer.
+    first.add((chunk_id(f"E401 {n} " * 20), f"E401 {n} " * 20) for n in range(50))
+    assert second.search("E401 themes", 5) == before
+    assert first.table != second.table
+
+
+def test_reciprocal_rank_fusion_favours_agreement():
+    dense = ["themes", "permissions", "errors"]
+    lexical = ["permissions", "errors"]
+    fused = [item for item, _ in reciprocal_rank_fusion([dense, lexical])]
+    assert fused == ["permissions", "errors", "themes"]
+
+
+def test_ingestion_indexes_chunks(tmp_path):
+    class FakeCollection:
+        def get(self, ids, include):
+            return {"ids": []}
+
+        def upsert(self, **kwargs):
+            pass
+
+    index = LexicalIndex(str(tmp_path / "shard-00.db"), "tenant-a")
+    chunks = [Document(page_content=text) for text in CHUNKS]
+    embed_and_upsert(
+        FakeCollection(), lambda texts: [[0.0] for _ in texts], chunks, batch_size=2,
+        progress=lambda **_: None, lexical_index=index,
+    )
+    assert index.search("E401", 1)[0][0] == CHUNKS[2]
@@ -0,0 +1,35 @@
+import json
+
+from ai_assistant.api.vector_data.loaders import iter_json_items, iter_markdown_sections
+
+
+def test_json_array_is_streamed_item_by_item(tmp_path):
+    """
+    Elements of a top-level array are decoded one by one, even across read boundaries.
+    """
+    items = [{"id": i, "text": "x" * 50} for i in range(20)] + [12345, "tail"]
+    path = tmp_path / "items.json"
+    path.write_text(json.dumps(items, indent=2))
+
+    assert list(iter_json_items(str(path), read_size=16)) == items
+
+
+def test_json_object_is_yielded_whole(tmp_path):
+    path = tmp_path / "object.json"
+    path.write_text(json.dumps({"openapi": "3.0.0"}))
+
+    assert list(iter_json_items(str(path))) == [{"openapi": "3.0.0"}]
+
+
+def test_markdown_is_split_into_sections(tmp_path):
+    """
+    Each heading starts a new section and long sections are emitted in parts.
+    """
+    path = tmp_path / "guide.md"
+    path.write_text("Intro text\n# Install\nRun the installer.\n## Configure\n" + "line\n" * 10)
+
+    sections = list(iter_markdown_sections(str(path), "guide.md", max_section_chars=30))
+    assert sections[0].page_content == "Intro text\n"
+    assert sections[1].metadata == {"source": "guide.md", "section": "Install"}
+    assert all(section.metadata["section"] == "Configure" for section in sections[2:])
+    assert "".join(s.page_content for s in sections).count("line") == 10
@@ -2,9 +2,14 @@
 import json
 from fastapi.testclient import TestClient
 from ..main import app  # Assuming your main FastAPI app is in main.py
+from .. import main
+from ..vector_data import manifests
+from ..vector_data.manifests import ManifestStore
 import os
 
 from ..config import settings
+from ..services.api_keys import api_key_store
+from ..services.warmup import WarmUp
 
 # Create a TestClient instance
 client = TestClient(app)
@@ -37,22 +42,19 @@ def test_list_orgs():
     assert response.json() == expected_orgs
 
 
-def test_list_files():
+def test_list_files(monkeypatch, tmp_path):
     """
-    Test the /list-files endpoint to check if it returns the correct data.
+    Test the /list-files endpoint to check if it lists the tenant's ingested documents.
     """
 
     # Define a sample tenant ID for testing. This should ideally be unique for the test.
     tenant_id = "test_tenant"
 
-    # Create a test file for the tenant to ensure there is data to list.
-    upload_dir = os.path.join(
-        settings.root_path, "ai-assistant", "api", "vector-data", "uploads", tenant_id
-    )
-    os.makedirs(upload_dir, exist_ok=True)  # Create the directory if it doesn't exist
-    test_file_path = os.path.join(upload_dir, "test_file.txt")
-    with open(test_file_path, "w") as f:
-        f.write("This is a test file.")
+    # Record an ingested document for the tenant to ensure there is data to list.
+    store = ManifestStore(str(tmp_path / "manifests.db"))
+    monkeypatch.setattr(main, "document_manifests", store)
+    monkeypatch.setattr(manifests, "document_manifests", store)
+    store.replace(tenant_id, "test_file.txt", "hash", 20, [], None)
 
     # Make a GET request to the /list-files endpoint with the tenant ID in the headers.
     response = client.get("/list-files", headers={"X-API-Key": tenant_id})
@@ -62,8 +64,42 @@ def test_list_files():
 
     # Check if the response contains the test file.
     files = response.json().get("files", [])
-    assert any(file["name"] == "test_file.txt" for file in files)
+    assert any(file["name"] == "test_file.txt" and file["size"] == 20 for file in files)
 
-    # Clean up the test file and directory after the test.
-    os.remove(test_file_path)
-    os.rmdir(upload_dir)
\ No newline at end of file
+    # Deleting the document removes it from the list.
+    response = client.delete("/documents/test_file.txt", headers={"X-API-Key": tenant_id})
+    assert response.status_code == 200
+    assert client.get("/list-files", headers={"X-API-Key": tenant_id}).json() == {"files": []}
+    assert client.delete("/documents/test_file.txt", headers={"X-API-Key": tenant_id}).status_code == 404
+
+
+def test_readiness_probe_reports_the_warm_up(monkeypatch):
+    """
+    The probes need no API key, and /ready only reports ready once the warm-up succeeded.
+    """
+    warmup = WarmUp()
+    warmup.add_step("embedding_model", lambda: None)
+    monkeypatch.setattr(main, "warmup", warmup)
+
+    assert client.get("/health").status_code == 200
+    response = client.get("/ready")
+    assert (response.status_code, response.json()["status"]) == (503, "pending")
+
+    warmup.run()
+    response = client.get("/ready")
+    assert (response.status_code, response.json()["status"]) == (200, "ready")
+    assert response.json()["steps"]["embedding_model"]["status"] == "ok"
+
+
+def test_admin_endpoints_need_an_admin_key(monkeypatch, tmp_path):
+    """
+    Endpoints that report on every tenant refuse tenant keys.
+    """
+    monkeypatch.setattr(api_key_store, "keys_file", str(tmp_path / "api_keys.json"))
+    admin_key = api_key_store.create_key("ops", admin=True)
+    tenant_key = api_key_store.create_key("acme")
+
+    for path in ("/admin/collections", "/admin/llm-usage", "/metrics"):
+        assert client.get(path, headers={"X-API-Key": tenant_key}).status_code == 403
+        assert client.get(path, headers={"X-API-Key": "test_tenant"}).status_code == 403
+    assert client.get("/metrics", headers={"X-API-Key": admin_key}).status_code == 200
@@ -0,0 +1,151 @@
+import pytest
+from langchain.docstore.document import Document
+
+from ai_assistant.api.vector_data import ingest_docs, manifests
+from ai_assistant.api.vector_data.collection_index import CollectionIndex
+from ai_assistant.api.vector_data.endpoint_index import EndpointIndex
+from ai_assistant.api.vector_data.ingest_docs import chunk_id, process_file
+from ai_assistant.api.vector_data.manifests import ManifestStore, delete_document
+
+
+def test_shared_chunks_are_only_tombstoned_when_unreferenced(tmp_path):
+    store = ManifestStore(str(tmp_path / "manifests.db"))
+    store.replace("acme", "guide.pdf", "v1", 100, ["intro", "setup", "faq"], "all-mpnet-base-v2")
+    store.replace("acme", "faq.md", "v1", 10, ["faq"], "all-mpnet-base-v2")
+
+    # New version of the guide: "setup" changed, "faq" is still used by faq.md.
+    removed = store.replace("acme", "guide.pdf", "v2", 120, ["intro", "setup v2"], "all-mpnet-base-v2")
+    assert removed == ["setup"]
+    assert store.chunk_ids("acme", "guide.pdf") == {"intro", "setup v2"}
+
+    assert sorted(store.remove("acme", "guide.pdf")) == ["intro", "setup v2"]
+    assert store.remove("acme", "guide.pdf") is None
+    assert store.tombstones("acme") == ["intro", "setup", "setup v2"]
+    assert [d.name for d in store.list("acme")] == ["faq.md"]
+
+    # A chunk that comes back before the purge keeps living.
+    store.replace("acme", "intro.md", "v1", 5, ["intro"], "all-mpnet-base-v2")
+    assert store.tombstones("acme") == ["setup", "setup v2"]
+
+
+class FakeCollection:
+    name = "tenant_acme"
+    metadata = {"embedding_model": "all-mpnet-base-v2"}
+
+    def __init__(self):
+        self.records = {}
+
+    def get(self, ids, include):
+        return {"ids": [id_ for id_ in ids if id_ in self.records]}
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+        self.records.update(zip(ids, documents))
+
+    def delete(self, ids):
+        for id_ in ids:
+            self.records.pop(id_, None)
+
+    def count(self):
+        return len(self.records)
+
+
+@pytest.fixture
+def ingestion(monkeypatch, tmp_path):
+    """
+    Runs process_file and delete_document against a fake collection; returns it and the embedded texts.
+    """
+    collection = FakeCollection()
+    embedded_texts = []
+    store = ManifestStore(str(tmp_path / "manifests.db"))
+
+    class NoLexicalIndex:
+        def add(self, chunks):
+            pass
+
+        def remove(self, chunk_ids):
+            pass
+
+    def embed(texts):
+        embedded_texts.extend(texts)
+        return [[0.0] for _ in texts]
+
+    monkeypatch.setattr(ingest_docs, "init_chroma_db", lambda tenant_id: collection)
+    monkeypatch.setattr(ingest_docs.registry, "get_embedding_function", lambda model: embed)
+    monkeypatch.setattr(ingest_docs.registry, "get_tenant_collection", lambda tenant_id: collection)
+    monkeypatch.setattr(ingest_docs, "iter_chunks", lambda documents, report: documents)
+    monkeypatch.setattr(
+        ingest_docs, "iter_documents",
+        lambda path, name, **options: [Document(page_content=line) for line in open(path).read().splitlines()],
+    )
+    for module in (ingest_docs, manifests):
+        monkeypatch.setattr(module, "document_manifests", store)
+        monkeypatch.setattr(module, "get_lexical_index", lambda tenant_id: NoLexicalIndex())
+        monkeypatch.setattr(module, "collection_index", CollectionIndex(str(tmp_path / "collections.db")))
+        monkeypatch.setattr(module, "endpoint_index", EndpointIndex(str(tmp_path / "endpoints.db")))
+    return collection, embedded_texts
+
+
+def test_reupload_diffs_against_the_manifest(ingestion, tmp_path):
+    """
+    An unchanged upload is skipped, a new version only embeds new chunks and removes the old ones.
+    """
+    collection, embedded_texts = ingestion
+    guide = tmp_path / "guide.md"
+    guide.write_text("intro\nsetup\nfaq\n")
+    assert process_file(str(guide), "guide.md", "acme")["chunks_embedded"] == 3
+    assert process_file(str(guide), "guide.md", "acme")["status"] == "unchanged"
+
+    guide.write_text("intro\nsetup, revised\nfaq\n")
+    result = process_file(str(guide), "guide.md", "acme")
+    assert (result["chunks_embedded"], result["chunks_skipped"], result["chunks_removed"]) == (1, 2, 1)
+    assert embedded_texts == ["intro", "setup", "faq", "setup, revised"]
+    assert set(collection.records.values()) == {"intro", "setup, revised", "faq"}
+
+    assert delete_document("acme", "guide.md") == {"chunks_removed": 3}
+    assert collection.records == {}
+    assert delete_document("acme", "guide.md") is None
+    assert chunk_id("intro") not in collection.records
+
+
+def test_purge_keeps_chunks_referenced_again(tmp_path):
+    """
+    A tombstone read before an ingestion referenced its chunk again does not delete the chunk.
+    """
+    store = ManifestStore(str(tmp_path / "manifests.db"))
+    store.replace("acme", "guide.pdf", "v1", 100, ["intro", "setup"], "all-mpnet-base-v2")
+    store.remove("acme", "guide.pdf")
+    # The tombstone of "intro" is still there when faq.md starts referencing it.
+    store._connection().execute("INSERT INTO document_chunks VALUES ('acme', 'faq.md', 'intro')")
+
+    deleted = []
+    assert store.purge("acme", deleted.extend) == 1
+    assert deleted == ["setup"]
+    assert store.tombstones("acme") == []
+
+
+def test_chunks_purged_during_ingestion_are_stored_again(ingestion, tmp_path):
+    """
+    A chunk skipped as stored, then purged by a concurrent deletion before the manifest was written, is restored.
+    """
+    collection, embedded_texts = ingestion
+    faq = tmp_path / "faq.md"
+    faq.write_text("faq\n")
+    process_file(str(faq), "faq.md", "acme")
+
+    get = collection.get
+
+    def get_then_delete(ids, include):
+        found = get(ids, include)
+        if collection.get == get_then_delete:
+            collection.get = get
+            # Another worker deletes faq.md right after the guide's "faq" chunk was found stored.
+            delete_document("acme", "faq.md")
+        return found
+
+    collection.get = get_then_delete
+    guide = tmp_path / "guide.md"
+    guide.write_text("intro\nfaq\n")
+    result = process_file(str(guide), "guide.md", "acme")
+    assert set(collection.records.values()) == {"intro", "faq"}
+    assert result["chunks_embedded"] == 2
+    assert embedded_texts == ["faq", "intro", "faq"]
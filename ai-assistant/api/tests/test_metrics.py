@@ -0,0 +1,62 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from starlette.concurrency import run_in_threadpool
+
+from ai_assistant.api.services import metrics as metrics_module
+from ai_assistant.api.services.metrics import Counter, Histogram, MetricsMiddleware, span
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value, "/chat")
+    counter = Counter("errors_total", "Errors.", ("kind",))
+    counter.inc('say "hi"')
+
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{route="/chat",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/chat",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{route="/chat",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{route="/chat"} 3.65' in lines
+    assert 'latency_seconds_count{route="/chat"} 4' in lines
+    assert counter.render()[-1] == 'errors_total{kind="say \\"hi\\""} 1'
+
+
+def test_middleware_times_stages_of_a_request():
+    """
+    Stages timed in the handler and in threadpool calls end up in the Server-Timing
+    header and in the histograms, labelled with the route template and tenant.
+    """
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def authenticate(request: Request, call_next):
+        with span("auth"):
+            request.state.tenant_id = "acme"
+        return await call_next(request)
+
+    app.add_middleware(MetricsMiddleware)
+
+    def search():
+        with span("vector_search"):
+            return ["chunk"]
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        with span("retrieval"):
+            return {"item": item_id, "chunks": await run_in_threadpool(search)}
+
+    requests_before = metrics_module.request_duration.count("/items/{item_id}", "acme")
+    with TestClient(app) as client:
+        response = client.get("/items/42")
+        assert response.status_code == 200
+        stages = [entry.split(";")[0] for entry in response.headers["Server-Timing"].split(", ")]
+        assert stages == ["auth", "vector_search", "retrieval", "total"]
+        assert client.get("/nowhere").status_code == 404
+
+    assert metrics_module.request_duration.count("/items/{item_id}", "acme") == requests_before + 1
+    assert metrics_module.stage_duration.count("vector_search", "/items/{item_id}", "acme") >= 1
+    assert metrics_module.requests_total.value("unmatched", "404") >= 1
+    rendered = metrics_module.metrics.render()
+    assert '# TYPE request_stage_duration_seconds histogram' in rendered
+    assert 'request_stage_duration_seconds_count{stage="retrieval",route="/items/{item_id}",tenant="acme"}' in rendered
@@ -0,0 +1,75 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_assistant.api.vector_data import pdf_parser
+from ai_assistant.api.vector_data.pdf_parser import PdfTextCache, iter_pdf_text
+
+
+def test_page_ranges_are_parsed_in_parallel_and_yielded_in_order(monkeypatch, tmp_path):
+    """
+    Ranges finishing out of order still produce the pages in order, and a second parse hits the cache.
+    """
+    parsed_ranges = []
+
+    def parse_page_range(file_path, start, stop):
+        # Earlier ranges take longer, so they finish last.
+        time.sleep(0.01 * (10 - start) / 3)
+        parsed_ranges.append((start, stop))
+        return [f"page {number}" for number in range(start, stop)]
+
+    monkeypatch.setattr(pdf_parser, "count_pages", lambda file_path: 10)
+    monkeypatch.setattr(pdf_parser, "parse_page_range", parse_page_range)
+    cache = PdfTextCache(str(tmp_path / "cache"), max_bytes=10 ** 6)
+
+    with ThreadPoolExecutor(4) as executor:
+        pages = list(iter_pdf_text("manual.pdf", "hash", workers=4, pages_per_range=3, executor=executor, cache=cache))
+    assert pages == [f"page {number}" for number in range(10)]
+    assert sorted(parsed_ranges) == [(0, 3), (3, 6), (6, 9), (9, 10)]
+
+    parsed_ranges.clear()
+    assert list(iter_pdf_text("copy.pdf", "hash", workers=4, pages_per_range=3, cache=cache)) == pages
+    assert parsed_ranges == []
+
+
+def test_text_cache_removes_least_recently_used_entries(tmp_path):
+    cache = PdfTextCache(str(tmp_path), max_bytes=10 ** 6)
+    cache.put("old", ["x" * 100])
+    cache.put("new", ["y" * 100])
+    assert list(cache.get("old")) == ["x" * 100]
+    assert cache.get("missing") is None
+
+    # Reading "old" made "new" the least recently used entry.
+    time.sleep(0.01)
+    cache.get("old")
+    # Room for two entries.
+    cache.max_bytes = 5 * (tmp_path / "old.jsonl.gz").stat().st_size // 2
+    cache.put("newest", ["z" * 100])
+    assert cache.get("new") is None
+    assert cache.get("old") is not None and cache.get("newest") is not None
+
+
+def test_abandoned_parse_is_not_cached(monkeypatch, tmp_path):
+    monkeypatch.setattr(pdf_parser, "count_pages", lambda file_path: 6)
+    monkeypatch.setattr(pdf_parser, "parse_page_range", lambda file_path, start, stop: ["page"] * (stop - start))
+    cache = PdfTextCache(str(tmp_path), max_bytes=10 ** 6)
+
+    pages = iter_pdf_text("manual.pdf", "hash", workers=1, pages_per_range=2, cache=cache)
+    next(pages)
+    pages.close()
+    assert cache.get("hash") is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_parser_pool_is_spawned_and_shared_between_ingestion_workers(monkeypatch):
+    monkeypatch.setattr(pdf_parser.settings, "pdf_parse_workers", 4)
+    monkeypatch.setattr(pdf_parser.settings, "ingest_workers", 2)
+    monkeypatch.setattr(pdf_parser, "_executor", None)
+    executor = pdf_parser._get_executor()
+    try:
+        assert executor._max_workers == 2
+        assert executor._mp_context.get_start_method() == "spawn"
+    finally:
+        executor.shutdown()
+
+    monkeypatch.setattr(pdf_parser.settings, "ingest_workers", 8)
+    assert pdf_parser.default_workers() == 1
@@ -0,0 +1,48 @@
+import gc
+import os
+
+import pytest
+
+from ai_assistant.api.benchmarks.fake_embeddings import FakeEmbeddingFunction
+from ai_assistant.api.benchmarks.prefork_memory import run_mode
+from ai_assistant.api.services.prefork import freeze_shared_heap, preload_embedding_models
+from ai_assistant.api.vector_data import registry
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    loaded = []
+
+    def load(model_name, backend="torch", onnx_file=None):
+        loaded.append(model_name)
+        return FakeEmbeddingFunction(dimensions=64, weights_mb=32)
+
+    registry.clear()
+    monkeypatch.setattr(registry, "load_embedding_function", load)
+    yield loaded
+    registry.clear()
+
+
+def test_preloaded_models_are_reused_from_the_registry(fake_models):
+    assert preload_embedding_models(["all-mpnet-base-v2", "hkunlp/instructor-xl"]) == [
+        "all-mpnet-base-v2", "hkunlp/instructor-xl"
+    ]
+    registry.get_embedding_function("all-mpnet-base-v2")
+    assert fake_models == ["all-mpnet-base-v2", "hkunlp/instructor-xl"]
+
+    freeze_shared_heap()
+    try:
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/smaps_rollup"), reason="needs Linux smaps_rollup")
+def test_forked_workers_share_preloaded_weights(fake_models):
+    texts = ["reset my password", "billing question"]
+    per_worker = run_mode("per-worker", 2, "all-mpnet-base-v2", texts)
+    prefork = run_mode("prefork", 2, "all-mpnet-base-v2", texts)
+    # Each worker holds its own 32 MiB of weights, unless they were loaded before the fork.
+    assert per_worker["per_worker_mb"]["private_mb"] > 30
+    assert prefork["per_worker_mb"]["private_mb"] < per_worker["per_worker_mb"]["private_mb"] - 24
+    assert prefork["total_pss_mb"] < per_worker["total_pss_mb"]
@@ -0,0 +1,45 @@
+from ai_assistant.api.llm.prompt_builder import PromptBuilder
+
+
+def test_chunks_are_ranked_deduplicated_and_packed():
+    """
+    The closest chunks come first, near-duplicates are dropped and the budget is respected.
+    """
+    builder = PromptBuilder(chars_per_token=1, min_chunk_tokens=10)
+    chunks = [
+        ("Use POST /api/users to create a user account.", 0.4),
+        ("Password resets are done from the account settings page.", 0.1),
+        ("Password resets are done from the account settings page!", 0.2),
+        ("Error E401 means the API key is missing or invalid.", 0.3),
+    ]
+
+    selected = builder.select_chunks(chunks, budget=115)
+    assert selected == [
+        "Password resets are done from the account settings page.",
+        "Error E401 means the API key is missing or invalid.",
+    ]
+
+    # The chunk that overflows the budget is cut at a word boundary.
+    selected = builder.select_chunks(chunks, budget=80)
+    assert selected[0] == "Password resets are done from the account settings page."
+    assert selected[1] == "Error E401 means the"
+
+
+def test_prompt_fits_the_context_window():
+    """
+    The built prompt stays within the context window minus the response budget, and is deterministic.
+    """
+    builder = PromptBuilder(context_window=300, max_response_tokens=100)
+    chunks = [(f"chunk {i} " + "lorem ipsum dolor " * 20, i / 10) for i in range(10)]
+
+    prompt = builder.build("How do I reset my password?", chunks)
+    total = builder.estimate_tokens(prompt.system) + builder.estimate_tokens(prompt.prompt)
+    assert total <= 300 - 100
+    assert prompt.prompt.endswith("Question: How do I reset my password?\nAnswer:")
+    assert builder.build("How do I reset my password?", list(reversed(chunks))) == prompt
+
+
+def test_prompt_without_context():
+    prompt = PromptBuilder().build("Hello", [])
+    assert prompt.prompt == "Question: Hello\nAnswer:"
+    assert prompt.context_tokens == 0
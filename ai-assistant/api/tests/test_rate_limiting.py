@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+from ai_assistant.api.services import api_keys
+from ai_assistant.api.services.api_keys import ApiKeyStore, hash_api_key
+from ai_assistant.api.services.config_cache import ConfigCache
+from ai_assistant.api.services.rate_limiter import ConcurrencyLimiter, TokenBucketLimiter
+
+
+def test_api_keys_resolve_to_tenants(tmp_path):
+    """
+    Provisioned keys map to their tenant and limits; unknown keys are rejected unless legacy keys are allowed.
+    """
+    keys_file = tmp_path / "api_keys.json"
+    keys_file.write_text(json.dumps({
+        "keys": {hash_api_key("secret-1"): {"tenant_id": "acme"}},
+        "tenants": {"acme": {"requests_per_minute": 30}},
+    }))
+    store = ApiKeyStore(keys_file=str(keys_file), allow_tenant_id_as_key=False, cache=ConfigCache())
+
+    auth = store.resolve("secret-1")
+    assert auth.tenant_id == "acme"
+    assert auth.limits == {"requests_per_minute": 30}
+    assert store.resolve("unknown") is None
+
+    new_key = store.create_key("globex")
+    assert store.resolve(new_key).tenant_id == "globex"
+    assert not store.resolve(new_key).admin
+    assert store.resolve(store.create_key("ops", admin=True)).admin
+
+    legacy = ApiKeyStore(keys_file=str(keys_file), allow_tenant_id_as_key=True, cache=ConfigCache())
+    assert legacy.resolve("test-key").tenant_id == "test-tenant"
+    assert not legacy.resolve("ops").admin
+
+
+def test_tenant_ids_that_are_not_plain_names_are_rejected(tmp_path):
+    keys_file = tmp_path / "api_keys.json"
+    keys_file.write_text(json.dumps({"keys": {hash_api_key("secret-1"): {"tenant_id": "../acme"}}, "tenants": {}}))
+    store = ApiKeyStore(keys_file=str(keys_file), allow_tenant_id_as_key=True, cache=ConfigCache())
+
+    assert store.resolve("secret-1") is None
+    assert store.resolve("../../etc") is None
+    assert store.resolve("tenant a") is None
+    assert store.resolve("tenant_a-1").tenant_id == "tenant_a-1"
+    with pytest.raises(ValueError):
+        store.create_key("acme/../globex")
+
+
+def test_rejected_tenant_ids_are_logged(tmp_path, caplog):
+    """
+    Tenant IDs sent as keys after the legacy behaviour is turned off are counted in a periodic warning.
+    """
+    store = ApiKeyStore(keys_file=str(tmp_path / "api_keys.json"), allow_tenant_id_as_key=False, cache=ConfigCache())
+    with caplog.at_level("WARNING", logger="ai_assistant.api.services.api_keys"):
+        assert store.resolve("acme") is None
+        assert store.resolve("globex") is None
+        assert store.resolve("not a tenant") is None
+    assert len(caplog.records) == 1
+    assert "ALLOW_TENANT_ID_AS_API_KEY" in caplog.records[0].getMessage()
+    assert store._rejected_tenant_ids == 1
+
+
+def test_api_key_command_provisions_keys(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(api_keys, "api_key_store", ApiKeyStore(keys_file=str(tmp_path / "api_keys.json"), cache=ConfigCache()))
+    assert api_keys.main(["create", "acme"]) == 0
+    key = capsys.readouterr().out.strip()
+    assert api_keys.api_key_store.resolve(key).tenant_id == "acme"
+
+
+def test_expired_keys_are_evicted(tmp_path):
+    store = ApiKeyStore(keys_file=str(tmp_path / "api_keys.json"), cache_ttl=0, cache=ConfigCache())
+    for n in range(100):
+        store.resolve(f"rotated-key-{n}")
+    assert len(store._resolved) <= 1
+
+
+def test_token_bucket_reports_retry_after():
+    """
+    A tenant can burst up to the bucket size, then gets the time until the next token.
+    """
+    limiter = TokenBucketLimiter(rate=1, burst=2)
+    assert limiter.try_acquire("acme") == 0
+    assert limiter.try_acquire("acme") == 0
+    retry_after = limiter.try_acquire("acme")
+    assert 0 < retry_after <= 1
+    # Other tenants have their own bucket.
+    assert limiter.try_acquire("globex") == 0
+
+
+def test_idle_buckets_are_dropped(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("ai_assistant.api.services.rate_limiter.time.monotonic", lambda: now[0])
+    limiter = TokenBucketLimiter(rate=1, burst=2, sweep_interval=10)
+    for n in range(50):
+        limiter.try_acquire(f"tenant-{n}")
+    limiter.try_acquire("acme")
+    limiter.try_acquire("acme")
+
+    now[0] += 10
+    assert limiter.try_acquire("busy") == 0
+    assert set(limiter._buckets) == {"busy"}
+    # A dropped bucket comes back full.
+    assert limiter.try_acquire("acme") == 0
+
+
+def test_concurrency_limiter():
+    limiter = ConcurrencyLimiter(limit=1)
+    assert limiter.try_acquire("acme")
+    assert not limiter.try_acquire("acme")
+    limiter.release("acme")
+    assert limiter.try_acquire("acme")
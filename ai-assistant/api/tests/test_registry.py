@@ -0,0 +1,92 @@
+import chromadb
+import pytest
+
+from ai_assistant.api.vector_data import embeddings, registry
+
+
+class FakeEmbeddingFunction:
+    loads = 0
+
+    def __init__(self, model_name, **kwargs):
+        FakeEmbeddingFunction.loads += 1
+        self.model_name = model_name
+
+
+class FakeCollection:
+    def __init__(self, name, metadata=None, embedding_function=None):
+        self.name = name
+        self.metadata = metadata
+        self.embedding_function = embedding_function
+
+
+class FakeClient:
+    def __init__(self, path):
+        self.path = path
+        self.collections = {}
+
+    def get_or_create_collection(self, name, embedding_function, metadata=None):
+        return self.collections.setdefault(name, FakeCollection(name, metadata, embedding_function))
+
+    def get_collection(self, name, embedding_function=None):
+        if name not in self.collections:
+            raise ValueError(f"Collection {name} does not exist.")
+        existing = self.collections[name]
+        return FakeCollection(name, existing.metadata, embedding_function)
+
+
+def test_models_and_collections_are_loaded_once(monkeypatch):
+    """
+    The registry should load each embedding model and client once and cache collection handles.
+    """
+    registry.clear()
+    FakeEmbeddingFunction.loads = 0
+    monkeypatch.setattr(embeddings.embedding_functions, "SentenceTransformerEmbeddingFunction", FakeEmbeddingFunction)
+    monkeypatch.setattr(chromadb, "PersistentClient", FakeClient)
+
+    first = registry.get_embedding_function("all-mpnet-base-v2")
+    second = registry.get_embedding_function("all-mpnet-base-v2")
+    assert first is second
+    assert FakeEmbeddingFunction.loads == 1
+
+    assert registry.get_chroma_client("chroma-a") is registry.get_chroma_client("chroma-a")
+
+    # Missing collections are not cached, so a later ingest is picked up.
+    assert registry.get_collection("chroma-a", "tenant_t1", "all-mpnet-base-v2") is None
+    created = registry.get_collection("chroma-a", "tenant_t1", "all-mpnet-base-v2", create=True)
+    assert registry.get_collection("chroma-a", "tenant_t1", "all-mpnet-base-v2") is created
+    registry.clear()
+
+
+def test_tenants_share_sharded_storage(monkeypatch, tmp_path):
+    """
+    Ingestion and queries resolve a tenant to the same shard, and the collection records its embedding model.
+    """
+    registry.clear()
+    monkeypatch.setattr(embeddings.embedding_functions, "SentenceTransformerEmbeddingFunction", FakeEmbeddingFunction)
+    monkeypatch.setattr(chromadb, "PersistentClient", FakeClient)
+    monkeypatch.setattr(registry.settings, "vector_store_dir", str(tmp_path))
+    monkeypatch.setattr(registry.settings, "vector_store_shards", 4)
+
+    tenants = [f"tenant-{i}" for i in range(40)]
+    shards = {registry.shard_directory(tenant_id) for tenant_id in tenants}
+    assert len(shards) == 4
+    assert registry.shard_directory("acme") == registry.shard_directory("acme")
+
+    assert registry.get_tenant_collection("acme") is None
+    created = registry.get_tenant_collection("acme", create=True, model_name="all-MiniLM-L6-v2")
+    assert created.metadata == {"embedding_model": "all-MiniLM-L6-v2"}
+    assert registry.get_tenant_collection("acme") is created
+
+    # A fresh worker binds the existing collection to the model in its metadata.
+    registry._collections.clear()
+    reopened = registry.get_tenant_collection("acme", create=True)
+    assert registry.collection_model(reopened) == "all-MiniLM-L6-v2"
+    assert reopened.embedding_function.model_name == "all-MiniLM-L6-v2"
+    registry.clear()
+
+
+def test_embedding_backend_is_validated():
+    with pytest.raises(ValueError):
+        embeddings.load_embedding_function("all-mpnet-base-v2", "tensorrt")
+    with pytest.raises(ValueError):
+        embeddings.load_embedding_function("hkunlp/instructor-xl", "onnx")
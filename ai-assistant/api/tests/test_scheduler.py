@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from ai_assistant.api.llm.scheduler import LlmScheduler, SchedulerTimeout
+
+
+def test_slots_are_shared_fairly_between_tenants():
+    """
+    With one slot, queued requests are served round-robin across tenants rather than in arrival order.
+    """
+    async def scenario():
+        scheduler = LlmScheduler(max_in_flight=1)
+        order = []
+        release = asyncio.Event()
+
+        async def request(tenant_id, name):
+            async with scheduler.slot(tenant_id):
+                order.append(name)
+                if name == "a1":
+                    await release.wait()
+
+        first = asyncio.create_task(request("a", "a1"))
+        await asyncio.sleep(0)
+        queued = [asyncio.create_task(request(t, n)) for t, n in [("a", "a2"), ("a", "a3"), ("b", "b1")]]
+        await asyncio.sleep(0)
+        assert scheduler.stats()["queue_depth"] == 3
+        release.set()
+        await asyncio.gather(first, *queued)
+        return order, scheduler.stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == ["a1", "a2", "b1", "a3"]
+    assert stats["in_flight"] == 0
+    assert stats["dispatched"] == 4
+
+
+def test_identical_requests_are_coalesced():
+    async def scenario():
+        scheduler = LlmScheduler(max_in_flight=4)
+        calls = 0
+
+        async def generate():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        results = await asyncio.gather(*(scheduler.run("a", "same-prompt", generate) for _ in range(3)))
+        other = await scheduler.run("b", "same-prompt", generate)
+        return results, other, calls, scheduler.stats()
+
+    results, other, calls, stats = asyncio.run(scenario())
+    assert results == ["answer"] * 3
+    assert other == "answer"
+    # Tenants never share generations.
+    assert calls == 2
+    assert stats["coalesced"] == 2
+
+
+def test_deadline_while_queued():
+    async def scenario():
+        scheduler = LlmScheduler(max_in_flight=1)
+        async with scheduler.slot("a"):
+            with pytest.raises(SchedulerTimeout):
+                await scheduler.run("b", "prompt", lambda: asyncio.sleep(0), timeout=0.01)
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["timed_out"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_joiners_get_the_result_when_the_starter_is_cancelled():
+    """
+    Cancelling the request that started a generation neither cancels it for the requests that joined it,
+    nor cuts it short at the starter's deadline.
+    """
+    async def scenario():
+        scheduler = LlmScheduler(max_in_flight=1)
+
+        async def generate():
+            await asyncio.sleep(0.05)
+            return "answer"
+
+        starter = asyncio.create_task(scheduler.run("a", "prompt", generate, timeout=0.02))
+        await asyncio.sleep(0)
+        joiner = asyncio.create_task(scheduler.run("a", "prompt", generate, timeout=1))
+        await asyncio.sleep(0.01)
+        starter.cancel()
+        result = await joiner
+        with pytest.raises(asyncio.CancelledError):
+            await starter
+        return result, scheduler.stats()
+
+    result, stats = asyncio.run(scenario())
+    assert result == "answer"
+    assert stats["in_flight"] == 0
+
+
+def test_generation_is_cancelled_when_every_request_gives_up():
+    async def scenario():
+        scheduler = LlmScheduler(max_in_flight=1)
+        cancelled = asyncio.Event()
+
+        async def generate():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with pytest.raises(SchedulerTimeout):
+            await scheduler.run("a", "prompt", generate, timeout=0.01)
+        await asyncio.wait_for(cancelled.wait(), 1)
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["in_flight"] == 0
+    assert stats["timed_out"] == 0
@@ -0,0 +1,87 @@
+import numpy as np
+
+from ai_assistant.api.services.semantic_cache import SemanticCache
+from ai_assistant.api.vector_data.collection_index import CollectionIndex
+from ai_assistant.api.vector_data.quantization import dot, quantize
+
+
+def test_similar_question_hits_cache():
+    """
+    A question close enough to a cached one returns the cached answer, a different one misses.
+    """
+    cache = SemanticCache(similarity_threshold=0.9)
+    cache.store("tenant-a", [1.0, 0.0, 0.0], "Reset it from the settings page.")
+
+    assert cache.lookup("tenant-a", [0.99, 0.05, 0.0]) == "Reset it from the settings page."
+    assert cache.lookup("tenant-a", [0.0, 1.0, 0.0]) is None
+    # Answers are never shared between tenants.
+    assert cache.lookup("tenant-b", [1.0, 0.0, 0.0]) is None
+
+
+def test_lru_eviction_and_invalidation():
+    """
+    The least recently used answer is evicted first, and invalidation drops the tenant's answers.
+    """
+    cache = SemanticCache(similarity_threshold=0.99, max_entries=2)
+    cache.store("tenant-a", [1.0, 0.0, 0.0], "first")
+    cache.store("tenant-a", [0.0, 1.0, 0.0], "second")
+    assert cache.lookup("tenant-a", [1.0, 0.0, 0.0]) == "first"  # "second" is now the oldest
+    cache.store("tenant-a", [0.0, 0.0, 1.0], "third")
+
+    assert cache.lookup("tenant-a", [0.0, 1.0, 0.0]) is None
+    assert cache.lookup("tenant-a", [1.0, 0.0, 0.0]) == "first"
+
+    cache.invalidate("tenant-a")
+    assert cache.lookup("tenant-a", [1.0, 0.0, 0.0]) is None
+
+
+def test_expired_answers_are_not_returned():
+    """
+    Answers older than the TTL are treated as misses.
+    """
+    cache = SemanticCache(ttl_seconds=-1)
+    cache.store("tenant-a", [1.0, 0.0], "stale")
+    assert cache.lookup("tenant-a", [1.0, 0.0]) is None
+
+
+def test_compressed_storage_keeps_hits():
+    """
+    float16 and int8 storage shrink the cached embeddings without changing which questions hit.
+    """
+    rng = np.random.default_rng(0)
+    questions = rng.normal(size=(20, 384))
+    for dtype in ("float16", "int8"):
+        cache = SemanticCache(similarity_threshold=0.95, storage_dtype=dtype)
+        for i, question in enumerate(questions):
+            cache.store("tenant-a", question, f"answer {i}")
+        assert cache.lookup("tenant-a", questions[7] + rng.normal(scale=0.01, size=384)) == "answer 7"
+        assert cache.lookup("tenant-a", rng.normal(size=384)) is None
+        codes = cache._tenants["tenant-a"].entries[0][0]
+        assert codes.dtype == np.dtype(dtype)
+
+
+def test_int8_quantization_preserves_similarity():
+    vectors = np.random.default_rng(1).normal(size=(50, 768)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    codes, scales = quantize(vectors, "int8")
+    assert codes.nbytes * 4 == vectors.nbytes
+    np.testing.assert_allclose(dot(codes, scales, vectors[3]), vectors @ vectors[3], atol=0.01)
+
+
+def test_answers_are_dropped_when_the_collection_changes_in_another_process(tmp_path):
+    """
+    A write to the tenant's collection index entry, e.g. by the bulk CLI, drops the tenant's answers.
+    """
+    reader = CollectionIndex(str(tmp_path / "collections.db"), refresh_interval=0)
+    writer = CollectionIndex(str(tmp_path / "collections.db"), refresh_interval=0)
+    cache = SemanticCache(similarity_threshold=0.9, generation=lambda tenant_id: getattr(
+        reader.get(tenant_id), "generation", 0
+    ))
+    writer.record("tenant-a", "tenant_tenant-a", 3)
+    cache.store("tenant-a", [1.0, 0.0, 0.0], "Reset it from the settings page.")
+    cache.store("tenant-b", [1.0, 0.0, 0.0], "Ask your administrator.")
+    assert cache.lookup("tenant-a", [1.0, 0.0, 0.0]) == "Reset it from the settings page."
+
+    writer.record("tenant-a", "tenant_tenant-a", 2, ingested=False)
+    assert cache.lookup("tenant-a", [1.0, 0.0, 0.0]) is None
+    assert cache.lookup("tenant-b", [1.0, 0.0, 0.0]) == "Ask your administrator."
@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+
+from ai_assistant.api.benchmarks.startup import parse_importtime
+from ai_assistant.api.services.warmup import WarmUp
+
+
+def test_warm_up_runs_once_and_only_required_steps_block_readiness():
+    calls = []
+    warmup = WarmUp()
+    warmup.add_step("embedding_model", lambda: calls.append("embedding_model"))
+    warmup.add_step("llm_model", lambda: 1 / 0, required=False)
+    assert warmup.status()["status"] == "pending"
+
+    assert warmup.run()
+    assert warmup.run()
+    assert calls == ["embedding_model"]
+    status = warmup.status()
+    assert status["status"] == "ready"
+    assert status["steps"]["llm_model"]["status"] == "skipped"
+    assert "division by zero" in status["steps"]["llm_model"]["error"]
+
+    failing = WarmUp()
+    failing.add_step("embedding_model", lambda: 1 / 0)
+    assert not failing.run()
+    assert failing.status()["status"] == "failed"
+
+
+def test_importing_the_api_loads_no_heavy_dependency():
+    """
+    Chroma, langchain and the model libraries are imported on first use, not with the API.
+    """
+    heavy = ("chromadb", "langchain", "torch", "sentence_transformers", "pypdf")
+    script = (
+        "import sys, ai_assistant.api.main; "
+        f"print(sorted({{m.split('.')[0] for m in sys.modules}} & set({heavy!r})))"
+    )
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    completed = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, env=env)
+    assert completed.returncode == 0, completed.stderr
+    assert completed.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_parse_importtime():
+    output = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       120 |        120 |   _io",
+        "import time:      1500 |       2000 | ai_assistant.api.main",
+    ])
+    assert parse_importtime(output) == [
+        {"module": "_io", "self_ms": 0.12, "cumulative_ms": 0.12},
+        {"module": "ai_assistant.api.main", "self_ms": 1.5, "cumulative_ms": 2.0},
+    ]
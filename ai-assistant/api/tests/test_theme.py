@@ -43,4 +43,18 @@ def test_get_and_save_theme():
         headers={"X-API-Key": "non-existent-tenant"}
     )
     assert response_get_default.status_code == 200, f"Get default theme failed: {response_get_default.text}"
-    assert response_get_default.json() == {"mainColor": "#0000FF"}, "Default theme is incorrect"
\ No newline at end of file
+    assert response_get_default.json() == {"mainColor": "#0000FF"}, "Default theme is incorrect"
+
+
+def test_get_theme_not_modified():
+    """
+    Test that /get-theme answers 304 without a body when the client sends the current ETag.
+    """
+    headers = {"X-API-Key": "non-existent-tenant"}
+    response = client.get("/get-theme", headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response_cached = client.get("/get-theme", headers={**headers, "If-None-Match": etag})
+    assert response_cached.status_code == 304
+    assert response_cached.content == b""
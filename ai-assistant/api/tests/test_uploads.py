@@ -0,0 +1,47 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from ai_assistant.api.services.uploads import MULTIPART_OVERHEAD, UploadSizeMiddleware, save_upload
+
+app = FastAPI()
+app.add_middleware(UploadSizeMiddleware, max_bytes=1024)
+
+
+@app.post("/upload")
+async def upload(request: Request):
+    form = await request.form()
+    written = await save_upload(form["file"], app.state.dest_path, max_bytes=1024)
+    return {"written": written}
+
+
+def test_upload_within_the_limit_is_saved(tmp_path):
+    app.state.dest_path = str(tmp_path / "doc.md")
+    response = TestClient(app).post("/upload", files={"file": ("doc.md", b"# Title\n" * 10)})
+    assert response.status_code == 200
+    assert response.json() == {"written": 80}
+    assert (tmp_path / "doc.md").read_bytes() == b"# Title\n" * 10
+
+
+def test_chunked_upload_over_the_limit_is_rejected(tmp_path):
+    """
+    A body without Content-Length is cut off once it goes over the limit.
+    """
+    app.state.dest_path = str(tmp_path / "doc.md")
+    chunk = b"x" * 16 * 1024
+
+    def body():
+        for _ in range(MULTIPART_OVERHEAD // len(chunk) + 2):
+            yield chunk
+
+    response = TestClient(app).post(
+        "/upload", content=body(), headers={"Content-Type": "multipart/form-data; boundary=b"}
+    )
+    assert response.status_code == 413
+    assert not (tmp_path / "doc.md").exists()
+
+
+def test_declared_length_over_the_limit_is_rejected():
+    response = TestClient(app).post(
+        "/upload", content=b"x" * (MULTIPART_OVERHEAD + 2048), headers={"Content-Type": "multipart/form-data; boundary=b"}
+    )
+    assert response.status_code == 413
@@ -0,0 +1,85 @@
+import asyncio
+
+from ai_assistant.api.benchmarks.stub_ollama import StubOllama
+from ai_assistant.api.llm.backend_pool import Backend
+from ai_assistant.api.llm.llm_client import LlmClient
+from ai_assistant.api.services.usage import GenerationUsage, UsageTracker
+
+
+def usage(prompt_tokens, completion_tokens):
+    return GenerationUsage(prompt_tokens, completion_tokens, prompt_tokens / 100, completion_tokens / 10, 1.0)
+
+
+def test_usage_is_aggregated_in_rolling_windows(tmp_path):
+    tracker = UsageTracker(str(tmp_path / "usage.db"))
+    now = 1_000_000 * 60.0
+    tracker.record("acme", "llama2", usage(1000, 20), now=now - 2 * 3600)
+    tracker.record("acme", "llama2", usage(3000, 40), now=now - 30)
+    tracker.record("acme", "llama2", usage(1000, 60), now=now)
+    tracker.record("globex", "mistral", usage(200, 10), now=now)
+
+    assert tracker.tokens_used("acme", 3600, now=now) == 4100
+    assert tracker.tokens_used("acme", 86400, now=now) == 5120
+
+    stats = tracker.stats(window=3600, now=now)
+    assert [(row["tenant_id"], row["model"]) for row in stats] == [("acme", "llama2"), ("globex", "mistral")]
+    assert stats[0]["requests"] == 2
+    assert (stats[0]["prompt_tokens"], stats[0]["completion_tokens"]) == (4000, 100)
+    assert stats[0]["avg_prompt_tokens"] == 2000
+    assert stats[0]["prompt_tokens_per_second"] == 100
+    assert stats[0]["completion_tokens_per_second"] == 10
+    assert [row["tenant_id"] for row in tracker.stats(window=3600, tenant_id="globex", now=now)] == ["globex"]
+
+
+def test_token_quota_counts_this_workers_generations(tmp_path):
+    """
+    Usage is cached between refreshes, but generations of this worker are added to the cache.
+    """
+    tracker = UsageTracker(str(tmp_path / "usage.db"), quota_refresh_interval=60)
+    now = 1_000_000 * 60.0 + 15
+    limits = {"tokens_per_hour": 1000}
+    assert tracker.quota_retry_after("acme", limits, now=now) == 0
+    tracker.record("acme", "llama2", usage(900, 100), now=now)
+    # The tokens leave the hour window an hour after the minute they were used in.
+    assert tracker.quota_retry_after("acme", limits, now=now) == 3600 - 15
+    assert tracker.quota_retry_after("acme", {"tokens_per_hour": 5000}, now=now) == 0
+    # Tenants without a quota never touch the database.
+    assert tracker.quota_retry_after("globex", {}, now=now) == 0
+
+
+def test_retry_after_waits_for_the_exceeded_window(tmp_path):
+    """
+    An exceeded daily quota is retried once enough usage left the day window, not at the next minute.
+    """
+    tracker = UsageTracker(str(tmp_path / "usage.db"), quota_refresh_interval=0)
+    now = 1_000_000 * 60.0
+    tracker.record("acme", "llama2", usage(600, 0), now=now - 5 * 3600)
+    tracker.record("acme", "llama2", usage(400, 0), now=now - 2 * 3600)
+    limits = {"tokens_per_hour": 1000, "tokens_per_day": 1000}
+    # The oldest tokens bring the usage under the quota once they are a day old.
+    assert tracker.quota_retry_after("acme", limits, now=now) == 19 * 3600
+
+    # When the older usage alone is not enough, the wait is until the later usage leaves too.
+    tracker.record("acme", "llama2", usage(700, 0), now=now - 3600 * 1.5)
+    assert tracker.quota_retry_after("acme", {"tokens_per_day": 1000}, now=now) == 22 * 3600
+
+
+def test_llm_client_records_ollama_token_counts(tmp_path):
+    stub = StubOllama(latency=0, token_rate=0, tokens=3)
+    tracker = UsageTracker(str(tmp_path / "usage.db"))
+    client = LlmClient(model_name="llama2", vector_store=object(), backends=[Backend(stub.url)], usage=tracker)
+
+    async def scenario():
+        answer = await client.query("acme", "first question", [])
+        tokens = [token async for token in client.stream("acme", "second question", [])]
+        await client.aclose()
+        return answer, tokens
+
+    try:
+        answer, tokens = asyncio.run(scenario())
+    finally:
+        stub.close()
+    assert answer == "ok ok ok" and "".join(tokens) == "ok ok ok"
+    [row] = tracker.stats()
+    assert (row["tenant_id"], row["model"], row["requests"], row["completion_tokens"]) == ("acme", "llama2", 2, 6)
+    assert row["prompt_tokens"] > 0
@@ -0,0 +1,326 @@
+"""
+Offline bulk ingestion of a directory tree into a tenant's collection.
+
+Files are parsed and chunked in a process pool while the main process embeds the
+chunks in large batches spanning several files and writes them into the same
+sharded collection, lexical index and manifests the API uses. A document's manifest
+is recorded once all its chunks are stored, and a checkpoint of the finished files
+is written after every batch, so an interrupted run resumes where it stopped.
+
+The collection index is updated after every batch that changed the collection,
+which bumps the tenant's generation: the API workers drop their cached answers
+for the tenant on their next lookup, as after an ingestion through the API.
+"""
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from . import registry
+from .collection_index import collection_index
+from .endpoint_index import endpoint_index
+from .ingest_docs import chunk_id, init_chroma_db, iter_file_chunks, missing_chunk_ids
+from .lexical_index import get_lexical_index
+from .manifests import document_manifests, file_hash, purge_tombstones
+from ..config import settings
+
+# Extensions handled by ``iter_documents``.
+SUPPORTED_EXTENSIONS = (".md", ".pdf", ".json")
+
+
+def discover_files(root: str) -> List[Tuple[str, str]]:
+    """
+    Returns the supported files under ``root`` with their document names.
+
+    The document name is the path relative to ``root`` with forward slashes, so
+    files with the same name in different directories stay distinct.
+
+    Returns:
+        List[Tuple[str, str]]: ``(path, name)`` pairs, sorted by name.
+    """
+    if os.path.isfile(root):
+        return [(root, os.path.basename(root))]
+    files = []
+    for directory, subdirectories, names in os.walk(root):
+        subdirectories[:] = sorted(d for d in subdirectories if not d.startswith("."))
+        for name in names:
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                path = os.path.join(directory, name)
+                files.append((path, os.path.relpath(path, root).replace(os.sep, "/")))
+    return sorted(files, key=lambda item: item[1])
+
+
+def parse_file(file_path: str, name: str) -> Dict:
+    """
+    Reads and chunks one file. Runs in the worker processes.
+
+    The workers already parse files in parallel, so a PDF is parsed by its worker alone.
+
+    Returns:
+        dict: The document's ``name``, ``content_hash``, ``size``, ``chunks`` as
+        ``(chunk_id, text, metadata)`` tuples and API ``operations``, or its ``name`` and an ``error``.
+    """
+    try:
+        operations: list = []
+        chunks = [
+            (chunk_id(chunk.page_content), chunk.page_content, chunk.metadata)
+            for chunk in iter_file_chunks(file_path, name, lambda **update: None, operations, pdf_workers=1)
+        ]
+        return {
+            "name": name, "content_hash": file_hash(file_path), "size": os.path.getsize(file_path),
+            "chunks": chunks, "operations": operations,
+        }
+    except Exception as e:
+        return {"name": name, "error": str(e)}
+
+
+class Checkpoint:
+    """
+    The files of a bulk run that are fully ingested, keyed by document name.
+
+    A file is skipped on resume while its size and modification time are unchanged,
+    without being read again. The manifest stays the source of truth: a changed file
+    is re-parsed and then skipped by content hash if it did not really change.
+    """
+
+    def __init__(self, path: str | None, root: str):
+        """
+        Loads the checkpoint, ignoring one written for another directory.
+
+        Args:
+            path (str): Where the checkpoint is stored; None keeps it in memory only.
+            root (str): The directory being ingested.
+        """
+        self.path = path
+        self.root = os.path.abspath(root)
+        self.files: Dict[str, list] = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("root") == self.root:
+                self.files = data.get("files", {})
+
+    @staticmethod
+    def _signature(file_path: str) -> list:
+        stat = os.stat(file_path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def is_done(self, file_path: str, name: str) -> bool:
+        return self.files.get(name) == self._signature(file_path)
+
+    def mark_done(self, file_path: str, name: str):
+        self.files[name] = self._signature(file_path)
+
+    def save(self):
+        """
+        Writes the checkpoint atomically.
+        """
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w") as f:
+            json.dump({"root": self.root, "files": self.files}, f)
+        os.replace(temporary_path, self.path)
+
+
+def default_checkpoint_path(tenant_id: str) -> str:
+    """
+    Returns where a tenant's bulk ingestion checkpoint is kept by default.
+    """
+    return os.path.join(settings.bulk_ingest_checkpoint_dir, f"{tenant_id}.json")
+
+
+def _parsed_files(files: List[Tuple[str, str]], executor: Executor, window: int) -> Iterator[Dict]:
+    """
+    Yields the parsed files in order, keeping at most ``window`` files in flight.
+
+    Parsing is usually faster than embedding, so the window bounds how many parsed
+    files wait in memory for the embedding batches.
+    """
+    files = iter(files)
+    pending = deque(executor.submit(parse_file, file_path, name) for file_path, name in islice(files, window))
+    while pending:
+        parsed = pending.popleft().result()
+        # The next file is submitted before this one is embedded, so the workers stay busy.
+        for file_path, name in islice(files, 1):
+            pending.append(executor.submit(parse_file, file_path, name))
+        yield parsed
+
+
+def bulk_ingest(
+    root: str,
+    tenant_id: str,
+    workers: int | None = None,
+    batch_size: int | None = None,
+    checkpoint_path: str | None = None,
+    executor: Executor | None = None,
+    report: Callable[[Dict], None] | None = None,
+) -> Dict:
+    """
+    Ingests every supported file under ``root`` into a tenant's collection.
+
+    Args:
+        root (str): The directory (or single file) to ingest.
+        tenant_id (str): The ID of the tenant.
+        workers (int): Number of parsing processes (default: settings.bulk_ingest_workers, 0 for one per CPU).
+        batch_size (int): Number of chunks embedded per call to the model (default: settings.bulk_ingest_batch_size).
+        checkpoint_path (str): Where finished files are recorded (default: one file per tenant
+            in settings.bulk_ingest_checkpoint_dir).
+        executor (Executor): Executor to parse files in (default: a process pool of ``workers``).
+        report (Callable): Called with the running statistics after each embedding batch.
+
+    Returns:
+        dict: Counts of files and chunks, and throughput statistics.
+    """
+    workers = workers if workers is not None else settings.bulk_ingest_workers
+    workers = workers or os.cpu_count() or 1
+    batch_size = batch_size or settings.bulk_ingest_batch_size
+    checkpoint = Checkpoint(checkpoint_path or default_checkpoint_path(tenant_id), root)
+
+    collection = init_chroma_db(tenant_id)
+    embedding_model = registry.collection_model(collection)
+    embedding_function = registry.get_embedding_function(embedding_model)
+    lexical_index = get_lexical_index(tenant_id)
+
+    stats = {
+        "files_total": 0, "files_ingested": 0, "files_unchanged": 0, "files_failed": 0,
+        "chunks_embedded": 0, "chunks_skipped": 0, "chunks_removed": 0, "embed_batches": 0,
+    }
+    failures: Dict[str, str] = {}
+    embed_seconds: List[float] = []
+    started = time.perf_counter()
+    batch: Dict[str, Tuple[str, Dict]] = {}
+    # Files whose chunks are all in ``batch`` or already stored.
+    completed: List[Tuple[str, Dict]] = []
+
+    def throughput() -> Dict:
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        return {
+            **stats,
+            "elapsed_seconds": round(elapsed, 2),
+            "docs_per_second": round(stats["files_ingested"] / elapsed, 2),
+            "chunks_per_second": round(stats["chunks_embedded"] / elapsed, 1),
+            "embed_ms_per_batch": round(1000 * sum(embed_seconds) / len(embed_seconds), 1) if embed_seconds else 0.0,
+        }
+
+    def upsert(chunks: Dict[str, Tuple[str, Dict]], ids: List[str]):
+        texts = [chunks[id_][0] for id_ in ids]
+        embed_start = time.perf_counter()
+        embeddings = embedding_function(texts)
+        embed_seconds.append(time.perf_counter() - embed_start)
+        collection.upsert(ids=ids, documents=texts, embeddings=embeddings, metadatas=[chunks[id_][1] for id_ in ids])
+        stats["embed_batches"] += 1
+
+    def flush():
+        stored = stats["chunks_embedded"] + stats["chunks_removed"]
+        changed = bool(completed)
+        if batch:
+            existing = set(collection.get(ids=list(batch), include=[])["ids"])
+            new_ids = [id_ for id_ in batch if id_ not in existing]
+            if new_ids:
+                upsert(batch, new_ids)
+            lexical_index.add((id_, text) for id_, (text, _) in batch.items())
+            stats["chunks_embedded"] += len(new_ids)
+            stats["chunks_skipped"] += len(existing)
+            batch.clear()
+        for file_path, parsed in completed:
+            document_manifests.replace(
+                tenant_id, parsed["name"], parsed["content_hash"], parsed["size"],
+                [id_ for id_, _, _ in parsed["chunks"]], embedding_model,
+            )
+            endpoint_index.replace(tenant_id, parsed["name"], parsed["operations"])
+        # Chunks skipped as stored may have been purged by a deletion in the API
+        # before the manifests above referenced them; they are safe now, store them again.
+        chunks = {id_: (text, metadata) for _, parsed in completed for id_, text, metadata in parsed["chunks"]}
+        missing = sorted(missing_chunk_ids(collection, chunks))
+        if missing:
+            upsert(chunks, missing)
+            lexical_index.add((id_, chunks[id_][0]) for id_ in missing)
+            stats["chunks_embedded"] += len(missing)
+        for file_path, parsed in completed:
+            checkpoint.mark_done(file_path, parsed["name"])
+            stats["files_ingested"] += 1
+        completed.clear()
+        stats["chunks_removed"] += purge_tombstones(tenant_id, collection)
+        if changed or stats["chunks_embedded"] + stats["chunks_removed"] != stored:
+            # Answers cached by the API before this batch may be outdated.
+            collection_index.record(tenant_id, collection.name, collection.count(), embedding_model)
+        checkpoint.save()
+        if report:
+            report(throughput())
+
+    files = discover_files(root)
+    stats["files_total"] = len(files)
+    to_parse = []
+    for file_path, name in files:
+        if checkpoint.is_done(file_path, name):
+            stats["files_unchanged"] += 1
+        else:
+            to_parse.append((file_path, name))
+    paths = {name: file_path for file_path, name in to_parse}
+
+    own_executor = executor is None
+    executor = executor or ProcessPoolExecutor(max_workers=workers)
+    try:
+        for parsed in _parsed_files(to_parse, executor, window=2 * workers):
+            file_path = paths[parsed["name"]]
+            if "error" in parsed:
+                stats["files_failed"] += 1
+                failures[parsed["name"]] = parsed["error"]
+                continue
+            previous = document_manifests.get(tenant_id, parsed["name"])
+            if previous is not None and (previous.content_hash, previous.embedding_model) == (
+                parsed["content_hash"], embedding_model
+            ):
+                stats["files_unchanged"] += 1
+                checkpoint.mark_done(file_path, parsed["name"])
+                continue
+            for id_, text, metadata in parsed["chunks"]:
+                batch[id_] = (text, metadata)
+                if len(batch) >= batch_size:
+                    # The chunks of this file stored so far are found as existing when its manifest is written.
+                    flush()
+            completed.append((file_path, parsed))
+        flush()
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    return {**throughput(), "failures": failures}
+
+
+def main(argv: List[str] | None = None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ingest a directory of documents into a tenant's collection.")
+    parser.add_argument("root", help="Directory (or file) to ingest; .md, .pdf and .json files (including OpenAPI specs) are read")
+    parser.add_argument("--tenant", required=True, help="The ID of the tenant")
+    parser.add_argument("--workers", type=int, default=None, help="Parsing processes (default: BULK_INGEST_WORKERS)")
+    parser.add_argument("--batch-size", type=int, default=None, help="Chunks per embedding batch (default: BULK_INGEST_BATCH_SIZE)")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file (default: one per tenant in BULK_INGEST_CHECKPOINT_DIR)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint; unchanged files are still skipped by content hash")
+    args = parser.parse_args(argv)
+
+    checkpoint_path = args.checkpoint or default_checkpoint_path(args.tenant)
+    if args.restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    def report(progress: Dict):
+        print(
+            f"{progress['files_ingested'] + progress['files_unchanged'] + progress['files_failed']}/{progress['files_total']} files, "
+            f"{progress['chunks_embedded']} chunks embedded, {progress['docs_per_second']} docs/s, "
+            f"{progress['chunks_per_second']} chunks/s, {progress['embed_ms_per_batch']} ms/batch",
+            flush=True,
+        )
+
+    result = bulk_ingest(args.root, args.tenant, args.workers, args.batch_size, checkpoint_path, report=report)
+    print(json.dumps(result, indent=2))
+    return 1 if result["files_failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
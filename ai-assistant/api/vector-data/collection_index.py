@@ -0,0 +1,201 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple
+
+from ..config import settings
+
+
+class CollectionInfo(NamedTuple):
+    """
+    What the index knows about a tenant's collection.
+    """
+    tenant_id: str
+    collection_name: str
+    chunk_count: int
+    last_ingested_at: str | None
+    embedding_model: str | None
+    # Incremented by every write to the entry, in any process; caches of answers
+    # built from the collection are dropped when it changes.
+    generation: int = 0
+
+
+class CollectionIndex:
+    """
+    Index of the tenants that have a vector collection.
+
+    The query path looks tenants up here in O(1) instead of listing every Chroma
+    collection on each request, and skips tenants with no chunks. Entries live in a
+    small SQLite database shared with the ingestion workers, and are mirrored in
+    memory. The mirror is reloaded at most every ``refresh_interval`` seconds, and
+    only when another connection has written to the database since.
+    """
+
+    def __init__(self, db_path: str | None = None, refresh_interval: float | None = None):
+        """
+        Args:
+            db_path (str): Path of the SQLite database (default: settings.collection_index_path).
+            refresh_interval (float): Seconds between checks for writes by other processes
+                (default: settings.collection_index_refresh_interval).
+        """
+        self.db_path = db_path or settings.collection_index_path
+        self.refresh_interval = (
+            settings.collection_index_refresh_interval if refresh_interval is None else refresh_interval
+        )
+        self._entries: Dict[str, CollectionInfo] = {}
+        self._data_version = None
+        self._checked_at = float("-inf")
+        self._connection_handle: sqlite3.Connection | None = None
+        self._lock = threading.RLock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._connection_handle is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=10, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS collections (
+                    tenant_id TEXT PRIMARY KEY,
+                    collection_name TEXT NOT NULL,
+                    chunk_count INTEGER NOT NULL,
+                    last_ingested_at TEXT,
+                    embedding_model TEXT,
+                    generation INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(collections)")}
+            if "generation" not in columns:
+                # Databases created before the column existed.
+                connection.execute("ALTER TABLE collections ADD COLUMN generation INTEGER NOT NULL DEFAULT 0")
+            self._connection_handle = connection
+        return self._connection_handle
+
+    def _refresh(self, force: bool = False):
+        """
+        Reloads the in-memory entries if the database changed since they were read.
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.refresh_interval:
+            return
+        with self._lock:
+            connection = self._connection()
+            # data_version only changes when another connection commits.
+            data_version = connection.execute("PRAGMA data_version").fetchone()[0]
+            if force or data_version != self._data_version:
+                rows = connection.execute(
+                    "SELECT tenant_id, collection_name, chunk_count, last_ingested_at, embedding_model, generation "
+                    "FROM collections"
+                ).fetchall()
+                self._entries = {row[0]: CollectionInfo(*row) for row in rows}
+                self._data_version = data_version
+            self._checked_at = now
+
+    def get(self, tenant_id: str) -> CollectionInfo | None:
+        """
+        Returns the tenant's collection, or None if the tenant has never ingested anything.
+
+        Args:
+            tenant_id (str): The ID of the tenant.
+
+        Returns:
+            CollectionInfo | None: The collection's entry.
+        """
+        self._refresh()
+        return self._entries.get(tenant_id)
+
+    def record(
+        self,
+        tenant_id: str,
+        collection_name: str,
+        chunk_count: int,
+        embedding_model: str | None = None,
+        ingested: bool = True,
+    ) -> CollectionInfo:
+        """
+        Creates or updates a tenant's entry.
+
+        Args:
+            tenant_id (str): The ID of the tenant.
+            collection_name (str): The name of the tenant's collection.
+            chunk_count (int): The number of chunks now in the collection.
+            embedding_model (str): The model the chunks were embedded with.
+            ingested (bool): Whether this follows an ingestion (updates ``last_ingested_at``).
+
+        Returns:
+            CollectionInfo: The updated entry.
+        """
+        with self._lock:
+            previous = self.get(tenant_id)
+            last_ingested_at = (
+                datetime.now(timezone.utc).isoformat(timespec="seconds") if ingested
+                else previous.last_ingested_at if previous else None
+            )
+            info = CollectionInfo(
+                tenant_id,
+                collection_name,
+                chunk_count,
+                last_ingested_at,
+                embedding_model or (previous.embedding_model if previous else None),
+            )
+            # The generation is incremented in the database, so writes from other
+            # processes are never given the same one.
+            generation = self._connection().execute(
+                "INSERT INTO collections VALUES (?, ?, ?, ?, ?, 1) ON CONFLICT (tenant_id) DO UPDATE SET "
+                "collection_name = excluded.collection_name, chunk_count = excluded.chunk_count, "
+                "last_ingested_at = excluded.last_ingested_at, embedding_model = excluded.embedding_model, "
+                "generation = generation + 1 RETURNING generation",
+                info[:5],
+            ).fetchone()[0]
+            info = info._replace(generation=generation)
+            self._entries[tenant_id] = info
+        return info
+
+    def backfill(self, chroma_client) -> int:
+        """
+        Adds the collections of a Chroma client that are missing from the index.
+
+        Needed once for data ingested before the index existed; done automatically
+        the first time an empty index is queried.
+
+        Args:
+            chroma_client: The Chroma client whose collections are indexed.
+
+        Returns:
+            int: The number of entries added.
+        """
+        added = 0
+        for collection in chroma_client.list_collections():
+            # Older Chroma versions return Collection objects, newer ones names.
+            name = getattr(collection, "name", collection)
+            if not name.startswith("tenant_") or self.get(name[len("tenant_"):]) is not None:
+                continue
+            collection = chroma_client.get_collection(name)
+            embedding_model = (collection.metadata or {}).get("embedding_model")
+            self.record(name[len("tenant_"):], name, collection.count(), embedding_model, ingested=False)
+            added += 1
+        return added
+
+    def is_empty(self) -> bool:
+        self._refresh()
+        return not self._entries
+
+    def stats(self) -> Dict:
+        """
+        Returns every indexed collection and totals, for the admin endpoint.
+        """
+        self._refresh(force=True)
+        collections: List[Dict] = [info._asdict() for info in sorted(self._entries.values())]
+        return {
+            "tenants": len(collections),
+            "chunks": sum(info["chunk_count"] for info in collections),
+            "collections": collections,
+        }
+
+
+# Shared index used by the vector store and the ingestion pipeline.
+collection_index = CollectionIndex()
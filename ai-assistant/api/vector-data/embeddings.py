@@ -0,0 +1,71 @@
+from typing import List, Sequence
+
+from chromadb import EmbeddingFunction
+from chromadb.utils import embedding_functions
+
+# "torch" runs the models at full precision, "int8" quantizes their linear layers
+# (dynamic int8 quantization, CPU only) and "onnx" runs them with ONNX Runtime.
+EMBEDDING_BACKENDS = ("torch", "int8", "onnx")
+
+
+class ModelEmbeddingFunction(EmbeddingFunction):
+    """
+    Chroma embedding function around an already loaded sentence-transformers (or instructor) model.
+    """
+
+    def __init__(self, model, model_name: str):
+        self._model = model
+        self.model_name = model_name
+
+    def __call__(self, input: Sequence[str]) -> List[List[float]]:
+        return self._model.encode(list(input), convert_to_numpy=True).tolist()
+
+
+def _load_model(model_name: str, **kwargs):
+    if model_name.startswith("hkunlp/instructor"):
+        from InstructorEmbedding import INSTRUCTOR
+
+        return INSTRUCTOR(model_name, device="cpu", **kwargs)
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name, device="cpu", **kwargs)
+
+
+def load_embedding_function(model_name: str, backend: str = "torch", onnx_file: str | None = None):
+    """
+    Loads an embedding model with the given inference backend.
+
+    The quantized backends trade a little accuracy for much less memory and faster
+    CPU inference; ``benchmarks/embedding_recall.py`` measures the trade-off.
+
+    Args:
+        model_name (str): A sentence-transformers model name, or an ``hkunlp/instructor-*`` model.
+        backend (str): One of ``EMBEDDING_BACKENDS``.
+        onnx_file (str): The ONNX file of the model repository to load with the ``onnx`` backend,
+            e.g. ``onnx/model_qint8_avx512_vnni.onnx`` for a pre-quantized export.
+
+    Returns:
+        EmbeddingFunction: The embedding function.
+
+    Raises:
+        ValueError: If the backend is unknown or does not support the model.
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}', expected one of {EMBEDDING_BACKENDS}")
+
+    if backend == "torch":
+        if model_name.startswith("hkunlp/instructor"):
+            return embedding_functions.InstructorEmbeddingFunction(model_name=model_name, device="cpu")
+        return embedding_functions.SentenceTransformerEmbeddingFunction(model_name=model_name)
+
+    if backend == "int8":
+        import torch
+
+        model = torch.quantization.quantize_dynamic(_load_model(model_name), {torch.nn.Linear}, dtype=torch.qint8)
+        return ModelEmbeddingFunction(model, model_name)
+
+    if model_name.startswith("hkunlp/instructor"):
+        raise ValueError("Instructor models cannot run on the onnx backend, use the int8 backend instead")
+    # Requires sentence-transformers>=3.2 with optimum[onnxruntime].
+    model_kwargs = {"file_name": onnx_file} if onnx_file else None
+    return ModelEmbeddingFunction(_load_model(model_name, backend="onnx", model_kwargs=model_kwargs), model_name)
@@ -0,0 +1,142 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterable, List
+from urllib.parse import urlsplit
+
+from ..config import settings
+
+
+def _split(path: str) -> List[str]:
+    return [segment for segment in path.split("/") if segment]
+
+
+def _segment_pattern(segment: str) -> re.Pattern:
+    """
+    Returns a regex matching a path template segment, ``{param}`` matching any value.
+    """
+    parts = re.split(r"\{[^/{}]*\}", segment)
+    return re.compile("[^/]+".join(re.escape(part) for part in parts) + r"\Z")
+
+
+class EndpointIndex:
+    """
+    Exact-match index of the operations of the tenants' API specs, by method and path.
+
+    When the SDK reports a failing call, its operation is found directly instead of
+    through a vector search. A call path is matched against the spec paths first
+    exactly, then against the path templates with the same number of segments,
+    preferring the template with the most literal segments (``/users/me`` over
+    ``/users/{id}``). Operations are also indexed under the base paths of the spec's
+    servers, so calls reported with a full URL match.
+    """
+
+    def __init__(self, db_path: str | None = None):
+        """
+        Initializes the index. The database is created on first use.
+
+        Args:
+            db_path (str): Path of the SQLite database (default: settings.endpoint_index_path).
+        """
+        self.db_path = db_path or settings.endpoint_index_path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Returns this thread's connection, opening it on first use.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS endpoints (
+                    tenant_id TEXT NOT NULL,
+                    method TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    segments INTEGER NOT NULL,
+                    document TEXT NOT NULL,
+                    record TEXT NOT NULL,
+                    PRIMARY KEY (tenant_id, method, path)
+                );
+                CREATE INDEX IF NOT EXISTS idx_endpoints_segments ON endpoints (tenant_id, method, segments);
+                CREATE INDEX IF NOT EXISTS idx_endpoints_document ON endpoints (tenant_id, document);
+                """
+            )
+            self._local.connection = connection
+        return connection
+
+    def replace(self, tenant_id: str, document: str, records: Iterable[Dict]):
+        """
+        Replaces the operations indexed for one of a tenant's API specs.
+
+        Args:
+            tenant_id (str): The ID of the tenant.
+            document (str): The spec's file name.
+            records (Iterable[Dict]): The spec's operation records, as produced by ``ApiParser``.
+        """
+        rows = []
+        for record in records:
+            base_paths = {""} | {urlsplit(server).path.rstrip("/") for server in record.get("servers", [])}
+            for base_path in sorted(base_paths):
+                path = "/" + "/".join(_split(base_path + record["path"]))
+                rows.append((tenant_id, record["method"], path, len(_split(path)), document, json.dumps(record)))
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute("DELETE FROM endpoints WHERE tenant_id = ? AND document = ?", (tenant_id, document))
+            connection.executemany("INSERT OR REPLACE INTO endpoints VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def remove(self, tenant_id: str, document: str):
+        """
+        Forgets the operations of one of a tenant's API specs.
+        """
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN")
+            connection.execute("DELETE FROM endpoints WHERE tenant_id = ? AND document = ?", (tenant_id, document))
+
+    def lookup(self, tenant_id: str, method: str, url: str) -> Dict | None:
+        """
+        Returns the operation a call is made to.
+
+        Args:
+            tenant_id (str): The ID of the tenant.
+            method (str): The HTTP method of the call.
+            url (str): The URL or path of the call; the query string is ignored.
+
+        Returns:
+            Dict | None: The operation record, with the spec it comes from as ``document``, or None.
+        """
+        segments = _split(urlsplit(url).path)
+        path = "/" + "/".join(segments)
+        method = method.upper()
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT document, record FROM endpoints WHERE tenant_id = ? AND method = ? AND path = ?",
+            (tenant_id, method, path),
+        ).fetchone()
+        if row is None:
+            best_literals = -1
+            for template, document, record in connection.execute(
+                "SELECT path, document, record FROM endpoints WHERE tenant_id = ? AND method = ? AND segments = ?",
+                (tenant_id, method, len(segments)),
+            ):
+                template_segments = _split(template)
+                if not all(_segment_pattern(t).match(s) for t, s in zip(template_segments, segments)):
+                    continue
+                literals = sum("{" not in t for t in template_segments)
+                if literals > best_literals:
+                    best_literals, row = literals, (document, record)
+        if row is None:
+            return None
+        return {**json.loads(row[1]), "document": row[0]}
+
+
+# Shared endpoint index, written by the ingestion workers and read by the API.
+endpoint_index = EndpointIndex()
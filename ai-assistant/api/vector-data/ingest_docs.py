@@ -1,90 +1,355 @@
+import hashlib
 import os
-from typing import List
-from fastapi import UploadFile, HTTPException
-from langchain.document_loaders import (
-    PyPDFLoader,
-    TextLoader,
-    JSONLoader,
-)
+from typing import Callable, Iterable, Iterator
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import HuggingFaceInstructEmbeddings
-from langchain_community.vectorstores import Chroma
 from langchain.docstore.document import Document as LangchainDocument
 
+from . import registry
+from .collection_index import collection_index
+from .endpoint_index import endpoint_index
+from .lexical_index import LexicalIndex, get_lexical_index
+from .loaders import iter_documents
+from .manifests import document_manifests, file_hash, purge_tombstones
+from ..config import settings
+from ..services.api_parser import ApiParser, operation_text
 
-def init_chroma_db(tenant_id: str):
+# Where collections were stored before the sharded layout, and the model they were embedded with.
+LEGACY_PERSIST_ROOT = os.path.join("ai-assistant", "vector-data", "chromadb")
+LEGACY_EMBEDDING_MODEL = "hkunlp/instructor-xl"
+
+
+def get_persist_directory(tenant_id: str) -> str:
+    """
+    Returns the storage shard holding a tenant's ChromaDB data.
+    """
+    return registry.shard_directory(tenant_id)
+
+
+def init_chroma_db(tenant_id: str, model_name: str | None = None):
     """
-    Initializes a ChromaDB instance for a specific tenant, creating it if it doesn't exist.
+    Returns the ChromaDB collection for a specific tenant, creating it if it doesn't exist.
+
+    The collection lives in the tenant's storage shard, where the query path reads it.
+    The Chroma client, the embedding model and the collection handle are cached in the
+    shared registry, so only the first upload in a worker pays for loading them.
 
     Args:
         tenant_id (str): The ID of the tenant.
+        model_name (str): The embedding model if the collection is created (default: settings.embedding_model).
 
     Returns:
-        Chroma: A ChromaDB instance for the specified tenant.
+        Collection: The ChromaDB collection for the specified tenant.
     """
-    # Create a unique persist directory for each tenant
-    persist_directory = os.path.join("ai-assistant", "vector-data", "chromadb", tenant_id)
-    os.makedirs(persist_directory, exist_ok=True)
+    return registry.get_tenant_collection(tenant_id, create=True, model_name=model_name)
 
-    # Use a tenant-specific collection name
-    collection_name = f"tenant_{tenant_id}"
 
-    # Initialize embeddings and Chroma with the tenant-specific collection
-    embeddings = HuggingFaceInstructEmbeddings(
-        model_name="hkunlp/instructor-xl",
-        model_kwargs={"device": "cpu"},
-    )
+def chunk_id(text: str) -> str:
+    """
+    Returns the stable ID of a chunk: the SHA-256 of its content.
+
+    Identical content always maps to the same ID, so re-uploaded chunks are
+    recognised and never embedded twice within a tenant's collection.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def embed_and_upsert(
+    collection,
+    embedding_function,
+    chunks: Iterable[LangchainDocument],
+    batch_size: int,
+    progress: Callable[..., None],
+    lexical_index: LexicalIndex | None = None,
+    chunk_ids: set | None = None,
+):
+    """
+    Embeds the chunks not yet in the collection, in batches, and upserts them.
+
+    Args:
+        collection (Collection): The tenant's ChromaDB collection.
+        embedding_function (EmbeddingFunction): The embedding function of the collection.
+        chunks (Iterable[LangchainDocument]): The split document chunks.
+        batch_size (int): Number of chunks embedded per call to the model.
+        progress (Callable): Called with ``chunks_embedded`` and ``chunks_skipped`` after each batch.
+        lexical_index (LexicalIndex): The tenant's BM25 index, updated alongside the collection.
+        chunk_ids (set): Filled with the IDs of all the chunks, embedded or not.
+
+    Returns:
+        tuple[int, int]: The number of chunks embedded and skipped.
+    """
+    embedded = skipped = 0
+    seen = chunk_ids if chunk_ids is not None else set()
+    batch: dict[str, LangchainDocument] = {}
+
+    def flush():
+        nonlocal embedded, skipped
+        if not batch:
+            return
+        # Content already in the collection keeps its embedding.
+        existing = set(collection.get(ids=list(batch), include=[])["ids"])
+        new_ids = [id_ for id_ in batch if id_ not in existing]
+        if new_ids:
+            texts = [batch[id_].page_content for id_ in new_ids]
+            collection.upsert(
+                ids=new_ids,
+                documents=texts,
+                embeddings=embedding_function(texts),
+                metadatas=[batch[id_].metadata for id_ in new_ids],
+            )
+        if lexical_index is not None:
+            # Indexing is cheap, so chunks embedded before the index existed are backfilled too.
+            lexical_index.add((id_, chunk.page_content) for id_, chunk in batch.items())
+        embedded += len(new_ids)
+        skipped += len(existing)
+        batch.clear()
+        progress(chunks_embedded=embedded, chunks_skipped=skipped)
 
-    db = Chroma(
-        persist_directory=persist_directory, embedding_function=embeddings
-        , collection_name=collection_name
+    for chunk in chunks:
+        id_ = chunk_id(chunk.page_content)
+        if id_ in seen:
+            # Repeated content inside the same file (headers, footers, boilerplate).
+            skipped += 1
+            continue
+        seen.add(id_)
+        batch[id_] = chunk
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return embedded, skipped
+
+
+def missing_chunk_ids(collection, chunk_ids: Iterable[str], batch_size: int = 500) -> set:
+    """
+    Returns the IDs of the chunks that are not in the collection.
+
+    Ingestion skips chunks already stored, but until the new manifest references
+    them a concurrent deletion of another document sharing them may purge them.
+    Once the manifest is written they can no longer be purged, so whatever this
+    returns then has to be stored again.
+    """
+    chunk_ids = list(chunk_ids)
+    missing = set()
+    for start in range(0, len(chunk_ids), batch_size):
+        batch = chunk_ids[start:start + batch_size]
+        missing.update(set(batch) - set(collection.get(ids=batch, include=[])["ids"]))
+    return missing
+
+
+def iter_chunks(documents: Iterable[LangchainDocument], progress: Callable[..., None]) -> Iterator[LangchainDocument]:
+    """
+    Splits pages or sections into chunks as they are produced by a loader.
+
+    Args:
+        documents (Iterable[LangchainDocument]): The pages or sections of a file.
+        progress (Callable): Called with ``pages_parsed`` and ``chunks_total`` after each page.
+
+    Yields:
+        LangchainDocument: The next chunk.
+    """
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000, chunk_overlap=200
     )
-    db.persist()
-    return db
-    
+    pages = chunks = 0
+    for document in documents:
+        split_docs = text_splitter.split_documents([document])
+        pages += 1
+        chunks += len(split_docs)
+        progress(pages_parsed=pages, chunks_total=chunks)
+        yield from split_docs
+
+
+def iter_operation_chunks(
+    operations: Iterable[dict], file_name: str, records: list, progress: Callable[..., None]
+) -> Iterator[LangchainDocument]:
+    """
+    Yields one chunk per operation of an API spec, collecting the operation records.
 
-async def process_file(file_content: bytes, file_name: str, tenant_id: str):
+    Operations are not split, so an operation is always retrieved whole.
+
+    Args:
+        operations (Iterable[dict]): The operation records of the spec.
+        file_name (str): The spec's file name, recorded as the chunks' source.
+        records (list): Filled with the operation records as they are produced.
+        progress (Callable): Called with ``pages_parsed`` and ``chunks_total`` after each operation.
+    """
+    for count, record in enumerate(operations, start=1):
+        records.append(record)
+        progress(pages_parsed=count, chunks_total=count)
+        yield LangchainDocument(
+            page_content=operation_text(record),
+            metadata={"source": file_name, "method": record["method"], "path": record["path"]},
+        )
+
+
+def iter_file_chunks(
+    file_path: str,
+    file_name: str,
+    progress: Callable[..., None],
+    operations: list | None = None,
+    pdf_workers: int | None = None,
+) -> Iterator[LangchainDocument]:
+    """
+    Returns the chunks of a file, parsed lazily.
+
+    A JSON file holding an OpenAPI spec produces one chunk per operation, and its
+    operation records are appended to ``operations`` as the chunks are consumed.
+    Other files are read by their loader and split.
+
+    Args:
+        file_path (str): The file to read.
+        file_name (str): The original name of the file.
+        progress (Callable): Called with ``pages_parsed`` and ``chunks_total`` as the file is read.
+        operations (list): Filled with the operation records of an API spec.
+        pdf_workers (int): Number of processes parsing a PDF (default: ``pdf_parser.default_workers()``).
+    """
+    if file_name.lower().endswith(".json"):
+        spec = ApiParser().read_openapi(file_path)
+        if spec is not None:
+            records = operations if operations is not None else []
+            return iter_operation_chunks(spec.operations, file_name, records, progress)
+    return iter_chunks(iter_documents(file_path, file_name, pdf_workers=pdf_workers), progress)
+
+
+def process_file(file_path: str, file_name: str, tenant_id: str, progress: Callable[..., None] | None = None):
     """
     Processes a file by reading it, splitting it into chunks,
     embedding the chunks, and upserting them into ChromaDB.
+
+    The file is streamed through the pipeline: pages are parsed lazily, split, and
+    embedded a batch at a time, so memory use does not grow with the file size.
+    This is CPU bound and blocking; the API runs it in the ingestion worker pool.
+
+    An OpenAPI spec is embedded one operation per chunk, and its operations are
+    indexed by method and path for exact lookups.
+
+    Documents are identified by file name. A re-uploaded file that did not change
+    is skipped; for a new version only new chunks are embedded, and the chunks the
+    old version had and the new one has not are removed.
+
+    Args:
+        file_path (str): Where the uploaded file was saved.
+        file_name (str): The original name of the uploaded file.
+        tenant_id (str): The ID of the tenant.
+        progress (Callable): Called with keyword arguments (``pages_parsed``,
+            ``chunks_total``, ``chunks_embedded``, ``chunks_skipped``) as the file advances.
+
+    Returns:
+        dict: A summary of the processed file.
     """
-    try:
-        db = init_chroma_db(tenant_id)
-        documents: List[LangchainDocument] = []
-        
-        file_extension = file_name.split(".")[-1].lower()
-
-        # Create a temporary file
-        temp_file_path = os.path.join(persist_directory, file_name)
-        with open(temp_file_path, "wb") as temp_file:
-            temp_file.write(file_content)
-
-        if file_extension == "md":
-            loader = TextLoader(temp_file_path)
-            documents = loader.load()
-        elif file_extension == "pdf":
-            loader = PyPDFLoader(temp_file_path)
-            documents = loader.load()
-        elif file_extension == "json":
-            loader = JSONLoader(
-                file_path=temp_file_path,
-                jq_schema=".",
-                text_content=False,
-            )
-            documents = loader.load()
-        else:
-            raise ValueError(f"Unsupported file type: {file_extension}")
+    report = progress or (lambda **update: None)
+    content_hash = file_hash(file_path)
+    collection = init_chroma_db(tenant_id)
+
+    # Chunks are embedded with the model recorded in the collection, never a different one.
+    embedding_model = registry.collection_model(collection)
+    previous = document_manifests.get(tenant_id, file_name)
+    if previous is not None and (previous.content_hash, previous.embedding_model) == (content_hash, embedding_model):
+        report(chunks_total=previous.chunk_count, chunks_skipped=previous.chunk_count)
+        return {"message": f"File '{file_name}' is unchanged.", "status": "unchanged",
+                "chunks_embedded": 0, "chunks_skipped": previous.chunk_count, "chunks_removed": 0}
 
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000, chunk_overlap=200
+    embedding_function = registry.get_embedding_function(embedding_model)
+    chunk_ids: set = set()
+    operations: list = []
+    embedded, skipped = embed_and_upsert(
+        collection,
+        embedding_function,
+        iter_file_chunks(file_path, file_name, report, operations),
+        settings.ingest_embed_batch_size,
+        report,
+        lexical_index=get_lexical_index(tenant_id),
+        chunk_ids=chunk_ids,
+    )
+    # The new version is fully stored before the old version's chunks are tombstoned and purged.
+    document_manifests.replace(
+        tenant_id, file_name, content_hash, os.path.getsize(file_path), chunk_ids, embedding_model
+    )
+    if missing_chunk_ids(collection, chunk_ids):
+        # Chunks skipped as stored were purged by a concurrent deletion; the file's
+        # chunks that are still stored are skipped again.
+        restored, _ = embed_and_upsert(
+            collection,
+            embedding_function,
+            iter_file_chunks(file_path, file_name, lambda **update: None, []),
+            settings.ingest_embed_batch_size,
+            lambda **update: None,
+            lexical_index=get_lexical_index(tenant_id),
         )
-        split_docs = text_splitter.split_documents(documents)
-
-        db.add_documents(split_docs)
-        db.persist()
-        print(f"File '{file_name}' processed and added to ChromaDB in collection 'tenant_{tenant_id}'.")
-        os.remove(temp_file_path)  # Remove the temporary file
-        return {"message": f"File '{file_name}' processed and added to ChromaDB."}
-    except Exception as e:
-        print(f"Error processing file: {e}")
-        raise HTTPException(status_code=500, detail=f"Error processing file: {e}")
\ No newline at end of file
+        embedded += restored
+    removed = purge_tombstones(tenant_id, collection)
+    endpoint_index.replace(tenant_id, file_name, operations)
+    collection_index.record(tenant_id, collection.name, collection.count(), embedding_model)
+    print(f"File '{file_name}' processed and added to ChromaDB in collection 'tenant_{tenant_id}' "
+          f"({embedded} chunks embedded, {skipped} unchanged, {removed} removed).")
+    return {"message": f"File '{file_name}' processed and added to ChromaDB.", "status": "ingested",
+            "chunks_embedded": embedded, "chunks_skipped": skipped, "chunks_removed": removed}
+
+
+def rebuild_lexical_index(tenant_id: str, page_size: int = 1000) -> int:
+    """
+    Indexes every chunk of a tenant's collection in its lexical index.
+
+    Needed once for collections ingested before hybrid retrieval existed.
+
+    Args:
+        tenant_id (str): The ID of the tenant.
+        page_size (int): Number of chunks read from the collection at a time.
+
+    Returns:
+        int: The number of chunks read.
+    """
+    collection = init_chroma_db(tenant_id)
+    lexical_index = get_lexical_index(tenant_id)
+    offset = 0
+    while True:
+        page = collection.get(include=["documents"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            return offset
+        lexical_index.add(zip(page["ids"], page["documents"]))
+        offset += len(page["ids"])
+
+
+def migrate_legacy_collections(legacy_root: str = LEGACY_PERSIST_ROOT, page_size: int = 1000) -> dict:
+    """
+    Copies the collections of the old per-tenant layout into the sharded store.
+
+    Embeddings are copied as they are and the new collections record the model they
+    were made with, so nothing is re-embedded. Tenants that already have a collection
+    in the sharded store are left alone.
+
+    Args:
+        legacy_root (str): Directory holding one Chroma directory per tenant.
+        page_size (int): Number of chunks copied at a time.
+
+    Returns:
+        dict: The number of chunks copied per tenant.
+    """
+    copied = {}
+    if not os.path.isdir(legacy_root):
+        return copied
+    for tenant_id in sorted(os.listdir(legacy_root)):
+        legacy_client = registry.get_chroma_client(os.path.join(legacy_root, tenant_id))
+        try:
+            legacy = legacy_client.get_collection(name=f"tenant_{tenant_id}")
+        except Exception:
+            continue
+        if registry.get_tenant_collection(tenant_id) is not None:
+            continue
+        collection = init_chroma_db(tenant_id, model_name=LEGACY_EMBEDDING_MODEL)
+        lexical_index = get_lexical_index(tenant_id)
+        offset = 0
+        while True:
+            page = legacy.get(include=["documents", "embeddings", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            collection.upsert(
+                ids=page["ids"],
+                documents=page["documents"],
+                embeddings=page["embeddings"],
+                metadatas=page["metadatas"],
+            )
+            lexical_index.add(zip(page["ids"], page["documents"]))
+            offset += len(page["ids"])
+        collection_index.record(tenant_id, collection.name, collection.count(), LEGACY_EMBEDDING_MODEL, ingested=False)
+        copied[tenant_id] = offset
+    return copied
@@ -0,0 +1,221 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Set, Tuple
+
+from ..config import settings
+from . import registry
+
+# FTS5 splits on everything but letters and digits, so identifiers such as
+# "/api/v1/users", "E401" or "can_edit_theme" are indexed as their parts and
+# matched with the same tokenization at query time.
+_TOKEN = re.compile(r"[^\W_]+")
+
+# One connection per shard database, shared by the worker's threads: the number of
+# open files is bounded by the shard count, whatever the number of tenants and threads.
+_lock = threading.Lock()
+_connections: Dict[str, Tuple[sqlite3.Connection, threading.Lock]] = {}
+# (db_path, table) of the tenant tables known to exist.
+_tables: Set[Tuple[str, str]] = set()
+
+
+def _open(db_path: str, create: bool) -> Tuple[sqlite3.Connection, threading.Lock] | None:
+    """
+    Returns the shared connection to a shard database and the lock serializing its use,
+    or None if the database does not exist and ``create`` is False.
+    """
+    entry = _connections.get(db_path)
+    if entry is not None:
+        return entry
+    if not create and not os.path.exists(db_path):
+        return None
+    with _lock:
+        if db_path not in _connections:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            connection = sqlite3.connect(db_path, timeout=10, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            _connections[db_path] = (connection, threading.Lock())
+        return _connections[db_path]
+
+
+def _table_name(tenant_id: str) -> str:
+    """
+    Returns the name of a tenant's tables, which does not depend on the characters of the tenant ID.
+    """
+    return "fts_" + hashlib.sha256(tenant_id.encode()).hexdigest()[:16]
+
+
+def _has_table(connection: sqlite3.Connection, db_path: str, table: str, create: bool) -> bool:
+    """
+    Tells whether a tenant's tables exist in a shard database, creating them if ``create`` is True.
+
+    Must be called with the connection's lock held.
+    """
+    if (db_path, table) in _tables:
+        return True
+    if create:
+        connection.executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table}_chunks (
+                rowid INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
+                content TEXT NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(
+                content, content='{table}_chunks', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON {table}_chunks BEGIN
+                INSERT INTO {table} (rowid, content) VALUES (new.rowid, new.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON {table}_chunks BEGIN
+                INSERT INTO {table} ({table}, rowid, content) VALUES ('delete', old.rowid, old.content);
+            END;
+            """
+        )
+    elif connection.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (table,)).fetchone() is None:
+        # Another worker may create them later, so this is not cached.
+        return False
+    _tables.add((db_path, table))
+    return True
+
+
+class LexicalIndex:
+    """
+    A tenant's inverted index of chunk texts, ranked with BM25.
+
+    Backed by an SQLite FTS5 table of the tenant in the database of its storage
+    shard, next to the shard's Chroma data. The tenants of a shard share the
+    database connection but not the table, so BM25 term and length statistics
+    are the tenant's own and a query only scans the tenant's chunks. Chunks are keyed by their content hash, like in the Chroma
+    collection, so re-ingesting a file does not index the same chunk twice. The
+    database runs in WAL mode so the ingestion workers can write while the API
+    workers read.
+    """
+
+    def __init__(self, db_path: str, tenant_id: str):
+        """
+        Args:
+            db_path (str): Path of the shard's SQLite database, created on the first write.
+            tenant_id (str): The ID of the tenant whose chunks are read and written.
+        """
+        self.db_path = db_path
+        self.tenant_id = tenant_id
+        self.table = _table_name(tenant_id)
+
+    def add(self, chunks: Iterable[Tuple[str, str]]):
+        """
+        Indexes chunks; chunks already in the index are left as they are.
+
+        Args:
+            chunks (Iterable[Tuple[str, str]]): ``(chunk_id, text)`` pairs.
+        """
+        connection, lock = _open(self.db_path, create=True)
+        rows = list(chunks)
+        with lock:
+            _has_table(connection, self.db_path, self.table, create=True)
+            with connection:
+                connection.execute("BEGIN")
+                connection.executemany(f"INSERT OR IGNORE INTO {self.table}_chunks (id, content) VALUES (?, ?)", rows)
+
+    def remove(self, chunk_ids: Iterable[str]):
+        """
+        Removes chunks from the index.
+
+        Args:
+            chunk_ids (Iterable[str]): The IDs of the chunks to remove.
+        """
+        entry = _open(self.db_path, create=False)
+        if entry is None:
+            return
+        connection, lock = entry
+        rows = [(id_,) for id_ in chunk_ids]
+        with lock:
+            if not _has_table(connection, self.db_path, self.table, create=False):
+                return
+            with connection:
+                connection.execute("BEGIN")
+                connection.executemany(f"DELETE FROM {self.table}_chunks WHERE id = ?", rows)
+
+    def search(self, query: str, n_results: int = 5) -> List[Tuple[str, float]]:
+        """
+        Returns the chunks that best match the query's terms.
+
+        Any term may match; rare terms (error codes, endpoint paths) weigh the most.
+
+        Args:
+            query (str): The user's question.
+            n_results (int): The number of chunks to return.
+
+        Returns:
+            List[Tuple[str, float]]: ``(text, bm25 score)`` pairs, best first. FTS5 scores are negative;
+            lower is better.
+        """
+        terms = sorted({term.lower() for term in _TOKEN.findall(query)})
+        entry = _open(self.db_path, create=False)
+        if not terms or entry is None:
+            return []
+        connection, lock = entry
+        match = " OR ".join(f'"{term}"' for term in terms)
+        with lock:
+            if not _has_table(connection, self.db_path, self.table, create=False):
+                return []
+            rows = connection.execute(
+                f"SELECT content, bm25({self.table}) AS score FROM {self.table} "
+                f"WHERE {self.table} MATCH ? ORDER BY score LIMIT ?",
+                (match, n_results),
+            ).fetchall()
+        return [(content, score) for content, score in rows]
+
+
+def get_lexical_index(tenant_id: str) -> LexicalIndex:
+    """
+    Returns the lexical index of a tenant, in the database of its storage shard.
+
+    Indexes of the older layouts (a ``<tenant_id>.db`` per tenant, or one ``chunks``
+    table shared by the tenants of a shard) are not read; run
+    ``ingest_docs.rebuild_lexical_index`` to index a tenant's collection again.
+
+    Args:
+        tenant_id (str): The ID of the tenant.
+
+    Returns:
+        LexicalIndex: The tenant's index (the shard's database is created on the first write).
+    """
+    shard = os.path.basename(registry.shard_directory(tenant_id))
+    return LexicalIndex(os.path.join(settings.lexical_index_dir, f"{shard}.db"), tenant_id)
+
+
+def close_connections():
+    """
+    Closes the shared connections to the shard databases.
+    """
+    with _lock:
+        for connection, _ in _connections.values():
+            connection.close()
+        _connections.clear()
+        _tables.clear()
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Merges several rankings of the same kind of items with reciprocal rank fusion.
+
+    Each item scores ``sum(1 / (k + rank))`` over the rankings it appears in, so
+    items ranked well by both dense and lexical search come first, without having to
+    compare cosine distances with BM25 scores.
+
+    Args:
+        rankings (Iterable[List[str]]): Rankings, best item first.
+        k (int): Damping constant; larger values flatten the weight of the top ranks.
+
+    Returns:
+        List[Tuple[str, float]]: ``(item, fused score)`` pairs, highest score first.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
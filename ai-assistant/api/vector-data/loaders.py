@@ -0,0 +1,135 @@
+import json
+from typing import Any, Iterator
+
+from langchain.docstore.document import Document as LangchainDocument
+
+# How much of a file is read at a time by the streaming loaders.
+READ_SIZE = 64 * 1024
+
+
+def iter_pdf_pages(file_path: str, file_name: str, workers: int | None = None) -> Iterator[LangchainDocument]:
+    """
+    Yields one document per PDF page, in order, as page ranges are parsed in parallel.
+
+    The extracted text is cached by content hash, so a PDF that was parsed before
+    (uploaded under another name, or re-embedded with another model) is not parsed again.
+
+    Args:
+        file_path (str): The PDF file.
+        file_name (str): The original name of the file, recorded as the pages' source.
+        workers (int): Number of parser processes (default: ``pdf_parser.default_workers()``).
+    """
+    from .manifests import file_hash
+    from .pdf_parser import iter_pdf_text
+
+    for number, text in enumerate(iter_pdf_text(file_path, file_hash(file_path), workers=workers)):
+        yield LangchainDocument(page_content=text, metadata={"source": file_name, "page": number})
+
+
+def iter_markdown_sections(file_path: str, file_name: str, max_section_chars: int = 8000) -> Iterator[LangchainDocument]:
+    """
+    Yields one document per Markdown section, reading the file line by line.
+
+    A section starts at a heading. Sections longer than ``max_section_chars`` are
+    emitted in several parts so a file without headings is still read incrementally.
+    """
+    heading = ""
+    lines: list[str] = []
+    size = 0
+
+    def section():
+        return LangchainDocument(page_content="".join(lines), metadata={"source": file_name, "section": heading})
+
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if line.startswith("#") and lines:
+                if "".join(lines).strip():
+                    yield section()
+                lines, size = [], 0
+            if line.startswith("#"):
+                heading = line.lstrip("#").strip()
+            lines.append(line)
+            size += len(line)
+            if size >= max_section_chars:
+                yield section()
+                lines, size = [], 0
+    if "".join(lines).strip():
+        yield section()
+
+
+def iter_json_items(file_path: str, read_size: int = READ_SIZE) -> Iterator[Any]:
+    """
+    Yields the elements of a top-level JSON array one at a time.
+
+    Only the element being decoded is held in memory. Any other JSON document
+    (an object, a scalar) is yielded whole.
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, "r", encoding="utf-8") as f:
+        buffer = f.read(read_size).lstrip()
+        if not buffer.startswith("["):
+            yield json.loads(buffer + f.read())
+            return
+        buffer = buffer[1:]
+        eof = False
+
+        def fill():
+            nonlocal buffer, eof
+            more = f.read(read_size)
+            if more:
+                buffer += more
+            else:
+                eof = True
+
+        while True:
+            buffer = buffer.lstrip()
+            if not buffer:
+                if eof:
+                    raise ValueError("Unterminated JSON array")
+                fill()
+                continue
+            if buffer[0] == ",":
+                buffer = buffer[1:]
+                continue
+            if buffer[0] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            if end == len(buffer) and not eof:
+                # A number at the end of the buffer may continue in the next read.
+                fill()
+                continue
+            yield item
+            buffer = buffer[end:]
+
+
+def iter_json_documents(file_path: str, file_name: str) -> Iterator[LangchainDocument]:
+    """
+    Yields one document per element of a JSON array, or one for a whole JSON object.
+    """
+    for seq_num, item in enumerate(iter_json_items(file_path), start=1):
+        yield LangchainDocument(page_content=json.dumps(item), metadata={"source": file_name, "seq_num": seq_num})
+
+
+def iter_documents(file_path: str, file_name: str, pdf_workers: int | None = None) -> Iterator[LangchainDocument]:
+    """
+    Yields the pages or sections of an uploaded file lazily, based on its extension.
+
+    ``pdf_workers`` is the number of processes parsing a PDF (default: ``pdf_parser.default_workers()``).
+
+    Raises:
+        ValueError: If the file type is not supported.
+    """
+    file_extension = file_name.split(".")[-1].lower()
+    if file_extension == "md":
+        return iter_markdown_sections(file_path, file_name)
+    if file_extension == "pdf":
+        return iter_pdf_pages(file_path, file_name, workers=pdf_workers)
+    if file_extension == "json":
+        return iter_json_documents(file_path, file_name)
+    raise ValueError(f"Unsupported file type: {file_extension}")
@@ -0,0 +1,308 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Iterable, List, NamedTuple
+
+from . import registry
+from .collection_index import collection_index
+from .endpoint_index import endpoint_index
+from .lexical_index import get_lexical_index
+from ..config import settings
+
+
+def file_hash(file_path: str, read_size: int = 1024 * 1024) -> str:
+    """
+    Returns the SHA-256 of a file's content, reading it a block at a time.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(read_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DocumentManifest(NamedTuple):
+    """
+    What was ingested for one document of a tenant.
+    """
+    name: str
+    content_hash: str
+    size: int
+    chunk_count: int
+    embedding_model: str | None
+    ingested_at: str
+
+
+class ManifestStore:
+    """
+    Tracks the documents each tenant ingested and the chunks they produced.
+
+    Chunk IDs are content hashes, so documents of a tenant can share chunks; a chunk
+    is only removed from the collection once no document references it anymore.
+    Chunks to remove are first written as tombstones in the same transaction that
+    updates the manifest, then purged from the vector store, so a crash between the
+    two steps leaves tombstones to purge on the next ingestion instead of orphans.
+    """
+
+    def __init__(self, db_path: str | None = None):
+        """
+        Initializes the store. The database is created on first use.
+
+        Args:
+            db_path (str): Path of the SQLite database (default: settings.manifest_db_path).
+        """
+        self.db_path = db_path or settings.manifest_db_path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Returns this thread's connection, opening it on first use.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS documents (
+                    tenant_id TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    chunk_count INTEGER NOT NULL,
+                    embedding_model TEXT,
+                    ingested_at TEXT NOT NULL,
+                    PRIMARY KEY (tenant_id, name)
+                );
+                CREATE TABLE IF NOT EXISTS document_chunks (
+                    tenant_id TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    PRIMARY KEY (tenant_id, name, chunk_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_document_chunks_chunk ON document_chunks (tenant_id, chunk_id);
+                CREATE TABLE IF NOT EXISTS tombstones (
+                    tenant_id TEXT NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    PRIMARY KEY (tenant_id, chunk_id)
+                );
+                """
+            )
+            self._local.connection = connection
+        return connection
+
+    def get(self, tenant_id: str, name: str) -> DocumentManifest | None:
+        """
+        Returns the manifest of a tenant's document, or None if it was never ingested.
+        """
+        row = self._connection().execute(
+            "SELECT name, content_hash, size, chunk_count, embedding_model, ingested_at FROM documents "
+            "WHERE tenant_id = ? AND name = ?",
+            (tenant_id, name),
+        ).fetchone()
+        return DocumentManifest(*row) if row else None
+
+    def list(self, tenant_id: str) -> List[DocumentManifest]:
+        """
+        Returns the manifests of a tenant's documents, by name.
+        """
+        rows = self._connection().execute(
+            "SELECT name, content_hash, size, chunk_count, embedding_model, ingested_at FROM documents "
+            "WHERE tenant_id = ? ORDER BY name",
+            (tenant_id,),
+        ).fetchall()
+        return [DocumentManifest(*row) for row in rows]
+
+    def chunk_ids(self, tenant_id: str, name: str) -> set:
+        """
+        Returns the IDs of the chunks of a tenant's document.
+        """
+        rows = self._connection().execute(
+            "SELECT chunk_id FROM document_chunks WHERE tenant_id = ? AND name = ?", (tenant_id, name)
+        ).fetchall()
+        return {row[0] for row in rows}
+
+    def _tombstone_unreferenced(self, connection: sqlite3.Connection, tenant_id: str, chunk_ids: Iterable[str]) -> List[str]:
+        orphaned = [
+            chunk_id for chunk_id in chunk_ids
+            if connection.execute(
+                "SELECT 1 FROM document_chunks WHERE tenant_id = ? AND chunk_id = ? LIMIT 1", (tenant_id, chunk_id)
+            ).fetchone() is None
+        ]
+        connection.executemany(
+            "INSERT OR IGNORE INTO tombstones (tenant_id, chunk_id) VALUES (?, ?)",
+            [(tenant_id, chunk_id) for chunk_id in orphaned],
+        )
+        return orphaned
+
+    def replace(
+        self,
+        tenant_id: str,
+        name: str,
+        content_hash: str,
+        size: int,
+        chunk_ids: Iterable[str],
+        embedding_model: str | None,
+    ) -> List[str]:
+        """
+        Records a new version of a document and tombstones the chunks it no longer uses.
+
+        Args:
+            tenant_id (str): The ID of the tenant.
+            name (str): The document's file name.
+            content_hash (str): The SHA-256 of the uploaded file.
+            size (int): The size of the uploaded file in bytes.
+            chunk_ids (Iterable[str]): The IDs of the new version's chunks.
+            embedding_model (str): The model the chunks are embedded with.
+
+        Returns:
+            List[str]: The IDs of the chunks no document references anymore.
+        """
+        new_ids = set(chunk_ids)
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            old_ids = self.chunk_ids(tenant_id, name)
+            connection.execute("DELETE FROM document_chunks WHERE tenant_id = ? AND name = ?", (tenant_id, name))
+            connection.executemany(
+                "INSERT INTO document_chunks (tenant_id, name, chunk_id) VALUES (?, ?, ?)",
+                [(tenant_id, name, chunk_id) for chunk_id in new_ids],
+            )
+            # Chunks that came back must not be purged by an older tombstone.
+            connection.executemany(
+                "DELETE FROM tombstones WHERE tenant_id = ? AND chunk_id = ?",
+                [(tenant_id, chunk_id) for chunk_id in new_ids],
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    tenant_id, name, content_hash, size, len(new_ids), embedding_model,
+                    datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                ),
+            )
+            return self._tombstone_unreferenced(connection, tenant_id, old_ids - new_ids)
+
+    def remove(self, tenant_id: str, name: str) -> List[str] | None:
+        """
+        Forgets a document and tombstones the chunks no other document uses.
+
+        Returns:
+            List[str] | None: The IDs of the chunks no document references anymore, or None if
+            the document does not exist.
+        """
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            old_ids = self.chunk_ids(tenant_id, name)
+            deleted = connection.execute(
+                "DELETE FROM documents WHERE tenant_id = ? AND name = ?", (tenant_id, name)
+            ).rowcount
+            if not deleted:
+                return None
+            connection.execute("DELETE FROM document_chunks WHERE tenant_id = ? AND name = ?", (tenant_id, name))
+            return self._tombstone_unreferenced(connection, tenant_id, old_ids)
+
+    def tombstones(self, tenant_id: str) -> List[str]:
+        """
+        Returns the IDs of the tenant's chunks waiting to be purged from the vector store.
+        """
+        rows = self._connection().execute(
+            "SELECT chunk_id FROM tombstones WHERE tenant_id = ? ORDER BY chunk_id", (tenant_id,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def purge(self, tenant_id: str, delete: Callable[[List[str]], None], batch_size: int = 500) -> int:
+        """
+        Deletes the tenant's tombstoned chunks that no document references, a batch at a time.
+
+        Each batch is claimed, deleted and its tombstones dropped in one ``BEGIN IMMEDIATE``
+        transaction, which keeps every process from writing a manifest meanwhile. A chunk
+        a concurrent ingestion references again after it was tombstoned is therefore never
+        deleted, and if ``delete`` fails the batch's tombstones are kept for the next purge.
+
+        Args:
+            tenant_id (str): The ID of the tenant.
+            delete (Callable): Deletes a list of chunk IDs from the vector store.
+            batch_size (int): Number of chunks deleted at a time.
+
+        Returns:
+            int: The number of chunks deleted.
+        """
+        connection = self._connection()
+        purged = 0
+        while True:
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                chunk_ids = [
+                    row[0] for row in connection.execute(
+                        "SELECT chunk_id FROM tombstones WHERE tenant_id = ? ORDER BY chunk_id LIMIT ?",
+                        (tenant_id, batch_size),
+                    )
+                ]
+                if not chunk_ids:
+                    return purged
+                unreferenced = [
+                    chunk_id for chunk_id in chunk_ids
+                    if connection.execute(
+                        "SELECT 1 FROM document_chunks WHERE tenant_id = ? AND chunk_id = ? LIMIT 1",
+                        (tenant_id, chunk_id),
+                    ).fetchone() is None
+                ]
+                if unreferenced:
+                    delete(unreferenced)
+                connection.executemany(
+                    "DELETE FROM tombstones WHERE tenant_id = ? AND chunk_id = ?",
+                    [(tenant_id, chunk_id) for chunk_id in chunk_ids],
+                )
+            purged += len(unreferenced)
+
+
+# Shared manifest store used by the ingestion pipeline and the document endpoints.
+document_manifests = ManifestStore()
+
+
+def purge_tombstones(tenant_id: str, collection, batch_size: int = 500) -> int:
+    """
+    Deletes the tenant's tombstoned chunks from its collection and lexical index.
+
+    Args:
+        tenant_id (str): The ID of the tenant.
+        collection (Collection): The tenant's ChromaDB collection.
+        batch_size (int): Number of chunks deleted at a time.
+
+    Returns:
+        int: The number of chunks deleted.
+    """
+    lexical_index = get_lexical_index(tenant_id)
+
+    def delete(chunk_ids: List[str]):
+        collection.delete(ids=chunk_ids)
+        lexical_index.remove(chunk_ids)
+
+    return document_manifests.purge(tenant_id, delete, batch_size)
+
+
+def delete_document(tenant_id: str, name: str) -> dict | None:
+    """
+    Removes a document and the chunks no other document of the tenant shares.
+
+    Args:
+        tenant_id (str): The ID of the tenant.
+        name (str): The document's file name.
+
+    Returns:
+        dict | None: The number of chunks removed, or None if the document does not exist.
+    """
+    if document_manifests.remove(tenant_id, name) is None:
+        return None
+    endpoint_index.remove(tenant_id, name)
+    collection = registry.get_tenant_collection(tenant_id)
+    if collection is None:
+        return {"chunks_removed": 0}
+    removed = purge_tombstones(tenant_id, collection)
+    collection_index.record(tenant_id, collection.name, collection.count(), ingested=False)
+    return {"chunks_removed": removed}
@@ -0,0 +1,230 @@
+import gzip
+import json
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List
+
+from ..config import settings
+
+
+def count_pages(file_path: str) -> int:
+    """
+    Returns the number of pages of a PDF. Only the page tree is read, not the content.
+    """
+    from pypdf import PdfReader
+
+    return len(PdfReader(file_path).pages)
+
+
+def parse_page_range(file_path: str, start: int, stop: int) -> List[str]:
+    """
+    Extracts the text of pages ``start`` to ``stop`` (excluded) of a PDF. Runs in the parser processes.
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(file_path)
+    return [reader.pages[number].extract_text() for number in range(start, stop)]
+
+
+class PdfTextCache:
+    """
+    Extracted PDF text keyed by the file's content hash, stored as one gzipped JSON Lines file per PDF.
+
+    Entries are written a range of pages at a time while the PDF is parsed and read
+    back one page at a time, so a large PDF's text is never held in memory whole.
+    The least recently used entries are removed once the cache exceeds ``max_bytes``.
+    """
+
+    def __init__(self, directory: str | None = None, max_bytes: int | None = None):
+        """
+        Initializes the cache. The directory is created on the first write.
+
+        Args:
+            directory (str): Where entries are stored (default: settings.pdf_text_cache_dir).
+            max_bytes (int): Size above which old entries are removed (default: settings.pdf_text_cache_max_mb).
+        """
+        self.directory = directory or settings.pdf_text_cache_dir
+        self.max_bytes = max_bytes if max_bytes is not None else settings.pdf_text_cache_max_mb * 1024 * 1024
+
+    def _path(self, content_hash: str) -> str:
+        return os.path.join(self.directory, f"{content_hash}.jsonl.gz")
+
+    def get(self, content_hash: str) -> Iterator[str] | None:
+        """
+        Returns an iterator over the text of each page of a PDF, or None if it is not cached.
+        """
+        path = self._path(content_hash)
+        try:
+            # Touched first, so trimming the cache does not remove it while it is read.
+            os.utime(path)
+        except OSError:
+            return None
+        return self._read(path)
+
+    @staticmethod
+    def _read(path: str) -> Iterator[str]:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    yield json.loads(line)
+            except (OSError, EOFError, ValueError):
+                # A damaged entry is parsed again next time.
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                raise
+
+    @contextmanager
+    def writing(self, content_hash: str) -> Iterator[Callable[[Iterable[str]], None]]:
+        """
+        Writes an entry incrementally: the ``with`` block gets a function appending pages to it.
+
+        The entry becomes visible, and the cache is trimmed to its size limit, when the
+        block exits normally; it is discarded if the block fails or is abandoned.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(content_hash)
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(temporary_path, "wt", encoding="utf-8") as f:
+                yield lambda pages: f.writelines(json.dumps(text) + "\n" for text in pages)
+            os.replace(temporary_path, path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+        self._trim()
+
+    def put(self, content_hash: str, pages: Iterable[str]):
+        """
+        Stores the text of every page of a PDF, then trims the cache to its size limit.
+        """
+        with self.writing(content_hash) as append:
+            append(pages)
+
+    def _trim(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            # Entries of the older whole-JSON format (.json.gz) are evicted like the others.
+            if name.endswith((".jsonl.gz", ".json.gz")):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+# Shared text cache of the ingestion processes.
+pdf_text_cache = PdfTextCache()
+
+_executor: Executor | None = None
+_executor_lock = threading.Lock()
+
+
+def default_workers() -> int:
+    """
+    Returns the number of parser processes of one ingestion worker.
+
+    Every ingestion worker parses with its own pool, so PDF_PARSE_WORKERS is shared
+    between the INGEST_WORKERS of them rather than started by each one.
+    """
+    return max(1, settings.pdf_parse_workers // max(1, settings.ingest_workers))
+
+
+def _get_executor() -> Executor:
+    """
+    Returns the process pool parsing page ranges, starting it on first use.
+
+    The ingestion workers have loaded torch and run its threads; forking them could
+    copy a lock held by one of those threads, so the parsers are spawned instead.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=default_workers(), mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+
+def iter_pdf_text(
+    file_path: str,
+    content_hash: str,
+    workers: int | None = None,
+    pages_per_range: int | None = None,
+    executor: Executor | None = None,
+    cache: PdfTextCache | None = None,
+) -> Iterator[str]:
+    """
+    Yields the text of each page of a PDF, in order.
+
+    The PDF is split into ranges of ``pages_per_range`` pages parsed in parallel in a
+    process pool. Ranges are yielded as soon as they and the ones before them are
+    parsed, so the text splitter and the embedding start while the end of the file is
+    still being parsed; at most two ranges per worker are in flight. Small PDFs, and
+    ``workers=1``, are parsed in the calling process.
+
+    The extracted text is cached by content hash, so the same PDF is never parsed twice.
+
+    Args:
+        file_path (str): The PDF file.
+        content_hash (str): The SHA-256 of the file.
+        workers (int): Number of parser processes (default: ``default_workers()``).
+        pages_per_range (int): Pages parsed per task (default: settings.pdf_pages_per_range).
+        executor (Executor): Executor to parse ranges in (default: a shared process pool).
+        cache (PdfTextCache): The text cache (default: the shared one).
+
+    Yields:
+        str: The text of the next page.
+    """
+    cache = cache or pdf_text_cache
+    cached = cache.get(content_hash)
+    if cached is not None:
+        yield from cached
+        return
+
+    workers = workers or default_workers()
+    pages_per_range = pages_per_range or settings.pdf_pages_per_range
+    page_count = count_pages(file_path)
+    ranges = [(start, min(start + pages_per_range, page_count)) for start in range(0, page_count, pages_per_range)]
+
+    # Each range is appended to the cache entry as it is yielded.
+    with cache.writing(content_hash) as append:
+        if workers <= 1 or len(ranges) <= 1:
+            for start, stop in ranges:
+                texts = parse_page_range(file_path, start, stop)
+                append(texts)
+                yield from texts
+        else:
+            executor = executor or _get_executor()
+            remaining = iter(ranges)
+            pending = deque(
+                executor.submit(parse_page_range, file_path, start, stop)
+                for start, stop in islice(remaining, 2 * workers)
+            )
+            try:
+                while pending:
+                    texts = pending.popleft().result()
+                    for start, stop in islice(remaining, 1):
+                        pending.append(executor.submit(parse_page_range, file_path, start, stop))
+                    append(texts)
+                    yield from texts
+            finally:
+                # Ranges of an abandoned or failed parse are not left running.
+                for future in pending:
+                    future.cancel()
@@ -0,0 +1,53 @@
+from typing import Tuple
+
+import numpy as np
+
+# float32 keeps vectors as they are; float16 halves their size, int8 divides it by four.
+STORAGE_DTYPES = ("float32", "float16", "int8")
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, np.ndarray | None]:
+    """
+    Compresses embedding vectors for storage.
+
+    int8 uses symmetric per-vector scaling: each vector is divided by its largest
+    absolute component and mapped to [-127, 127], and the scale is kept alongside.
+
+    Args:
+        vectors (np.ndarray): A vector or a matrix with one vector per row.
+        dtype (str): One of ``STORAGE_DTYPES``.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray | None]: The stored codes and, for int8, the per-vector scales.
+
+    Raises:
+        ValueError: If the dtype is unknown.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dtype == "float32":
+        return vectors, None
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=-1, keepdims=True) / 127
+        scales[scales == 0] = 1
+        return np.round(vectors / scales).astype(np.int8), scales.squeeze(-1).astype(np.float32)
+    raise ValueError(f"Unknown storage dtype '{dtype}', expected one of {STORAGE_DTYPES}")
+
+
+def dot(codes: np.ndarray, scales: np.ndarray | None, query: np.ndarray) -> np.ndarray:
+    """
+    Returns the dot products of stored vectors with a float32 query.
+
+    Args:
+        codes (np.ndarray): The stored codes, one vector per row.
+        scales (np.ndarray | None): The per-vector scales returned by ``quantize``, if any.
+        query (np.ndarray): The query vector.
+
+    Returns:
+        np.ndarray: One float32 score per stored vector.
+    """
+    scores = codes @ np.asarray(query, dtype=np.float32)
+    if scales is not None:
+        scores = scores * scales
+    return scores.astype(np.float32, copy=False)
@@ -0,0 +1,203 @@
+import hashlib
+import os
+import threading
+from typing import Dict, Tuple
+
+from ..config import settings
+
+# Collection metadata key recording the model a collection's chunks are embedded with.
+EMBEDDING_MODEL_KEY = "embedding_model"
+
+# Process-wide caches. Embedding models and Chroma clients are expensive to build
+# (model weights, sqlite connections), so each one is created once per worker and
+# shared by the chat and ingest paths.
+_lock = threading.Lock()
+_embedding_functions: Dict[Tuple[str, str], object] = {}
+_clients: Dict[str, object] = {}
+_collections: Dict[Tuple[str, str], object] = {}
+
+
+def load_embedding_function(model_name: str, backend: str, onnx_file: str | None = None):
+    """
+    Loads an embedding model, see ``embeddings.load_embedding_function``.
+
+    Chroma and the model libraries (torch, sentence-transformers) take seconds to
+    import, so they are only imported when the first model is loaded.
+    """
+    from .embeddings import load_embedding_function as load
+
+    return load(model_name, backend, onnx_file=onnx_file)
+
+
+def get_embedding_function(model_name: str, backend: str | None = None):
+    """
+    Returns the shared Chroma embedding function for a model, loading it on first use.
+
+    Args:
+        model_name (str): A sentence-transformers model name, or an ``hkunlp/instructor-*`` model.
+        backend (str): The inference backend, see ``embeddings.EMBEDDING_BACKENDS`` (default: settings.embedding_backend).
+
+    Returns:
+        EmbeddingFunction: The embedding function for the model.
+    """
+    key = (model_name, backend or settings.embedding_backend)
+    embedding_function = _embedding_functions.get(key)
+    if embedding_function is not None:
+        return embedding_function
+    with _lock:
+        # Another thread may have loaded the model while we waited for the lock.
+        if key not in _embedding_functions:
+            _embedding_functions[key] = load_embedding_function(
+                model_name, key[1], onnx_file=settings.embedding_onnx_file or None
+            )
+        return _embedding_functions[key]
+
+
+def get_chroma_client(persist_directory: str):
+    """
+    Returns the shared persistent Chroma client for a directory.
+
+    Args:
+        persist_directory (str): The directory the client persists to.
+
+    Returns:
+        chromadb.PersistentClient: The client for the directory.
+    """
+    client = _clients.get(persist_directory)
+    if client is not None:
+        return client
+    import chromadb
+
+    with _lock:
+        if persist_directory not in _clients:
+            _clients[persist_directory] = chromadb.PersistentClient(path=persist_directory)
+        return _clients[persist_directory]
+
+
+def get_collection(persist_directory: str, collection_name: str, model_name: str, create: bool = False):
+    """
+    Returns a cached collection handle bound to the shared embedding function for its model.
+
+    Args:
+        persist_directory (str): The directory of the Chroma client holding the collection.
+        collection_name (str): The name of the collection.
+        model_name (str): The embedding model used by the collection.
+        create (bool): Create the collection if it does not exist yet.
+
+    Returns:
+        Collection: The collection, or None if it does not exist and ``create`` is False.
+    """
+    key = (persist_directory, collection_name)
+    collection = _collections.get(key)
+    if collection is not None:
+        return collection
+
+    client = get_chroma_client(persist_directory)
+    embedding_function = get_embedding_function(model_name)
+    if create:
+        collection = client.get_or_create_collection(name=collection_name, embedding_function=embedding_function)
+    else:
+        try:
+            collection = client.get_collection(name=collection_name, embedding_function=embedding_function)
+        except Exception:
+            # Missing collections are not cached, the tenant may ingest documents later.
+            return None
+    with _lock:
+        return _collections.setdefault(key, collection)
+
+
+def shard_directory(tenant_id: str) -> str:
+    """
+    Returns the storage shard holding a tenant's collection.
+
+    Tenants are spread over ``settings.vector_store_shards`` Chroma directories by a
+    stable hash of their ID, so the number of clients, sqlite files and open handles
+    per worker is bounded by the shard count instead of growing with the tenants.
+
+    Args:
+        tenant_id (str): The ID of the tenant.
+
+    Returns:
+        str: The shard's directory.
+    """
+    digest = hashlib.sha1(tenant_id.encode("utf-8")).digest()
+    shard = int.from_bytes(digest[:4], "big") % settings.vector_store_shards
+    return os.path.join(settings.vector_store_dir, f"shard-{shard:02d}")
+
+
+def shard_directories() -> list[str]:
+    """
+    Returns the shard directories that exist on disk.
+    """
+    if not os.path.isdir(settings.vector_store_dir):
+        return []
+    return sorted(
+        os.path.join(settings.vector_store_dir, name)
+        for name in os.listdir(settings.vector_store_dir)
+        if name.startswith("shard-")
+    )
+
+
+def collection_model(collection) -> str:
+    """
+    Returns the embedding model recorded in a collection's metadata.
+    """
+    return (collection.metadata or {}).get(EMBEDDING_MODEL_KEY, settings.embedding_model)
+
+
+def get_tenant_collection(tenant_id: str, create: bool = False, model_name: str | None = None):
+    """
+    Returns a tenant's collection in its storage shard, bound to the collection's embedding model.
+
+    Ingestion and queries both go through this function, so they always read and
+    write the same collection with the same model.
+
+    Args:
+        tenant_id (str): The ID of the tenant.
+        create (bool): Create the collection if it does not exist yet.
+        model_name (str): The embedding model of a new collection (default: settings.embedding_model).
+            Existing collections keep the model recorded in their metadata.
+
+    Returns:
+        Collection: The collection, or None if it does not exist and ``create`` is False.
+    """
+    persist_directory = shard_directory(tenant_id)
+    collection_name = f"tenant_{tenant_id}"
+    key = (persist_directory, collection_name)
+    collection = _collections.get(key)
+    if collection is not None:
+        return collection
+
+    if not create and not os.path.isdir(persist_directory):
+        return None
+    client = get_chroma_client(persist_directory)
+    try:
+        # Read the metadata first, to bind the collection to the model it was embedded with.
+        existing = client.get_collection(name=collection_name)
+    except Exception:
+        existing = None
+    if existing is not None:
+        model_name = collection_model(existing)
+        collection = client.get_collection(name=collection_name, embedding_function=get_embedding_function(model_name))
+    elif create:
+        model_name = model_name or settings.embedding_model
+        collection = client.get_or_create_collection(
+            name=collection_name,
+            embedding_function=get_embedding_function(model_name),
+            metadata={EMBEDDING_MODEL_KEY: model_name},
+        )
+    else:
+        # Missing collections are not cached, the tenant may ingest documents later.
+        return None
+    with _lock:
+        return _collections.setdefault(key, collection)
+
+
+def clear():
+    """
+    Drops every cached model, client and collection handle.
+    """
+    with _lock:
+        _collections.clear()
+        _clients.clear()
+        _embedding_functions.clear()
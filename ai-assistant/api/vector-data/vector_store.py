@@ -1,56 +1,159 @@
-import chromadb
-from chromadb.utils import embedding_functions
 import os
 
+from . import registry
+from .collection_index import collection_index
+from .lexical_index import get_lexical_index, reciprocal_rank_fusion
+from ..config import settings
+from ..services.metrics import span
+
 class VectorStore:
     """
-    Manages interactions with a ChromaDB vector store.
+    Manages interactions with the sharded ChromaDB vector store.
+
+    Tenants' collections are spread over the storage shards of the registry, the
+    same ones the ingestion pipeline writes to.
+
+    Dense results are fused with the tenant's BM25 lexical index, so chunks that
+    contain the exact identifiers of a question (endpoint paths, error codes,
+    permission names) rank well even when their embeddings are not the closest.
     """
 
-    def __init__(self, persist_directory: str = "ai-assistant/api/vector-data/chroma"):
+    def __init__(self, model_name: str | None = None):
         """
-        Initializes the ChromaDB client and collection.
+        Initializes the store without loading anything.
+
+        The embedding model and Chroma clients come from the process-wide registry
+        and are loaded on first use, or ahead of traffic by ``warm_up``, so importing
+        the API and creating a VectorStore stay fast.
 
         Args:
-            persist_directory (str): The directory to persist ChromaDB data.
+            model_name (str): The embedding model used for questions (default: settings.embedding_model).
+                Collections embedded with another model embed the question with their own.
+        """
+        self.model_name = model_name or settings.embedding_model
+        self._backfilled = False
+
+    @property
+    def embedding_function(self):
+        """
+        The embedding function of ``model_name``, loaded on first use.
+        """
+        return registry.get_embedding_function(self.model_name)
+
+    def warm_up(self):
+        """
+        Loads the embedding model and opens the storage shards, so the first question does not wait for them.
+
+        Raises:
+            Exception: If the model or a shard cannot be loaded.
         """
         try:
-            self.persist_directory = persist_directory
-            self.chroma_client = chromadb.PersistentClient(path=self.persist_directory)
-            self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-mpnet-base-v2")
+            self.embed("warm-up")
+            for persist_directory in registry.shard_directories():
+                registry.get_chroma_client(persist_directory)
+            self._backfill_collection_index()
         except Exception as e:
             raise Exception(f"Error initializing ChromaDB client: {e}")
 
-    def query(self, query: str, tenant_id: str, n_results: int = 5):
+    def _backfill_collection_index(self):
+        """
+        Indexes the collections of data ingested before the collection index existed, once per process.
+        """
+        if self._backfilled:
+            return
+        if collection_index.is_empty():
+            for persist_directory in registry.shard_directories():
+                collection_index.backfill(registry.get_chroma_client(persist_directory))
+        self._backfilled = True
+
+    def embed(self, text: str) -> list[float]:
+        """
+        Embeds a single query string with the store's embedding model.
+
+        Args:
+            text (str): The text to embed.
+
+        Returns:
+            list[float]: The embedding of the text.
+        """
+        return list(self.embedding_function([text])[0])
+
+    def query(
+        self,
+        query: str,
+        tenant_id: str,
+        n_results: int = 5,
+        query_embedding: list[float] | None = None,
+        include_distances: bool = False,
+        hybrid: bool | None = None,
+    ):
         """
         Queries the ChromaDB collection for the most relevant documents.
 
+        With hybrid retrieval the dense and BM25 rankings are merged with reciprocal
+        rank fusion; the returned distance is then the negated fused score, so lower
+        still ranks first.
+
         Args:
             query (str): The query string.
             tenant_id (str): The ID of the tenant to query.
             n_results (int): The number of results to return.
+            query_embedding (list[float]): The precomputed embedding of ``query``, if the caller already has it.
+            include_distances (bool): Return ``(document, distance)`` pairs instead of plain documents.
+            hybrid (bool): Fuse the results with the lexical index (default: settings.hybrid_retrieval).
 
         Returns:
-            list: A list of matching documents.
+            list: A list of matching documents, most relevant first.
 
         Raises:
             Exception: If there's an error during the query process.
         """
         try:
-            collection_name = f"tenant_{tenant_id}"
-            if collection_name not in self.chroma_client.list_collections():
+            self._backfill_collection_index()
+            # Tenants that never ingested anything have nothing to search.
+            info = collection_index.get(tenant_id)
+            if info is None or info.chunk_count == 0:
                 return []
-            collection = self.chroma_client.get_collection(name=collection_name, embedding_function=self.embedding_function)
-            # Perform the query on the collection
+
+            with span("vector_search"):
+                dense = self._dense_query(tenant_id, query, n_results, query_embedding)
+            if hybrid is None:
+                hybrid = settings.hybrid_retrieval
+            if not hybrid:
+                return dense if include_distances else [document for document, _ in dense]
+
+            with span("lexical_search"):
+                lexical = get_lexical_index(tenant_id).search(query, n_results)
+            fused = reciprocal_rank_fusion(
+                [[document for document, _ in dense], [document for document, _ in lexical]], k=settings.rrf_k
+            )[:n_results]
+            if include_distances:
+                return [(document, -score) for document, score in fused]
+            return [document for document, _ in fused]
+        except Exception as e:
+            raise Exception(f"Error querying ChromaDB: {e}")
+
+    def _dense_query(
+        self, tenant_id: str, query: str, n_results: int, query_embedding: list[float] | None
+    ) -> list[tuple[str, float]]:
+        """
+        Returns the tenant's nearest chunks in embedding space as ``(document, distance)`` pairs.
+        """
+        collection = registry.get_tenant_collection(tenant_id)
+        if collection is None:
+            return []
+        # The precomputed embedding is only usable if the collection was embedded with the same model.
+        if query_embedding is not None and registry.collection_model(collection) == self.model_name:
+            results = collection.query(
+                query_embeddings=[query_embedding],
+                n_results=n_results
+            )
+        else:
             results = collection.query(
                 query_texts=[query],
                 n_results=n_results
             )
-            # Extract and return only the document texts as an array
-            documents = results.get("documents", [])
-            if documents:
-                return documents[0]  # Return the list of texts for the single query
-            else:
-                return []
-        except Exception as e:
-            raise Exception(f"Error querying ChromaDB: {e}")
\ No newline at end of file
+        documents = results.get("documents", [])
+        if not documents:
+            return []
+        return list(zip(documents[0], results["distances"][0]))
@@ -1,2 +1,22 @@
-def ingest_docs():
-    return 'Ingest Docs Script'
\ No newline at end of file
+"""
+Bulk ingestion of a directory of documents into a tenant's collection.
+
+Usage::
+
+    python ai-assistant/vector-data/ingest_docs.py docs/acme --tenant acme --workers 8
+
+Re-running the same command resumes an interrupted run. See
+``ai_assistant.api.vector_data.bulk_ingest`` for the options.
+"""
+from ai_assistant.api.vector_data.bulk_ingest import bulk_ingest, main
+
+
+def ingest_docs(root: str, tenant_id: str, **options):
+    """
+    Ingests every supported file under ``root`` for a tenant and returns the run statistics.
+    """
+    return bulk_ingest(root, tenant_id, **options)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
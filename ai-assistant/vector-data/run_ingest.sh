@@ -1,3 +1,8 @@
 #!/bin/bash
+# Bulk-ingests a directory of documents into a tenant's collection.
+#
+# Usage: run_ingest.sh <directory> --tenant <tenant_id> [--workers N] [--batch-size N] [--restart]
+set -euo pipefail
 
-echo "running ingest script"
\ No newline at end of file
+echo "running ingest script"
+exec python "$(dirname "$0")/ingest_docs.py" "$@"